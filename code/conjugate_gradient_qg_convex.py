@@ -1,10 +1,12 @@
-from PEPit import PEP
-from PEPit.primitive_steps import exact_linesearch_step
-
 from code.function_class import ConvexQGFunction
+from code.methods import Method, solve_method
+from code.tools import cached_worst_case, scale_invariant
 
 
-def wc_conjugate_gradient_qg_convex(L, n, verbose=1):
+@scale_invariant()
+@cached_worst_case(ConvexQGFunction, title='worst-case performance of conjugate gradient method')
+def wc_conjugate_gradient_qg_convex(L, n, verbose=1, mode='pepit', solver='scs', use_cache=True,
+                                    scaling='canonical', ladder_rtol=1e-4):
     """
     Consider the convex minimization problem
 
@@ -57,6 +59,34 @@ def wc_conjugate_gradient_qg_convex(L, n, verbose=1):
                        0: This example's output.
                        1: This example's output + PEPit information.
                        2: This example's output + PEPit information + CVXPY details.
+        mode (str): How the PEP is assembled.
+                    'pepit': one PEPit constraint per interpolation inequality.
+                    'vectorized': interpolation inequalities stacked in a single block constraint
+                    (see :class:`code.tools.VectorizedPEP`), much faster to set up for large `n`.
+                    'compiled': SDP data built directly from the step-coefficient table of the method
+                    (see :class:`code.sdp.CompiledPEP`), bypassing PEPit and cvxpy.
+                    'ladder': compiled SDP solved with loose tolerances first, tightened only until the value
+                    is known to match the theoretical one up to `ladder_rtol`, or not
+                    (see :func:`code.sdp.solve_tolerance_ladder`).
+                    'cutting_plane': compiled SDP whose interpolation constraints are generated lazily
+                    (see :func:`code.sdp.solve_cutting_plane`), keeping the SDP small for long horizons.
+                    'low_rank': compiled PEP solved over a low-rank factorization of its Gram matrix
+                    (see :class:`code.sdp.LowRankPEP`), without any SDP solver.
+        solver (str or list): SDP solver, tried first, the other installed ones being fallbacks
+                              if it does not report an accurate solution: 'scs', 'clarabel' or 'cvxopt'
+                              in the modes 'pepit' and 'vectorized', and 'scs', 'clarabel' or 'admm'
+                              (see :func:`code.sdp.solve_admm`) in the modes 'compiled', 'ladder'
+                              and 'cutting_plane'.
+                              Can also be a list of solvers, tried in order without other fallback,
+                              or 'auto' to start with the fastest solver for this size of problem
+                              according to the solver log (see :class:`code.tools.SolverLog`).
+                              Ignored by the mode 'low_rank'.
+        use_cache (bool): whether to look for the worst-case value in the on-disk cache of solved PEPs
+                          (see :class:`code.tools.cache.PEPCache`) before solving, and to store it after.
+        scaling (str): 'canonical' to solve the normalized problem with L=1 and rescale its result
+                       (see :func:`code.tools.scaling.scale_invariant`), 'verify' to also solve the original
+                       problem and warn if the values differ, or 'none' to solve the original problem only.
+        ladder_rtol (float): relative tolerance of the comparison with the theoretical value in the mode 'ladder'.
 
     Returns:
         pepit_tau (float): worst-case value
@@ -78,42 +108,14 @@ def wc_conjugate_gradient_qg_convex(L, n, verbose=1):
 
     """
 
-    # Instantiate PEP
-    problem = PEP()
-
-    # Declare a smooth convex function
-    func = problem.declare_function(ConvexQGFunction, param={'L': L})
-
-    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
-    xs = func.stationary_point()
-    fs = func.value(xs)
-
-    # Then define the starting point x0 of the algorithm
-    x0 = problem.set_initial_point()
-
-    # Set the initial constraint that is the distance between x0 and x_*
-    problem.set_initial_condition((x0 - xs) ** 2 <= 1)
-
-    # Run n steps of the Conjugate Gradient method
-    x_new = x0
-    g0, f0 = func.oracle(x0)
-    span = [g0]  # list of search directions
-    for i in range(n):
-        x_old = x_new
-        x_new, gx, fx = exact_linesearch_step(x_new, func, span)
-        span.append(gx)
-        span.append(x_old - x_new)
-
-    # Set the performance metric to the function value accuracy
-    problem.set_performance_metric(fx - fs)
-
-    # Solve the PEP
-    pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(verbose=pepit_verbose)
-
-    # Compute theoretical guarantee (for comparison)
+    # Compute theoretical guarantee (for comparison, and as the reference of the mode 'ladder')
     theoretical_tau = L/(2*(n+1))
 
+    # Describe CG by its exact span searches and solve its PEP
+    method = Method([None] * n, name='conjugate gradient method')
+    pepit_tau = solve_method(method, L, mode=mode, solver=solver, verbose=max(verbose, 0), reference=theoretical_tau,
+                             ladder_rtol=ladder_rtol)
+
     # Print conclusion if required
     if verbose != -1:
         print('*** Example file: worst-case performance of conjugate gradient method ***')
@@ -1,3 +1,5 @@
-from .convex_qg_function import ConvexQGFunction
+from .convex_hrg_function import ConvexHRGFunction
+from .convex_qg_function import ConvexQGFunction, qg_convex_interpolation_pairs, qg_convex_interpolation_arrays
 
-__all__ = ['convex_qg_function', 'ConvexQGFunction']
+__all__ = ['convex_hrg_function', 'ConvexHRGFunction',
+           'convex_qg_function', 'ConvexQGFunction', 'qg_convex_interpolation_pairs', 'qg_convex_interpolation_arrays']
@@ -0,0 +1,88 @@
+from PEPit.function import Function
+
+
+class ConvexHRGFunction(Function):
+    """
+    The :class:`ConvexHRGFunction` class overwrites the `add_class_constraints` method of :class:`Function`,
+    implementing interpolation constraints of the class of h-RG^+ convex functions, i.e. convex functions with
+
+    .. math:: f(x) - f_\\star \\leqslant h(\\|x - x_\\star\\|^2)
+
+    for a concave increasing h (see :class:`code.tools.upper_bounds.UpperBound`).
+    As h is the minimum of its tangents :math:`a + b z`, the triplets are interpolable when, for each tangent,
+
+    .. math:: f_\\star + a \\geqslant f_j + \\langle g_j, x_\\star - x_j \\rangle + \\frac{1}{4b} \\|g_j\\|^2
+
+    (the constraint of :class:`code.function_class.ConvexQGFunction` for :math:`h(z) = \\frac{L}{2} z`),
+    besides the convexity constraints. Only the tangents at the given points are formulated:
+    the class is relaxed into a larger one, and the worst-case values are upper bounds, tighter with more tangents.
+
+    Attributes:
+        h (UpperBound): the function h.
+        tangents (list): the pairs (a, b) of the formulated tangents.
+
+    Example:
+        >>> from PEPit import PEP
+        >>> from code.tools.upper_bounds import make_upper_bound
+        >>> problem = PEP()
+        >>> func = problem.declare_function(function_class=ConvexHRGFunction,
+        ...                                 param={'h': make_upper_bound('sqrt', M=1), 'tangent_points': [.1, 1.]})
+
+    """
+
+    def __init__(self,
+                 param,
+                 is_leaf=True,
+                 decomposition_dict=None,
+                 reuse_gradient=False):
+        """
+
+        Args:
+            h (UpperBound): the function h.
+            tangent_points (list): the points z at which the tangents of h are formulated.
+            is_leaf (bool): True if self is defined from scratch.
+                            False is self is defined as linear combination of leaf.
+            decomposition_dict (dict): decomposition of self as linear combination of leaf :class:`Function` objects.
+                                       Keys are :class:`Function` objects and values are their associated coefficients.
+            reuse_gradient (bool): If True, the same subgradient is returned
+                                   when one requires it several times on the same :class:`Point`.
+                                   If False, a new subgradient is computed each time one is required.
+
+        """
+        super().__init__(is_leaf=is_leaf,
+                         decomposition_dict=decomposition_dict,
+                         reuse_gradient=reuse_gradient)
+
+        # Store h and its distinct tangents (a linear h has a single one)
+        self.h = param['h']
+        self.tangents = sorted({tuple(float(c) for c in self.h.tangent(z)) for z in param['tangent_points']})
+
+    def add_class_constraints(self):
+        """
+        Formulates the list of interpolation constraints for self (h-relatively upper bounded convex function).
+        """
+
+        for point_i in self.list_of_stationary_points:
+
+            xi, gi, fi = point_i
+
+            for point_j in self.list_of_points:
+
+                xj, gj, fj = point_j
+
+                if point_i != point_j:
+                    for a, b in self.tangents:
+                        # Interpolation conditions of the tangent a + b z of h
+                        self.add_constraint(fi + a - fj >= gj * (xi - xj) + 1 / (4 * b) * gj ** 2)
+
+        for i, point_i in enumerate(self.list_of_points):
+
+            xi, gi, fi = point_i
+
+            for j, point_j in enumerate(self.list_of_points):
+
+                xj, gj, fj = point_j
+
+                if i != j:
+                    # Interpolation conditions of convex functions class
+                    self.add_constraint(fi - fj >= gj * (xi - xj))
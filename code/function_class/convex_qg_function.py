@@ -1,5 +1,88 @@
+import numpy as np
+import scipy.sparse as sp
+
 from PEPit.function import Function
 
+from code.tools.coefficients import points_to_matrix, expressions_to_matrices, row_wise_outer
+
+
+def qg_convex_interpolation_pairs(nb_points, stationary_indices):
+    """
+    List the interpolation constraints of the class of QG^+ and convex functions (see :class:`ConvexQGFunction`)
+    in the order used by :meth:`ConvexQGFunction.add_class_constraints`:
+    first the QG^+ ones (:math:`x_i` stationary, any :math:`j \\neq i`), then the convexity ones (any :math:`i \\neq j`).
+
+    Args:
+        nb_points (int): number of triplets :math:`(x_i, g_i, f_i)`.
+        stationary_indices (list): indices i of the stationary points :math:`x_i`.
+
+    Returns:
+        pairs (ndarray): array of shape (nb_constraints, 2) containing the indices (i, j) of each constraint.
+        is_qg (ndarray): boolean array of shape (nb_constraints,), True for the QG^+ constraints.
+
+    """
+
+    # List the pairs (i, j) with i != j, i being the slowest index
+    i, j = np.divmod(np.arange(nb_points ** 2), nb_points)
+    convexity_pairs = np.stack([i, j], axis=1)[i != j]
+
+    # The QG+ constraints involve a stationary point x_i
+    qg_pairs = [convexity_pairs[convexity_pairs[:, 0] == index] for index in stationary_indices]
+
+    pairs = np.concatenate(qg_pairs + [convexity_pairs]).astype(int)
+    is_qg = np.arange(pairs.shape[0]) < pairs.shape[0] - convexity_pairs.shape[0]
+
+    return pairs, is_qg
+
+
+def qg_convex_interpolation_arrays(x_matrix, g_matrix, f_matrix, stationary_indices, L, rows=None):
+    """
+    Stack the interpolation constraints of the class of QG^+ and convex functions (see :class:`ConvexQGFunction`)
+    for all pairs of triplets :math:`(x_i, g_i, f_i)`, in the block inequality
+
+    .. math:: A_F F + A_G \\mathrm{vec}(G) \\leqslant 0.
+
+    The constraints are ordered as in :func:`qg_convex_interpolation_pairs`.
+
+    Args:
+        x_matrix (scipy.sparse matrix): coefficients of the points :math:`x_i` over the leaf basis,
+                                        of shape (nb_points, nb_leaves).
+        g_matrix (scipy.sparse matrix): coefficients of the (sub)gradients :math:`g_i` over the leaf basis,
+                                        of shape (nb_points, nb_leaves).
+        f_matrix (scipy.sparse matrix): coefficients of the function values :math:`f_i` over the vector F,
+                                        of shape (nb_points, nb_values).
+        stationary_indices (list): indices i of the stationary points :math:`x_i`.
+        L (float): The quadratic upper bound parameter.
+        rows (ndarray or None): if not None, indices (in the above order) of the only constraints to formulate.
+
+    Returns:
+        F_matrix (scipy.sparse.csr_matrix): coefficients A_F on F.
+        G_matrix (scipy.sparse.csr_matrix): coefficients A_G on vec(G) (column-major ordering).
+        pairs (ndarray): array of shape (nb_constraints, 2) containing the indices (i, j) of each constraint.
+
+    """
+
+    x_matrix = sp.csr_matrix(x_matrix)
+    g_matrix = sp.csr_matrix(g_matrix)
+    f_matrix = sp.csr_matrix(f_matrix)
+    nb_points, nb_leaves = x_matrix.shape
+
+    # List the pairs (i, j)
+    pairs, is_qg = qg_convex_interpolation_pairs(nb_points, stationary_indices)
+    if rows is not None:
+        pairs, is_qg = pairs[rows], is_qg[rows]
+    i, j = pairs[:, 0], pairs[:, 1]
+
+    # Interpolation conditions of convex functions class: fj - fi + gj * (xi - xj) <= 0
+    F_matrix = f_matrix[j] - f_matrix[i]
+    G_matrix = row_wise_outer(g_matrix[j], x_matrix[i] - x_matrix[j])
+
+    # Interpolation conditions of QG+ functions class: add 1 / (2L) * gj ** 2 when xi is stationary
+    qg_G_matrix = sp.diags(is_qg.astype(float)) @ row_wise_outer(g_matrix[j], g_matrix[j])
+    G_matrix = G_matrix + 1 / (2 * L) * qg_G_matrix
+
+    return F_matrix.tocsr(), G_matrix.tocsr(), pairs
+
 
 class ConvexQGFunction(Function):
     """
@@ -79,3 +162,46 @@ class ConvexQGFunction(Function):
                 if i != j:
                     # Interpolation conditions of convex functions class
                     self.add_constraint(fi - fj >= gj * (xi - xj))
+
+    def get_class_constraints_arrays(self, nb_leaves, nb_values):
+        """
+        Vectorized counterpart of `add_class_constraints`.
+        Formulates the same interpolation constraints, in the same order, but without creating any
+        :class:`Expression` object: all of them are stacked in the block inequality
+
+        .. math:: A_F F + A_G \\mathrm{vec}(G) + c \\leqslant 0,
+
+        where :math:`F` is the vector of leaf function values and :math:`G` the Gram matrix of leaf :class:`Point`
+        objects (see :func:`code.tools.coefficients.expressions_to_matrices` for the ordering of vec(G)).
+
+        Args:
+            nb_leaves (int): number of leaf :class:`Point` objects (typically `Point.counter`).
+            nb_values (int): number of leaf :class:`Expression` objects (typically `Expression.counter`).
+
+        Returns:
+            F_matrix (scipy.sparse.csr_matrix): coefficients A_F on F.
+            G_matrix (scipy.sparse.csr_matrix): coefficients A_G on vec(G).
+            constants (ndarray): constants c.
+            pairs (ndarray): array of shape (nb_constraints, 2) containing the indices (i, j),
+                             in `self.list_of_points`, of the two points involved in each constraint.
+
+        """
+
+        # Stack the coefficients of all the triplets
+        x_matrix = points_to_matrix([x for x, _, _ in self.list_of_points], nb_leaves)
+        g_matrix = points_to_matrix([g for _, g, _ in self.list_of_points], nb_leaves)
+        f_F_matrix, f_G_matrix, f_constants = expressions_to_matrices([f for _, _, f in self.list_of_points],
+                                                                      nb_leaves, nb_values)
+
+        # Stack the interpolation conditions of all pairs of triplets
+        stationary_indices = [i for i, point_i in enumerate(self.list_of_points)
+                              if any(point_i is point_s for point_s in self.list_of_stationary_points)]
+        F_matrix, G_matrix, pairs = qg_convex_interpolation_arrays(x_matrix, g_matrix, f_F_matrix,
+                                                                   stationary_indices, self.L)
+
+        # Function values may also involve inner products and constants
+        i, j = pairs[:, 0], pairs[:, 1]
+        G_matrix = G_matrix + f_G_matrix[j] - f_G_matrix[i]
+        constants = f_constants[j] - f_constants[i]
+
+        return F_matrix.tocsr(), G_matrix.tocsr(), constants, pairs
@@ -1,9 +1,109 @@
-from PEPit import PEP
+from functools import lru_cache
 
 from code.function_class import ConvexQGFunction
+from code.methods import Method, solve_method
+from code.tools import cached_worst_case, scale_invariant
+from code.sdp import ParameterizedPEP
+from code.sdp.step_size import locate_kink, optimize_step_size
 
 
-def wc_gradient_descent_qg_convex(L, gamma, n, verbose=1):
+def gradient_descent_steps(gamma, n):
+    """
+    Step-coefficient table (see :class:`code.sdp.CompiledPEP`) of **gradient descent** with fixed step-size
+    :math:`\\gamma`.
+
+    Args:
+        gamma (float): step-size.
+        n (int): number of iterations.
+
+    Returns:
+        steps (list): the step-coefficient table.
+
+    """
+
+    return [[0] * t + [gamma] for t in range(n)]
+
+
+@lru_cache(maxsize=None)
+def parameterized_gradient_descent_pep(n):
+    """
+    Compiled PEP of **gradient descent** with n iterations, in which the step-size and L are parameters
+    (see :class:`code.sdp.ParameterizedPEP`). It is compiled only once per value of n.
+
+    Args:
+        n (int): number of iterations.
+
+    Returns:
+        pep (ParameterizedPEP): the parameterized PEP.
+
+    """
+
+    return ParameterizedPEP(gradient_descent_steps(1, n))
+
+
+def theoretical_optimal_step_size(L, n):
+    """
+    Step-size minimizing the theoretical guarantee :math:`\\frac{L}{2}\\max{\\frac{1}{2n L \\gamma + 1}, L \\gamma}`
+    of **gradient descent**, i.e. where its two branches cross (found by bisection).
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        gamma (float): the step-size.
+        theoretical_tau (float): the theoretical guarantee with this step-size.
+
+    """
+
+    gamma = locate_kink(lambda x: L * x, lambda x: 1 / (2 * n * L * x + 1), lower=0, upper=1 / L)
+    return gamma, L ** 2 * gamma / 2
+
+
+def optimize_gradient_descent_step_size(L, n, verbose=1, **kwargs):
+    """
+    Worst-case-optimal step-size of **gradient descent** with n iterations, found by a scalar search over
+    the PEP compiled once for this horizon (see :func:`code.sdp.step_size.optimize_step_size`).
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+        verbose (int): Level of information details to print.
+                       -1: No verbose at all.
+                       0: This example's output.
+                       1: This example's output + information on each evaluation of the search.
+        kwargs: keyword arguments passed to :func:`code.sdp.step_size.optimize_step_size`
+                (e.g. xatol, use_cache, or the solver settings).
+
+    Returns:
+        gamma (float): the worst-case-optimal step-size.
+        pepit_tau (float): the worst-case value with this step-size.
+        trace (list): the evaluations of the search.
+
+    Example:
+        >>> gamma, pepit_tau, trace = optimize_gradient_descent_step_size(L=1, n=4, verbose=0)
+
+    """
+
+    gamma, pepit_tau, trace = optimize_step_size(parameterized_gradient_descent_pep(n), L=L,
+                                                 verbose=max(verbose, 0), **kwargs)
+
+    # Print conclusion if required
+    if verbose != -1:
+        theoretical_gamma, theoretical_tau = theoretical_optimal_step_size(L, n)
+        print('*** Example file: worst-case-optimal step-size of gradient descent ***')
+        print('\tPEP-it optimal step-size:\t gamma = {:.6} (f(x_n)-f_* <= {:.6} ||x_0 - x_*||^2)'.format(
+            gamma, pepit_tau))
+        print('\tTheoretical step-size:\t\t gamma = {:.6} (f(x_n)-f_* <= {:.6} ||x_0 - x_*||^2)'.format(
+            theoretical_gamma, theoretical_tau))
+
+    return gamma, pepit_tau, trace
+
+
+@scale_invariant(step_sizes=('gamma',))
+@cached_worst_case(ConvexQGFunction, title='worst-case performance of gradient descent with fixed step-sizes')
+def wc_gradient_descent_qg_convex(L, gamma, n, verbose=1, mode='pepit', solver='scs', use_cache=True,
+                                  scaling='canonical', ladder_rtol=1e-4):
     """
     Consider the convex minimization problem
 
@@ -52,6 +152,38 @@ def wc_gradient_descent_qg_convex(L, gamma, n, verbose=1):
                        0: This example's output.
                        1: This example's output + PEPit information.
                        2: This example's output + PEPit information + CVXPY details.
+        mode (str): How the PEP is assembled.
+                    'pepit': one PEPit constraint per interpolation inequality.
+                    'vectorized': interpolation inequalities stacked in a single block constraint
+                    (see :class:`code.tools.VectorizedPEP`), much faster to set up for large `n`.
+                    'compiled': SDP data built directly from the step-coefficient table of the method
+                    (see :class:`code.sdp.CompiledPEP`), bypassing PEPit and cvxpy.
+                    'ladder': compiled SDP solved with loose tolerances first, tightened only until the value
+                    is known to match the theoretical one up to `ladder_rtol`, or not
+                    (see :func:`code.sdp.solve_tolerance_ladder`).
+                    'certified': upper bound proven in exact rational arithmetic from a dual solution of moderate
+                    accuracy (see :func:`code.sdp.certify_upper_bound`), slightly larger than the worst-case value.
+                    'cutting_plane': compiled SDP whose interpolation constraints are generated lazily
+                    (see :func:`code.sdp.solve_cutting_plane`), keeping the SDP small for long horizons.
+                    'low_rank': compiled PEP solved over a low-rank factorization of its Gram matrix
+                    (see :class:`code.sdp.LowRankPEP`), without any SDP solver.
+                    'parameterized': compiled SDP in which gamma and L are parameters, compiled once per n
+                    (see :func:`parameterized_gradient_descent_pep`), for sweeps over step-sizes.
+        solver (str or list): SDP solver, tried first, the other installed ones being fallbacks
+                              if it does not report an accurate solution: 'scs', 'clarabel' or 'cvxopt'
+                              in the modes 'pepit' and 'vectorized', and 'scs', 'clarabel' or 'admm'
+                              (see :func:`code.sdp.solve_admm`) in the modes 'compiled', 'ladder',
+                              'certified', 'cutting_plane' and 'parameterized'.
+                              Can also be a list of solvers, tried in order without other fallback,
+                              or 'auto' to start with the fastest solver for this size of problem
+                              according to the solver log (see :class:`code.tools.SolverLog`).
+                              Ignored by the mode 'low_rank'.
+        use_cache (bool): whether to look for the worst-case value in the on-disk cache of solved PEPs
+                          (see :class:`code.tools.cache.PEPCache`) before solving, and to store it after.
+        scaling (str): 'canonical' to solve the normalized problem with L=1 and rescale its result
+                       (see :func:`code.tools.scaling.scale_invariant`), 'verify' to also solve the original
+                       problem and warn if the values differ, or 'none' to solve the original problem only.
+        ladder_rtol (float): relative tolerance of the comparison with the theoretical value in the mode 'ladder'.
 
     Returns:
         pepit_tau (float): worst-case value
@@ -74,36 +206,21 @@ def wc_gradient_descent_qg_convex(L, gamma, n, verbose=1):
 
     """
 
-    # Instantiate PEP
-    problem = PEP()
-
-    # Declare a strongly convex smooth function
-    func = problem.declare_function(ConvexQGFunction, param={'L': L})
-
-    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
-    xs = func.stationary_point()
-    fs = func.value(xs)
-
-    # Then define the starting point x0 of the algorithm
-    x0 = problem.set_initial_point()
-
-    # Set the initial constraint that is the distance between x0 and x^*
-    problem.set_initial_condition((x0 - xs) ** 2 <= 1)
-
-    # Run n steps of the GD method
-    x = x0
-    for i in range(n):
-        x = x - gamma * func.gradient(x)
-
-    # Set the performance metric to the function values accuracy
-    problem.set_performance_metric(func.value(x) - fs)
+    # Compute theoretical guarantee (for comparison, and as the reference of the mode 'ladder')
+    theoretical_tau = L / 2 * max(1 / (2 * n * L * gamma + 1), L * gamma)
 
-    # Solve the PEP
     pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(verbose=pepit_verbose)
-
-    # Compute theoretical guarantee (for comparison)
-    theoretical_tau = L / 2 * max(1 / (2 * n * L * gamma + 1), L * gamma)
+    if mode == 'parameterized':
+        # Update the parameters of the PEP compiled for this horizon, and solve it
+        pep = parameterized_gradient_descent_pep(n)
+        pep.set_parameters(gamma=gamma, L=L)
+        pepit_tau = pep.solve(verbose=pepit_verbose, solver=solver)
+
+    else:
+        # Describe GD by its coefficients and solve its PEP
+        pepit_tau = solve_method(Method(gradient_descent_steps(gamma, n), name='gradient descent'), L, mode=mode,
+                                 solver=solver, verbose=pepit_verbose, reference=theoretical_tau,
+                                 ladder_rtol=ladder_rtol)
 
     # Print conclusion if required
     if verbose != -1:
@@ -2,12 +2,58 @@ from math import sqrt
 import numpy as np
 import matplotlib.pyplot as plt
 
-from PEPit import PEP
-
 from code.function_class import ConvexQGFunction
+from code.methods import Method, solve_method
+from code.tools import cached_worst_case, scale_invariant
+from code.sdp import solve_horizons
+
+
+def decreasing_step_sizes(L, n):
+    """
+    Compute the decreasing step-sizes :math:`\\gamma_t = \\frac{1}{L u_{t+1}}` for :math:`t < n`,
+    where :math:`u_0 = 1` and :math:`u_{t+1} = \\frac{u_t}{2} + \\sqrt{\\left(\\frac{u_t}{2}\\right)^2 + 2}`.
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        gammas (list): the n step-sizes.
+        u (float): the last element :math:`u_n` of the sequence.
 
+    """
+
+    u = 1
+    gammas = list()
+    for i in range(n):
+        u = u / 2 + sqrt((u / 2) ** 2 + 2)
+        gammas.append(1 / (L * u))
 
-def wc_gradient_descent_qg_convex_decreasing(L, n, verbose=1):
+    return gammas, u
+
+
+def gradient_descent_decreasing_steps(L, n):
+    """
+    Step-coefficient table (see :class:`code.sdp.CompiledPEP`) of **gradient descent** with decreasing step-sizes
+    (see :func:`decreasing_step_sizes`).
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        steps (list): the step-coefficient table.
+
+    """
+
+    gammas, _ = decreasing_step_sizes(L, n)
+    return [[0] * t + [gammas[t]] for t in range(n)]
+
+
+@scale_invariant()
+@cached_worst_case(ConvexQGFunction, title='worst-case performance of gradient descent with fixed step-sizes')
+def wc_gradient_descent_qg_convex_decreasing(L, n, verbose=1, mode='pepit', solver='scs', use_cache=True,
+                                             scaling='canonical', ladder_rtol=1e-4):
     """
     Consider the convex minimization problem
 
@@ -73,6 +119,36 @@ def wc_gradient_descent_qg_convex_decreasing(L, n, verbose=1):
                        0: This example's output.
                        1: This example's output + PEPit information.
                        2: This example's output + PEPit information + CVXPY details.
+        mode (str): How the PEP is assembled.
+                    'pepit': one PEPit constraint per interpolation inequality.
+                    'vectorized': interpolation inequalities stacked in a single block constraint
+                    (see :class:`code.tools.VectorizedPEP`), much faster to set up for large `n`.
+                    'compiled': SDP data built directly from the step-coefficient table of the method
+                    (see :class:`code.sdp.CompiledPEP`), bypassing PEPit and cvxpy.
+                    'ladder': compiled SDP solved with loose tolerances first, tightened only until the value
+                    is known to match the theoretical one up to `ladder_rtol`, or not
+                    (see :func:`code.sdp.solve_tolerance_ladder`).
+                    'certified': upper bound proven in exact rational arithmetic from a dual solution of moderate
+                    accuracy (see :func:`code.sdp.certify_upper_bound`), slightly larger than the worst-case value.
+                    'cutting_plane': compiled SDP whose interpolation constraints are generated lazily
+                    (see :func:`code.sdp.solve_cutting_plane`), keeping the SDP small for long horizons.
+                    'low_rank': compiled PEP solved over a low-rank factorization of its Gram matrix
+                    (see :class:`code.sdp.LowRankPEP`), without any SDP solver.
+        solver (str or list): SDP solver, tried first, the other installed ones being fallbacks
+                              if it does not report an accurate solution: 'scs', 'clarabel' or 'cvxopt'
+                              in the modes 'pepit' and 'vectorized', and 'scs', 'clarabel' or 'admm'
+                              (see :func:`code.sdp.solve_admm`) in the modes 'compiled', 'ladder',
+                              'certified' and 'cutting_plane'.
+                              Can also be a list of solvers, tried in order without other fallback,
+                              or 'auto' to start with the fastest solver for this size of problem
+                              according to the solver log (see :class:`code.tools.SolverLog`).
+                              Ignored by the mode 'low_rank'.
+        use_cache (bool): whether to look for the worst-case value in the on-disk cache of solved PEPs
+                          (see :class:`code.tools.cache.PEPCache`) before solving, and to store it after.
+        scaling (str): 'canonical' to solve the normalized problem with L=1 and rescale its result
+                       (see :func:`code.tools.scaling.scale_invariant`), 'verify' to also solve the original
+                       problem and warn if the values differ, or 'none' to solve the original problem only.
+        ladder_rtol (float): relative tolerance of the comparison with the theoretical value in the mode 'ladder'.
 
     Returns:
         pepit_tau (float): worst-case value
@@ -94,41 +170,16 @@ def wc_gradient_descent_qg_convex_decreasing(L, n, verbose=1):
 
     """
 
-    # Instantiate PEP
-    problem = PEP()
-
-    # Declare a strongly convex smooth function
-    func = problem.declare_function(ConvexQGFunction, param={'L': L})
+    # Compute the last element u_n of the sequence defining the step-sizes
+    _, u = decreasing_step_sizes(L, n)
 
-    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
-    xs = func.stationary_point()
-    fs = func.value(xs)
-
-    # Then define the starting point x0 of the algorithm
-    x = problem.set_initial_point()
-    g, f = func.oracle(x)
-
-    # Set the initial constraint that is the distance between x0 and x^*
-    problem.set_initial_condition((x - xs) ** 2 <= 1)
-
-    # GD loop
-    u = 1
-    for i in range(n):
-        # Run 1 step of the GD method and update u accordingly.
-        u = u / 2 + sqrt((u / 2) ** 2 + 2)
-        gamma = 1 / (L * u)
-        x = x - gamma * g
-        g, f = func.oracle(x)
-
-    # Compute theoretical guarantee (for comparison)
+    # Compute theoretical guarantee (for comparison, and as the reference of the mode 'ladder')
     theoretical_tau = L / (2 * u)
 
-    # Set the performance metric to the function values accuracy
-    problem.set_performance_metric((f - fs))
-
-    # Solve the PEP
-    pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(verbose=pepit_verbose)
+    # Describe GD by its coefficients and solve its PEP
+    method = Method(gradient_descent_decreasing_steps(L, n), name='gradient descent with decreasing step-sizes')
+    pepit_tau = solve_method(method, L, mode=mode, solver=solver, verbose=max(verbose, 0), reference=theoretical_tau,
+                             ladder_rtol=ladder_rtol)
 
     # Print conclusion if required
     if verbose != -1:
@@ -144,12 +195,13 @@ if __name__ == "__main__":
 
     L = 1
     n_list = np.arange(1, 20)
-    pepit_taus = list()
-    th_taus = list()
-    for n in n_list:
-        pepit_tau, theoretical_tau = wc_gradient_descent_qg_convex_decreasing(L=L, n=n, verbose=-1)
-        pepit_taus.append(pepit_tau)
-        th_taus.append(theoretical_tau)
+
+    # Solve the compiled PEPs for increasing n, each one being extended from the previous one
+    # and warm-started from its solution
+    pepit_taus, history = solve_horizons(lambda n: gradient_descent_decreasing_steps(L, n), L, n_list,
+                                         incremental=True, verbose=1)
+    th_taus = [L / (2 * decreasing_step_sizes(L, n)[1]) for n in n_list]
+    print('Total SCS iterations: {}'.format(sum(record['iterations'] for record in history)))
 
     plt.figure(figsize=(16, 8))
     plt.plot(n_list, pepit_taus, '-x')
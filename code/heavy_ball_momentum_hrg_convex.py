@@ -0,0 +1,198 @@
+import numpy as np
+from PEPit import PEP
+from scipy.optimize import minimize
+
+from code.function_class import ConvexHRGFunction
+from code.tools import solve_pepit_problem
+from code.tools.upper_bounds import UpperBound, make_upper_bound
+
+
+def relative_step_sizes(h, levels):
+    """
+    Step-sizes :math:`\\alpha_t = \\frac{1}{2 (t+2) h'(h^{-1}(\\delta_t))}` of the **Heavy-ball (HB)** method for
+    h-RG^+ convex functions (see :func:`code.optimizers.relative_heavy_ball`), when the gaps
+    :math:`f(x_t) - f_\\star` are the levels :math:`\\delta_t`.
+
+    Args:
+        h (UpperBound): the function h.
+        levels (list): the n levels :math:`\\delta_t`.
+
+    Returns:
+        alphas (list): the n step-sizes.
+
+    """
+
+    return [1 / (2 * (t + 2) * h.derivative(h.inverse(level))) for t, level in enumerate(levels)]
+
+
+def wc_heavy_ball_momentum_hrg_convex_levels(h, levels, distance=1., tangent_points=None, verbose=1, solver='scs'):
+    """
+    Worst-case value of :math:`f(x_n) - f_\\star` for the **Heavy-ball (HB)** method with step-sizes adapted to the
+    gaps (see :func:`relative_step_sizes`), over the h-RG^+ convex functions with
+    :math:`\\|x_0 - x_\\star\\| \\leqslant` `distance` whose gaps :math:`f(x_t) - f_\\star` are the given levels.
+    The levels being fixed, so are the step-sizes, and the PEP is a linear SDP.
+
+    Args:
+        h (UpperBound): the function h.
+        levels (list): the n levels :math:`\\delta_t = f(x_t) - f_\\star`, for t < n.
+        distance (float): the bound on :math:`\\|x_0 - x_\\star\\|`.
+        tangent_points (list or None): points z at which the tangents of h are formulated
+                                       (see :class:`code.function_class.ConvexHRGFunction`).
+                                       Defaults to a geometric grid of 20 points in
+                                       :math:`[10^{-3}, 4] \\times \\text{distance}^2`.
+        verbose (int): Level of information details to print (0 or 1).
+        solver (str or list): SDP solver(s) (see :func:`code.tools.solve_pepit_problem`).
+
+    Returns:
+        pepit_tau (float): the worst-case value (-inf if no function has these levels).
+
+    """
+
+    if tangent_points is None:
+        tangent_points = distance ** 2 * np.geomspace(1e-3, 4, 20)
+    n = len(levels)
+    alphas = relative_step_sizes(h, levels)
+
+    # Instantiate PEP
+    problem = PEP()
+
+    # Declare an h-RG+ convex function
+    func = problem.declare_function(ConvexHRGFunction, param={'h': h, 'tangent_points': tangent_points})
+
+    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
+    xs = func.stationary_point()
+    fs = func.value(xs)
+
+    # Then define the starting point x0 of the algorithm
+    x0 = problem.set_initial_point()
+
+    # Set the initial constraint that is the distance between x0 and x_*
+    problem.set_initial_condition((x0 - xs) ** 2 <= distance ** 2)
+
+    # Run n steps of HB, the gaps being the given levels
+    x_new = x0
+    x_old = x0
+    for t in range(n):
+        g, f = func.oracle(x_new)
+        problem.set_initial_condition(f - fs == levels[t])
+        x_next = x_new - alphas[t] * g + t / (t + 2) * (x_new - x_old)
+        x_old = x_new
+        x_new = x_next
+
+    # Set the performance metric to the function values accuracy
+    problem.set_performance_metric(func.value(x_new) - fs)
+
+    # Levels that no function attains make the SDP infeasible
+    try:
+        pepit_tau, _ = solve_pepit_problem(problem, solver=solver, verbose=verbose, description='hrg')
+    except RuntimeError:
+        return - np.inf
+    if pepit_tau is None or not np.isfinite(pepit_tau):
+        return - np.inf
+
+    return pepit_tau
+
+
+def wc_heavy_ball_momentum_hrg_convex(h, n, distance=1., tangent_points=None, max_evaluations=100, verbose=1,
+                                      solver='scs'):
+    """
+    Consider the convex minimization problem
+
+    .. math:: f_\\star \\triangleq \\min_x f(x),
+
+    where :math:`f` is h-RG^+ and convex, i.e. :math:`f(x) - f_\\star \\leqslant h(\\|x - x_\\star\\|^2)`
+    for a concave increasing h (see :class:`code.tools.upper_bounds.UpperBound`).
+
+    This code estimates the worst-case value of :math:`f(x_n) - f_\\star` when
+    :math:`\\|x_0 - x_\\star\\| \\leqslant` `distance`, for the **Heavy-ball (HB)** method with step-sizes adapted
+    to the gaps.
+    As the step-sizes depend on the function values, the PEP is not a linear SDP: it is solved for fixed levels
+    of the gaps (see :func:`wc_heavy_ball_momentum_hrg_convex_levels`), and the levels are searched by
+    Nelder-Mead. The result is the largest worst-case value over the levels visited by this local search:
+    it is neither the worst case over all the levels, which the search may miss, nor an upper bound on it,
+    the worst-case value at fixed levels being itself only an upper bound over the relaxed class
+    (see :class:`code.function_class.ConvexHRGFunction`).
+
+    **Algorithm**:
+
+        .. math:: x_{t+1} = x_t - \\alpha_t \\nabla f(x_t) + \\beta_t (x_t-x_{t-1})
+
+        with
+
+        .. math:: \\alpha_t = \\frac{1}{2 (t+2) h'(h^{-1}(f(x_t) - f_\\star))}
+
+        and
+
+        .. math:: \\beta_t = \\frac{t}{t+2}
+
+    **Reference value**:
+
+        .. math:: h\\left(\\frac{\\|x_0 - x_\\star\\|^2}{n+1}\\right),
+
+        which is the tight guarantee of :func:`code.heavy_ball_momentum_qg_convex.wc_heavy_ball_momentum_qg_convex`
+        for :math:`h(z) = \\frac{L}{2} z`.
+
+    Args:
+        h (UpperBound or str): the function h, or the name of a registered one with unit parameters
+                               (see :func:`code.tools.upper_bounds.make_upper_bound`).
+        n (int): number of iterations.
+        distance (float): the bound on :math:`\\|x_0 - x_\\star\\|`.
+        tangent_points (list or None): points z at which the tangents of h are formulated.
+        max_evaluations (int): maximal number of PEPs solved by the search over the levels.
+        verbose (int): Level of information details to print.
+                       -1: No verbose at all.
+                       0: This example's output.
+                       1: This example's output + the value of each PEP solved.
+                       2: This example's output + the value of each PEP solved + PEPit information.
+        solver (str or list): SDP solver(s) (see :func:`code.tools.solve_pepit_problem`).
+
+    Returns:
+        pepit_tau (float): largest value found by the search over the levels (not a guarantee)
+        theoretical_tau (float): reference value
+
+    Example:
+        >>> pepit_tau, theoretical_tau = wc_heavy_ball_momentum_hrg_convex('sqrt', n=2, verbose=0)
+
+    """
+
+    if not isinstance(h, UpperBound):
+        h = make_upper_bound(h, **{'quadratic': {'L': 1}, 'sqrt': {'M': 1},
+                                   'sqrt_quadratic': {'M': 1, 'L': 1}}.get(h, {}))
+
+    # Compute the reference value
+    theoretical_tau = h(distance ** 2 / (n + 1))
+
+    # Search the levels of the gaps (in logarithmic scale), starting from the reference values
+    best = {'pepit_tau': - np.inf}
+
+    def negative_worst_case(log_levels):
+        levels = np.exp(log_levels)
+        pepit_tau = wc_heavy_ball_momentum_hrg_convex_levels(h, levels, distance=distance,
+                                                             tangent_points=tangent_points,
+                                                             verbose=max(verbose - 1, 0), solver=solver)
+        if pepit_tau > best['pepit_tau']:
+            best['pepit_tau'] = pepit_tau
+        if verbose > 0:
+            print('(PEP h-RG+) levels {}: worst-case value {}'.format(np.round(levels, 6), pepit_tau))
+        return - pepit_tau if np.isfinite(pepit_tau) else np.inf
+
+    initial_levels = [h(distance ** 2 / (t + 1)) / 2 for t in range(n)]
+    minimize(negative_worst_case, np.log(initial_levels), method='Nelder-Mead',
+             options={'maxfev': max_evaluations, 'xatol': 1e-3, 'fatol': 1e-6})
+    pepit_tau = best['pepit_tau']
+
+    # Print conclusion if required
+    if verbose != -1:
+        print('*** Example file: worst-case performance of the Heavy-Ball method for h-RG+ convex functions ***')
+        print('\th = {}, ||x_0 - x_*|| <= {}, n = {}'.format(h.name, distance, n))
+        print('\tPEP-it largest value found (over the levels searched):\t f(x_n)-f_* = {:.6}'.format(pepit_tau))
+        print('\tReference value h(||x_0 - x_*||^2 / (n+1)):\t {:.6}'.format(theoretical_tau))
+
+    # Return the largest value found (and the reference value)
+    return pepit_tau, theoretical_tau
+
+
+if __name__ == "__main__":
+
+    for name in ['quadratic', 'sqrt', 'sqrt_quadratic']:
+        pepit_tau, theoretical_tau = wc_heavy_ball_momentum_hrg_convex(name, n=2, verbose=0)
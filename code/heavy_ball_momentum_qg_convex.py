@@ -1,9 +1,59 @@
-from PEPit import PEP
-
 from code.function_class import ConvexQGFunction
+from code.methods import Method, solve_method
+from code.tools import cached_worst_case, scale_invariant
+
+
+def heavy_ball_momentum_method(L, n):
+    """
+    Description (see :class:`code.methods.Method`) of the **Heavy-ball (HB)** method
+    :math:`x_{t+1} = (1 + \\beta_t) x_t - \\beta_t x_{t-1} - \\alpha_t \\nabla f(x_t)`,
+    with :math:`\\alpha_t = \\frac{1}{L} \\frac{1}{t+2}` and :math:`\\beta_t = \\frac{t}{t+2}`.
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        method (Method): the method.
 
+    """
+
+    gradient_coefficients = [[0] * t + [1 / (L * (t+2))] for t in range(n)]
+    iterate_coefficients = [[0] * (t-1) + [- t / (t+2), 1 + t / (t+2)] if t else [1] for t in range(n)]
+
+    return Method(gradient_coefficients, iterate_coefficients, name='Heavy-ball method')
 
-def wc_heavy_ball_momentum_qg_convex(L, n, verbose=1):
+
+def heavy_ball_momentum_steps(L, n):
+    """
+    Step-coefficient table (see :class:`code.sdp.CompiledPEP`) of the **Heavy-ball (HB)** method
+    with :math:`\\alpha_t = \\frac{1}{L} \\frac{1}{t+2}` and :math:`\\beta_t = \\frac{t}{t+2}`.
+    The momentum term :math:`\\beta_t (x_t - x_{t-1})` is unrolled over the previous gradients.
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        steps (list): the step-coefficient table.
+
+    """
+
+    steps = list()
+    previous_row = list()
+    for t in range(n):
+        # x_{t+1} - x_t = - alpha_t g_t + beta_t (x_t - x_{t-1})
+        row = [t / (t+2) * h for h in previous_row] + [1 / (L * (t+2))]
+        steps.append(row)
+        previous_row = row
+
+    return steps
+
+
+@scale_invariant()
+@cached_worst_case(ConvexQGFunction, title='worst-case performance of the Heavy-Ball method')
+def wc_heavy_ball_momentum_qg_convex(L, n, verbose=1, mode='pepit', solver='scs', use_cache=True,
+                                     scaling='canonical', ladder_rtol=1e-4):
     """
     Consider the convex minimization problem
 
@@ -63,6 +113,36 @@ def wc_heavy_ball_momentum_qg_convex(L, n, verbose=1):
                        0: This example's output.
                        1: This example's output + PEPit information.
                        2: This example's output + PEPit information + CVXPY details.
+        mode (str): How the PEP is assembled.
+                    'pepit': one PEPit constraint per interpolation inequality.
+                    'vectorized': interpolation inequalities stacked in a single block constraint
+                    (see :class:`code.tools.VectorizedPEP`), much faster to set up for large `n`.
+                    'compiled': SDP data built directly from the step-coefficient table of the method
+                    (see :class:`code.sdp.CompiledPEP`), bypassing PEPit and cvxpy.
+                    'ladder': compiled SDP solved with loose tolerances first, tightened only until the value
+                    is known to match the theoretical one up to `ladder_rtol`, or not
+                    (see :func:`code.sdp.solve_tolerance_ladder`).
+                    'certified': upper bound proven in exact rational arithmetic from a dual solution of moderate
+                    accuracy (see :func:`code.sdp.certify_upper_bound`), slightly larger than the worst-case value.
+                    'cutting_plane': compiled SDP whose interpolation constraints are generated lazily
+                    (see :func:`code.sdp.solve_cutting_plane`), keeping the SDP small for long horizons.
+                    'low_rank': compiled PEP solved over a low-rank factorization of its Gram matrix
+                    (see :class:`code.sdp.LowRankPEP`), without any SDP solver.
+        solver (str or list): SDP solver, tried first, the other installed ones being fallbacks
+                              if it does not report an accurate solution: 'scs', 'clarabel' or 'cvxopt'
+                              in the modes 'pepit' and 'vectorized', and 'scs', 'clarabel' or 'admm'
+                              (see :func:`code.sdp.solve_admm`) in the modes 'compiled', 'ladder',
+                              'certified' and 'cutting_plane'.
+                              Can also be a list of solvers, tried in order without other fallback,
+                              or 'auto' to start with the fastest solver for this size of problem
+                              according to the solver log (see :class:`code.tools.SolverLog`).
+                              Ignored by the mode 'low_rank'.
+        use_cache (bool): whether to look for the worst-case value in the on-disk cache of solved PEPs
+                          (see :class:`code.tools.cache.PEPCache`) before solving, and to store it after.
+        scaling (str): 'canonical' to solve the normalized problem with L=1 and rescale its result
+                       (see :func:`code.tools.scaling.scale_invariant`), 'verify' to also solve the original
+                       problem and warn if the values differ, or 'none' to solve the original problem only.
+        ladder_rtol (float): relative tolerance of the comparison with the theoretical value in the mode 'ladder'.
 
     Returns:
         pepit_tau (float): worst-case value
@@ -70,56 +150,27 @@ def wc_heavy_ball_momentum_qg_convex(L, n, verbose=1):
 
     Example:
         >>> pepit_tau, theoretical_tau = wc_heavy_ball_momentum_qg_convex(L=1, n=5, verbose=1)
-        (PEP-it) Setting up the problem: size of the main PSD matrix: 9x9
-        (PEP-it) Setting up the problem: performance measure is minimum of 1 element(s)
-        (PEP-it) Setting up the problem: initial conditions (1 constraint(s) added)
-        (PEP-it) Setting up the problem: interpolation conditions for 1 function(s)
-                 function 1 : 63 constraint(s) added
-        (PEP-it) Compiling SDP
-        (PEP-it) Calling SDP solver
-        (PEP-it) Solver status: optimal (solver: SCS); optimal value: 0.08333167067320212
+        (PEPit) Setting up the problem: size of the main PSD matrix: 8x8
+        (PEPit) Setting up the problem: performance measure is minimum of 1 element(s)
+        (PEPit) Setting up the problem: initial conditions (1 constraint(s) added)
+        (PEPit) Setting up the problem: interpolation conditions for 1 function(s)
+                 function 1 : 48 constraint(s) added
+        (PEPit) Compiling SDP
+        (PEPit) Calling SDP solver
+        (PEPit) Solver status: optimal (solver: SCS); optimal value: 0.08333159702566764
         *** Example file: worst-case performance of the Heavy-Ball method ***
-            PEP-it guarantee:		 f(x_n)-f_* <= 0.0833317 ||x_0 - x_*||^2
+            PEP-it guarantee:		 f(x_n)-f_* <= 0.0833316 ||x_0 - x_*||^2
             Theoretical guarantee:	 f(x_n)-f_* <= 0.0833333 ||x_0 - x_*||^2
 
     """
 
-    # Instantiate PEP
-    problem = PEP()
-
-    # Declare a smooth strongly convex function
-    func = problem.declare_function(ConvexQGFunction, param={'L': L})
-
-    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
-    xs = func.stationary_point()
-    fs = func.value(xs)
-
-    # Then define the starting point x0 of the algorithm as well as corresponding function value f0
-    x0 = problem.set_initial_point()
-    f0 = func.value(x0)
-
-    # Set the initial constraint that is the distance between f(x0) and f(x^*)
-    problem.set_initial_condition((x0 - xs) ** 2 <= 1)
-
-    # Run one step of the heavy ball method
-    x_new = x0
-    x_old = x0
-
-    for t in range(n):
-        x_next = x_new - 1 / (L * (t+2)) * func.gradient(x_new) + t / (t+2) * (x_new - x_old)
-        x_old = x_new
-        x_new = x_next
-
-    # Set the performance metric to the final distance to optimum
-    problem.set_performance_metric(func.value(x_new) - fs)
-
-    # Solve the PEP
-    pepit_verbose = max(verbose, 0)
-    pepit_tau = problem.solve(verbose=pepit_verbose)
-
-    # Compute theoretical guarantee (for comparison)
+    # Compute theoretical guarantee (for comparison, and as the reference of the mode 'ladder')
     theoretical_tau = L / (2 * (n+1))
 
+    # Describe HB by its coefficients and solve its PEP
+    pepit_tau = solve_method(heavy_ball_momentum_method(L, n), L, mode=mode, solver=solver, verbose=max(verbose, 0),
+                             reference=theoretical_tau, ladder_rtol=ladder_rtol)
+
     # Print conclusion if required
     if verbose != -1:
         print('*** Example file: worst-case performance of the Heavy-Ball method ***')
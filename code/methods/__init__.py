@@ -0,0 +1,6 @@
+from .method import Method
+from .builder import build_pepit_problem, solve_method
+
+__all__ = ['method', 'Method',
+           'builder', 'build_pepit_problem', 'solve_method',
+           ]
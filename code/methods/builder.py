@@ -0,0 +1,133 @@
+import warnings
+
+from PEPit import PEP
+
+from code.function_class import ConvexQGFunction
+from code.tools import VectorizedPEP, solve_pepit_problem
+from code.tools.cache import report_solve
+from code.sdp import CompiledPEP, LowRankPEP, certify_upper_bound, solve_cutting_plane, solve_tolerance_ladder
+
+# Formulations of the PEP of a :class:`code.methods.Method` (see :func:`solve_method`)
+PEPIT_MODES = ['pepit', 'vectorized']
+COMPILED_MODES = ['compiled', 'ladder', 'certified', 'cutting_plane', 'low_rank']
+
+
+def build_pepit_problem(method, L, mode='pepit'):
+    """
+    Build the PEPit problem computing the worst-case value of :math:`f(x_n) - f_\\star`
+    over the :math:`L-\\text{QG}^+` convex functions, when :math:`\\|x_0 - x_\\star\\|^2 \\leqslant 1`.
+
+    Args:
+        method (Method): the method.
+        L (float): the quadratic growth parameter.
+        mode (str): 'pepit' for a :class:`PEPit.PEP`, or 'vectorized' for a :class:`code.tools.VectorizedPEP`.
+
+    Returns:
+        problem (PEP): the problem, ready to be solved.
+
+    """
+
+    # Instantiate PEP
+    if mode == 'pepit':
+        problem = PEP()
+    elif mode == 'vectorized':
+        problem = VectorizedPEP()
+    else:
+        raise ValueError("mode must be either 'pepit' or 'vectorized'. Got {}".format(mode))
+
+    # Declare a QG+ convex function
+    func = problem.declare_function(ConvexQGFunction, param={'L': L})
+
+    # Start by defining its unique optimal point xs = x_* and corresponding function value fs = f_*
+    xs = func.stationary_point()
+    fs = func.value(xs)
+
+    # Then define the starting point x0 of the algorithm
+    x0 = problem.set_initial_point()
+
+    # Set the initial constraint that is the distance between x0 and x_*
+    problem.set_initial_condition((x0 - xs) ** 2 <= 1)
+
+    # Run the n steps of the method
+    _, f = method.run(func, x0)
+
+    # Set the performance metric to the function values accuracy
+    problem.set_performance_metric(f - fs)
+
+    return problem
+
+
+def solve_method(method, L, mode='pepit', solver='scs', verbose=1, reference=None, ladder_rtol=1e-4):
+    """
+    Compute the worst-case value :math:`\\tau` of the guarantee :math:`f(x_n) - f_\\star \\leqslant \\tau
+    \\|x_0 - x_\\star\\|^2` of a method on :math:`L-\\text{QG}^+` convex functions, with any formulation of its PEP.
+    This is the shared body of the `wc_*` functions: describing a new method as a :class:`Method`
+    gives it all the formulations at once.
+
+    Args:
+        method (Method): the method.
+        L (float): the quadratic growth parameter.
+        mode (str): How the PEP is assembled.
+                    'pepit': one PEPit constraint per interpolation inequality.
+                    'vectorized': interpolation inequalities stacked in a single block constraint
+                    (see :class:`code.tools.VectorizedPEP`).
+                    'compiled': SDP data built directly from the step-coefficient table of the method
+                    (see :class:`code.sdp.CompiledPEP`).
+                    'ladder': compiled SDP solved with tolerances tightened only until the value is known
+                    to match `reference` up to `ladder_rtol`, or not (see :func:`code.sdp.solve_tolerance_ladder`);
+                    the verdict is stored as the status of the cache entry, and an undecided one raises a warning.
+                    'certified': upper bound proven in exact rational arithmetic
+                    (see :func:`code.sdp.certify_upper_bound`), for methods without exact span searches.
+                    'cutting_plane': compiled SDP whose interpolation constraints are generated lazily
+                    (see :func:`code.sdp.solve_cutting_plane`).
+                    'low_rank': compiled PEP solved over a low-rank factorization of its Gram matrix
+                    (see :class:`code.sdp.LowRankPEP`).
+        solver (str or list): SDP solver(s) (see the `wc_*` functions). Ignored by the mode 'low_rank'.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        reference (float or None): the reference value of the mode 'ladder' (e.g. the theoretical guarantee).
+        ladder_rtol (float): relative tolerance of the comparison with `reference` in the mode 'ladder'.
+
+    Returns:
+        pepit_tau (float): worst-case value.
+
+    Example:
+        >>> from code.methods import Method
+        >>> pepit_tau = solve_method(Method([[0] * t + [.2] for t in range(4)]), L=1, mode='compiled', verbose=0)
+
+    """
+
+    if mode in PEPIT_MODES:
+        problem = build_pepit_problem(method, L, mode=mode)
+        pepit_tau, _ = solve_pepit_problem(problem, solver=solver, verbose=verbose, description=mode)
+        return pepit_tau
+
+    if mode not in COMPILED_MODES:
+        raise ValueError("mode must be either 'pepit', 'vectorized', 'compiled', 'ladder', 'certified',"
+                         " 'cutting_plane' or 'low_rank'. Got {}".format(mode))
+
+    # Describe the method by its step-coefficient table and solve the compiled PEP
+    steps = method.steps
+    if mode == 'compiled':
+        pepit_tau = CompiledPEP(steps, L).solve(verbose=verbose, solver=solver)
+    elif mode == 'ladder':
+        if reference is None:
+            raise ValueError("The mode 'ladder' requires a reference value")
+        pepit_tau, verdict, _ = solve_tolerance_ladder(CompiledPEP(steps, L), reference, rtol=ladder_rtol,
+                                                       verbose=verbose, solver=solver)
+        if verdict == 'undecided':
+            warnings.warn('The tolerance ladder could not decide whether {} (n={}) matches the reference {}'.format(
+                method.name or 'the method', method.n, reference))
+        report_solve(status=verdict)
+    elif mode == 'certified':
+        tau, verified, _ = certify_upper_bound(steps, L, verbose=verbose, solver=solver)
+        if not verified:
+            warnings.warn('The upper bound {} of {} (n={}) could not be proven'.format(
+                float(tau), method.name or 'the method', method.n))
+        report_solve(status='certified' if verified else 'unverified')
+        pepit_tau = float(tau)
+    elif mode == 'cutting_plane':
+        pepit_tau, _, _ = solve_cutting_plane(steps, L, verbose=verbose, solver=solver)
+    else:
+        pepit_tau = LowRankPEP(steps, L).solve(verbose=verbose)
+
+    return pepit_tau
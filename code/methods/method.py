@@ -0,0 +1,184 @@
+import numpy as np
+from PEPit.primitive_steps import exact_linesearch_step
+
+from code.tools.dense import DenseOracle, stack_points
+
+
+def _lower_triangular_rows(coefficients, n, offset, name):
+    """
+    Normalize lower-triangular coefficients, given either as a list of rows (row t containing t + offset
+    coefficients, or None) or as a dense matrix, into a list of rows of floats (or None).
+    """
+
+    rows = list()
+    for t in range(n):
+        row = coefficients[t]
+        if row is None:
+            rows.append(None)
+            continue
+        row = np.asarray(row, dtype=float)
+        if row.size > t + offset and np.any(row[t + offset:] != 0):
+            raise ValueError('{}[{}] has nonzero coefficients above the diagonal'.format(name, t))
+        row = np.concatenate([row[:t + offset], np.zeros(max(t + offset - row.size, 0))])
+        rows.append([float(coefficient) for coefficient in row])
+
+    return rows
+
+
+class Method(object):
+    """
+    The :class:`Method` class describes a first-order method by its coefficients only:
+
+    .. math:: x_{t+1} = \\sum_{k \\leqslant t} m_{t, k} x_k - \\sum_{k \\leqslant t} h_{t, k} \\nabla f(x_k),
+
+    where :math:`\\sum_k m_{t, k} = 1`, or, for the exact span searches,
+
+    .. math:: x_{t+1} = \\arg\\min_x f(x) \\text{ over }
+              x_t + \\text{span}\\{\\nabla f(x_k), x_{k+1} - x_k\\}_{k \\leqslant t}
+
+    (the exact span search of the conjugate gradient method).
+    The same description feeds every formulation of its PEP (see :func:`code.methods.solve_method`):
+    PEPit, by running the method on PEPit points (see :meth:`run`), and the compiled ones,
+    through its step-coefficient table (see :attr:`steps` and :class:`code.sdp.CompiledPEP`).
+
+    Attributes:
+        gradient_coefficients (list): the rows :math:`(h_{t, k})_{k \\leqslant t}` (None for a search).
+        iterate_coefficients (list): the rows :math:`(m_{t, k})_{k \\leqslant t}` (None for a search).
+        name (str or None): name of the method.
+
+    Example:
+        >>> L, n = 1, 5
+        >>> gd = Method([[0] * t + [1 / L] for t in range(n)], name='gradient descent')
+        >>> cg = Method([None] * n, name='conjugate gradient')
+        >>> hb = Method(gradient_coefficients=[[0] * t + [1 / (L * (t + 2))] for t in range(n)],
+        ...             iterate_coefficients=[[0] * (t - 1) + [- t / (t + 2), 1 + t / (t + 2)] if t else [1]
+        ...                                   for t in range(n)])
+
+    """
+
+    def __init__(self, gradient_coefficients, iterate_coefficients=None, name=None):
+        """
+
+        Args:
+            gradient_coefficients (list or ndarray): lower-triangular matrix of the :math:`h_{t, k}`, of shape (n, n),
+                                                     or list of its n rows (row t containing t + 1 coefficients),
+                                                     a row being None when iteration t is an exact span search.
+            iterate_coefficients (list, ndarray or None): lower-triangular matrix of the :math:`m_{t, k}`,
+                                                          of shape (n, n), or list of its n rows.
+                                                          Defaults to :math:`x_{t+1} = x_t - \\dots`.
+            name (str or None): name of the method.
+
+        """
+
+        n = len(gradient_coefficients)
+        self.gradient_coefficients = _lower_triangular_rows(gradient_coefficients, n, 1, 'gradient_coefficients')
+        if iterate_coefficients is None:
+            iterate_coefficients = [[0] * t + [1] for t in range(n)]
+        if len(iterate_coefficients) != n:
+            raise ValueError('iterate_coefficients must have {} rows. Got {}'.format(n, len(iterate_coefficients)))
+        self.iterate_coefficients = _lower_triangular_rows(iterate_coefficients, n, 1, 'iterate_coefficients')
+        self.name = name
+
+        for t in range(n):
+            if self.gradient_coefficients[t] is None:
+                self.iterate_coefficients[t] = None
+            elif not np.isclose(sum(self.iterate_coefficients[t]), 1):
+                raise ValueError('iterate_coefficients[{}] must sum to 1'.format(t))
+
+    @classmethod
+    def from_steps(cls, steps, name=None):
+        """
+        Method described by a step-coefficient table (see :class:`code.sdp.CompiledPEP`),
+        i.e. with :math:`x_{t+1} = x_t - \\sum_{k \\leqslant t} h_{t, k} \\nabla f(x_k)`.
+
+        Args:
+            steps (list): the step-coefficient table.
+            name (str or None): name of the method.
+
+        Returns:
+            method (Method): the method.
+
+        """
+
+        return cls(steps, name=name)
+
+    @property
+    def n(self):
+        return len(self.gradient_coefficients)
+
+    @property
+    def searches(self):
+        """
+        Iterations t at which :math:`x_{t+1}` is given by an exact span search.
+        """
+        return [t for t, row in enumerate(self.gradient_coefficients) if row is None]
+
+    @property
+    def steps(self):
+        """
+        Step-coefficient table (see :class:`code.sdp.CompiledPEP`) of the method: row t contains the coefficients of
+        :math:`x_{t+1} - x_t` over the gradients :math:`\\nabla f(x_k)`, and is None for a search.
+
+        The method is run on :class:`code.tools.dense.DensePoint` objects, over which the displacements
+        are read. A displacement involving the iterates resulting from searches (e.g. a momentum term across a search)
+        is not a combination of gradients, and raises an error.
+        """
+
+        oracle = DenseOracle()
+        oracle.stationary_point()
+        self.run(oracle, oracle.basis.new_point())
+
+        # Each gradient is the last leaf created when it was
+        points = stack_points([point for point, _, _ in oracle.triplets[1:]], oracle.basis.nb_leaves)
+        gradient_leaves = [gradient.coefficients.size - 1 for _, gradient, _ in oracle.triplets[1:]]
+
+        steps = list()
+        for t in range(self.n):
+            if self.gradient_coefficients[t] is None:
+                steps.append(None)
+                continue
+            displacement = points[t + 1] - points[t]
+            row = 0. - displacement[gradient_leaves[:t + 1]]
+            displacement[gradient_leaves[:t + 1]] = 0
+            if np.any(np.abs(displacement) > 1e-12 * (1 + np.abs(row).sum())):
+                raise ValueError('Iteration {} combines iterates separated by an exact span search'.format(t))
+            steps.append([float(coefficient) for coefficient in row])
+
+        return steps
+
+    def run(self, func, x0):
+        """
+        Run the method on PEPit objects, or on :class:`code.tools.dense.DensePoint` objects.
+
+        Args:
+            func (Function or DenseOracle): the PEPit function, or a :class:`code.tools.dense.DenseOracle`.
+            x0 (Point or DensePoint): the starting point.
+
+        Returns:
+            x (Point or DensePoint): the last iterate :math:`x_n`.
+            f (Expression or int): its function value (an index of function value for a dense oracle).
+
+        """
+
+        # Iterates and gradients of the method, and the span of the exact searches
+        x, (g, f) = [x0], func.oracle(x0)
+        gradients = [g]
+        span = [g]
+        for t in range(self.n):
+            if self.gradient_coefficients[t] is None and hasattr(func, 'exact_search'):
+                x_next, g, f = func.exact_search(x[t], span)
+            elif self.gradient_coefficients[t] is None:
+                x_next, g, f = exact_linesearch_step(x[t], func, span)
+            else:
+                terms = [m * iterate for m, iterate in zip(self.iterate_coefficients[t], x) if m != 0]
+                terms += [- h * gradient for h, gradient in zip(self.gradient_coefficients[t], gradients) if h != 0]
+                x_next = terms[0]
+                for term in terms[1:]:
+                    x_next = x_next + term
+                g, f = func.oracle(x_next)
+            span.append(g)
+            span.append(x[t] - x_next)
+            x.append(x_next)
+            gradients.append(g)
+
+        return x[-1], f
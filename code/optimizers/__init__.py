@@ -0,0 +1,14 @@
+from .batched import batched_conjugate_gradient, batched_gradient_descent, batched_heavy_ball, empirical_rates
+from .conjugate_gradient import GramFactor, conjugate_gradient
+from .heavy_ball import heavy_ball, heavy_ball_budget, heavy_ball_guarantee, line_search_heavy_ball, relative_heavy_ball
+from .line_search import (brent_line_search, max_affine_line_search, max_affine_subgradient, minimize_max_affine,
+                          quadratic_line_search)
+
+__all__ = ['batched', 'batched_conjugate_gradient', 'batched_gradient_descent', 'batched_heavy_ball',
+           'empirical_rates',
+           'conjugate_gradient', 'GramFactor',
+           'heavy_ball', 'heavy_ball_budget', 'heavy_ball_guarantee', 'line_search_heavy_ball',
+           'relative_heavy_ball',
+           'line_search', 'brent_line_search', 'max_affine_line_search', 'max_affine_subgradient',
+           'minimize_max_affine', 'quadratic_line_search',
+           ]
@@ -0,0 +1,227 @@
+import numpy as np
+
+
+def _stack(X0):
+    X = np.array(X0, dtype=float)
+    if X.ndim != 2:
+        raise ValueError('The starting points must be stacked in an array of shape (K, d). Got {}'.format(X.shape))
+    return X
+
+
+def batched_gradient_descent(oracle, X0, gammas):
+    """
+    Run **gradient descent** :math:`x_{t+1} = x_t - \\gamma_t \\nabla f(x_t)` from K starting points at once,
+    e.g. with the fixed step-size of :func:`code.gradient_descent_qg_convex.wc_gradient_descent_qg_convex`
+    (`gammas = [gamma] * n`) or the decreasing ones of
+    :func:`code.gradient_descent_qg_convex_decreasing.decreasing_step_sizes`.
+
+    Args:
+        oracle (callable): vectorized oracle (X, gradients) -> values, writing the gradients
+                           of the K points X (array of shape (K, d)) into `gradients` and returning
+                           their K function values.
+        X0 (ndarray): the starting points, of shape (K, d).
+        gammas (list): the n step-sizes.
+
+    Returns:
+        X (ndarray): the last iterates, of shape (K, d).
+        values (ndarray): the function values of all the iterates, of shape (n + 1, K).
+
+    """
+
+    X = _stack(X0)
+    gradients = np.empty_like(X)
+    values = np.empty((len(gammas) + 1, X.shape[0]))
+
+    values[0] = oracle(X, gradients)
+    for t, gamma in enumerate(gammas):
+        gradients *= gamma
+        X -= gradients
+        values[t + 1] = oracle(X, gradients)
+
+    return X, values
+
+
+def batched_heavy_ball(oracle, X0, L, n):
+    """
+    Run the **Heavy-ball (HB)** method of :func:`code.optimizers.heavy_ball` from K starting points at once,
+    with three stacks of vectors updated in place.
+
+    Args:
+        oracle (callable): vectorized oracle (X, gradients) -> values (see :func:`batched_gradient_descent`).
+        X0 (ndarray): the starting points, of shape (K, d).
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+
+    Returns:
+        X (ndarray): the last iterates, of shape (K, d).
+        values (ndarray): the function values of all the iterates, of shape (n + 1, K).
+
+    """
+
+    X = _stack(X0)
+    momentum = np.zeros_like(X)
+    gradients = np.empty_like(X)
+    values = np.empty((n + 1, X.shape[0]))
+
+    values[0] = oracle(X, gradients)
+    for t in range(n):
+        # x_{t+1} - x_t = beta_t (x_t - x_{t-1}) - alpha_t g_t
+        momentum *= t / (t + 2)
+        gradients *= 1 / (L * (t + 2))
+        momentum -= gradients
+        X += momentum
+        values[t + 1] = oracle(X, gradients)
+
+    return X, values
+
+
+def batched_conjugate_gradient(oracle, X0, n, hessian_product, newton_iterations=1, quadratic=False, rcond=1e-10):
+    """
+    Run the **conjugate gradient (CG)** method of
+    :func:`code.conjugate_gradient_qg_convex.wc_conjugate_gradient_qg_convex` from K starting points at once:
+
+    .. math:: x_{t+1} = \\arg\\min_x f(x) \\text{ over }
+              x_t + \\text{span}\\{\\nabla f(x_k), x_{k+1} - x_k\\}_{k \\leqslant t}.
+
+    The span is stored as an orthonormal basis Q, grown by Gram-Schmidt (a direction that is, numerically,
+    a combination of the stored ones is replaced by a zero vector).
+    Each exact span search is solved by Newton steps on the coordinates in this basis, batched over the
+    starting points with matrix products, the Newton systems (of size at most 2n + 1, and singular where the
+    Hessian is) being solved in the least-squares sense with pseudo-inverses: one step is exact for
+    quadratic functions, and more steps (`newton_iterations`) approximate the search on other twice-differentiable
+    functions. For a quadratic function (`quadratic=True`), the Hessian product of each basis vector is computed
+    once, and the matrix :math:`Q H Q^T` of the Newton systems is bordered with one row per new vector;
+    otherwise, the products with the whole basis are computed at each Newton step.
+
+    Args:
+        oracle (callable): vectorized oracle (X, gradients) -> values (see :func:`batched_gradient_descent`).
+        X0 (ndarray): the starting points, of shape (K, d).
+        n (int): number of iterations.
+        hessian_product (callable): function (X, V) -> products of the Hessians of f at the K points X
+                                    by the vectors V, of shape (K, m, d).
+        newton_iterations (int): number of Newton steps per exact span search.
+        quadratic (bool): whether f is quadratic (its Hessian being then the same at all points).
+        rcond (float): relative cutoff of the small eigenvalues in the pseudo-inverses; a direction is also replaced
+                       by zero when its component orthogonal to the span has a squared norm below `rcond` times
+                       its squared norm.
+
+    Returns:
+        X (ndarray): the last iterates, of shape (K, d).
+        values (ndarray): the function values of all the iterates, of shape (n + 1, K).
+
+    """
+
+    X = _stack(X0)
+    K, d = X.shape
+    gradients = np.empty_like(X)
+    values = np.empty((n + 1, K))
+    basis = np.zeros((K, 2 * n + 1, d))
+    if quadratic:
+        products = np.empty((K, 2 * n + 1, d))
+        newton_matrix = np.zeros((K, 2 * n + 1, 2 * n + 1))
+    size = 0
+
+    def append(direction):
+        # Gram-Schmidt, applied twice for stability, against the current basis
+        nonlocal size
+        Q = basis[:, :size]
+        vector = direction.copy()
+        squared_norms = np.einsum('kd,kd->k', vector, vector)
+        for _ in range(2):
+            vector -= ((vector[:, None, :] @ Q.transpose(0, 2, 1)) @ Q)[:, 0]
+        residuals = np.einsum('kd,kd->k', vector, vector)
+        independent = residuals > rcond * squared_norms
+        vector[independent] /= np.sqrt(residuals[independent])[:, None]
+        vector[~independent] = 0
+        basis[:, size] = vector
+
+        # Border Q H Q^T with the products of the new vector
+        if quadratic:
+            products[:, size] = hessian_product(X, vector[:, None, :])[:, 0]
+            row = (basis[:, :size + 1] @ products[:, size, :, None])[..., 0]
+            newton_matrix[:, size, :size + 1] = row
+            newton_matrix[:, :size + 1, size] = row
+        size += 1
+
+    values[0] = oracle(X, gradients)
+    append(gradients)
+    for t in range(n):
+        X_previous = X.copy()
+        Q = basis[:, :size]
+        for _ in range(newton_iterations):
+            # Newton step on the coordinates c of x_t + Q^T c
+            if quadratic:
+                matrix = newton_matrix[:, :size, :size]
+            else:
+                matrix = Q @ hessian_product(X, Q).transpose(0, 2, 1)
+            coefficients = np.linalg.pinv(matrix, rcond=rcond, hermitian=True) @ (Q @ gradients[:, :, None])
+            X -= (coefficients.transpose(0, 2, 1) @ Q)[:, 0]
+            values[t + 1] = oracle(X, gradients)
+
+        # The span grows by the new gradient and the new displacement
+        append(gradients)
+        append(X_previous - X)
+
+    return X, values
+
+
+def empirical_rates(values, X0, f_star=0., x_star=0.):
+    """
+    Empirical counterparts of the worst-case values :math:`\\tau` computed by the `wc_*` functions:
+    the ratios :math:`\\frac{f(x_t) - f_\\star}{\\|x_0 - x_\\star\\|^2}` of each run.
+
+    Args:
+        values (ndarray): the function values of the iterates, of shape (n + 1, K).
+        X0 (ndarray): the starting points, of shape (K, d).
+        f_star (float): the minimal value of f.
+        x_star (ndarray or float): the minimizer of f (or a minimizer per starting point, of shape (K, d)).
+
+    Returns:
+        rates (ndarray): the ratios, of shape (n + 1, K); their maximum over the K runs is to be compared
+                         with the worst-case value of the method for each number of iterations.
+
+    """
+
+    distances = np.sum((np.asarray(X0, dtype=float) - x_star) ** 2, axis=1)
+
+    return (values - f_star) / distances
+
+
+if __name__ == "__main__":
+
+    import time
+
+    from code.gradient_descent_qg_convex_decreasing import decreasing_step_sizes
+
+    # Convex quadratic f(x) = x^T A x / 2, with the eigenvalues of A in [0, L], run from K random starting points
+    L, n, K, d = 1, 10, 500, 1000
+    rng = np.random.default_rng(0)
+    Q, _ = np.linalg.qr(rng.standard_normal((d, d)))
+    A = (Q * np.linspace(0, L, d)) @ Q.T
+
+    def quadratic_oracle(X, gradients):
+        np.matmul(X, A, out=gradients)
+        return .5 * np.einsum('kd,kd->k', X, gradients)
+
+    def quadratic_hessian_product(X, V):
+        # One matrix product for all the vectors, rather than one per starting point
+        return (V.reshape(-1, d) @ A).reshape(V.shape)
+
+    X0 = rng.standard_normal((K, d))
+    gammas, u = decreasing_step_sizes(L, n)
+    runs = {
+        'gradient descent (gamma=1/L)': (lambda: batched_gradient_descent(quadratic_oracle, X0, [1 / L] * n),
+                                         L / 2 * max(1 / (2 * n + 1), 1)),
+        'gradient descent (decreasing)': (lambda: batched_gradient_descent(quadratic_oracle, X0, gammas),
+                                          L / (2 * u)),
+        'Heavy-ball': (lambda: batched_heavy_ball(quadratic_oracle, X0, L, n), L / (2 * (n + 1))),
+        'conjugate gradient': (lambda: batched_conjugate_gradient(quadratic_oracle, X0, n, quadratic_hessian_product,
+                                                                  quadratic=True),
+                               L / (2 * (n + 1))),
+    }
+    for name, (run, theoretical_tau) in runs.items():
+        start = time.perf_counter()
+        _, values = run()
+        rates = empirical_rates(values, X0)
+        print('({}) K={} starts, d={}, n={}: worst empirical rate {:.4} <= {:.4} ({:.3}s)'.format(
+            name, K, d, n, rates[-1].max(), theoretical_tau, time.perf_counter() - start))
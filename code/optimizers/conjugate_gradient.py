@@ -0,0 +1,259 @@
+import numpy as np
+from scipy.linalg import solve_triangular
+from scipy.optimize import minimize
+
+
+class GramFactor(object):
+    """
+    The :class:`GramFactor` class stores k directions :math:`D = (d_1, \\dots, d_k)` together with the upper
+    Cholesky factor R of their Gram matrix :math:`D^T M D = R^T R` in the inner product of a symmetric
+    positive semidefinite operator M (the identity, or the Hessian of a quadratic function).
+    The factor is updated, never recomputed:
+
+        - appending a direction borders R with one column, in :math:`O(dk + k^2)` operations
+          (the direction is rejected when it is, numerically, a combination of the stored ones);
+        - removing the oldest direction is a rank-one update of the rest of R, in :math:`O(dk + k^2)` operations.
+
+    Attributes:
+        directions (ndarray): the directions, stored as the rows of an array of shape (k, d).
+        products (ndarray): the products :math:`M d_i`, of shape (k, d).
+        R (ndarray): the Cholesky factor, of shape (k, k).
+
+    Example:
+        >>> factor = GramFactor(d=3)
+        >>> appended = factor.append(np.array([1., 0., 0.]))
+        >>> appended = factor.append(np.array([1., 1., 0.]))
+        >>> coefficients = factor.solve(factor.directions @ np.array([1., 2., 3.]))
+
+    """
+
+    def __init__(self, d, capacity=None, metric=None, rtol=1e-10):
+        """
+
+        Args:
+            d (int): the dimension.
+            capacity (int or None): maximal number of directions (None for d).
+            metric (callable or None): function v -> M v (None for the identity).
+            rtol (float): a direction is rejected when its component orthogonal to the stored ones
+                          has a squared norm below `rtol` times its squared norm.
+
+        """
+
+        self.capacity = d if capacity is None else capacity
+        self.metric = metric
+        self.rtol = rtol
+        self._directions = np.empty((self.capacity, d))
+        self._products = np.empty((self.capacity, d)) if metric is not None else self._directions
+        self._R = np.zeros((self.capacity, self.capacity))
+        self.k = 0
+
+    @property
+    def directions(self):
+        return self._directions[:self.k]
+
+    @property
+    def products(self):
+        return self._products[:self.k]
+
+    @property
+    def R(self):
+        return self._R[:self.k, :self.k]
+
+    def append(self, direction):
+        """
+        Append a direction, unless it is (numerically) a combination of the stored ones.
+
+        Args:
+            direction (ndarray): the direction.
+
+        Returns:
+            appended (bool): whether the direction was appended.
+
+        """
+
+        if self.k == self.capacity:
+            raise ValueError('The factor is full; remove the oldest direction first')
+
+        product = direction if self.metric is None else self.metric(direction)
+        norm = direction @ product
+        if norm <= 0:
+            return False
+
+        # Bordered Cholesky: R^T r = D^T M v, and rho^2 = v^T M v - r^T r
+        r = solve_triangular(self.R, self.products @ direction, trans='T') if self.k else np.zeros(0)
+        pivot = norm - r @ r
+        if pivot <= self.rtol * norm:
+            return False
+
+        self._directions[self.k] = direction
+        if self.metric is not None:
+            self._products[self.k] = product
+        self._R[:self.k, self.k] = r
+        self._R[self.k, :self.k] = 0
+        self._R[self.k, self.k] = np.sqrt(pivot)
+        self.k += 1
+
+        return True
+
+    def pop_oldest(self):
+        """
+        Remove the oldest direction. With :math:`R = \\begin{pmatrix} \\rho & r^T \\\\ 0 & S \\end{pmatrix}`,
+        the Gram matrix of the other directions is :math:`r r^T + S^T S`, whose factor is a rank-one update of S.
+        """
+
+        r = self._R[0, 1:self.k].copy()
+        S = self._R[1:self.k, 1:self.k].copy()
+
+        # Rank-one update of the Cholesky factor S with r (one Givens-like rotation per row)
+        for i in range(S.shape[0]):
+            radius = np.hypot(S[i, i], r[i])
+            cosine, sine = radius / S[i, i], r[i] / S[i, i]
+            S[i, i] = radius
+            S[i, i + 1:] = (S[i, i + 1:] + sine * r[i + 1:]) / cosine
+            r[i + 1:] = cosine * r[i + 1:] - sine * S[i, i + 1:]
+
+        self.k -= 1
+        self._R[:self.k, :self.k] = S
+        self._directions[:self.k] = self._directions[1:self.k + 1]
+        if self.metric is not None:
+            self._products[:self.k] = self._products[1:self.k + 1]
+
+    def solve(self, rhs):
+        """
+        Solve :math:`(D^T M D) c = \\text{rhs}` with two triangular solves.
+
+        Args:
+            rhs (ndarray): the right-hand side, of size k.
+
+        Returns:
+            coefficients (ndarray): the solution c.
+
+        """
+
+        return solve_triangular(self.R, solve_triangular(self.R, rhs, trans='T'))
+
+
+def conjugate_gradient(oracle, x0, n, hessian_product=None, memory=None, callback=None, gtol=1e-10):
+    """
+    Run the **conjugate gradient (CG)** method analyzed in
+    :func:`code.conjugate_gradient_qg_convex.wc_conjugate_gradient_qg_convex`:
+
+    .. math:: x_{t+1} = \\arg\\min_x f(x) \\text{ over }
+              x_t + \\text{span}\\{\\nabla f(x_k), x_{k+1} - x_k\\}_{k \\leqslant t},
+
+    keeping only the last `memory` directions if given. The directions and the Cholesky factor of their Gram
+    matrix are updated at each iteration (see :class:`GramFactor`), so that an iteration costs
+    :math:`O(dm + m^2)` operations for m stored directions (plus the oracle calls), instead of a new
+    :math:`O(m^3)` factorization:
+
+        - for a quadratic function (given its Hessian product), the Gram matrix is taken in the inner product
+          of the Hessian, and the exact search is the solution of one system with this factor;
+        - otherwise, the Gram matrix is the Euclidean one, and the search is done by BFGS over the coordinates
+          of an orthonormal basis of the span (:math:`D R^{-1}`), each evaluation costing :math:`O(dm + m^2)`.
+
+    A direction that is a combination of the stored ones is not stored (with full memory, the displacements
+    are combinations of the gradients).
+
+    Args:
+        oracle (callable): function (x, gradient) -> f(x), writing :math:`\\nabla f(x)` into the array `gradient`.
+        x0 (ndarray): the starting point.
+        n (int): number of iterations.
+        hessian_product (callable or None): function v -> H v, for a quadratic function of Hessian H.
+        memory (int or None): number of directions kept (None to keep them all).
+        callback (callable or None): function (t, x, f(x)) called at each iterate;
+                                     the iteration stops when it returns True.
+        gtol (float): tolerance on the gradient of the searches of non-quadratic functions.
+
+    Returns:
+        x (ndarray): the last iterate :math:`x_n`.
+        f (float): its function value.
+        values (list): the function values of all the iterates :math:`x_0, \\dots, x_n`.
+
+    Example:
+        >>> eigenvalues = np.linspace(0, 1, 100)
+        >>> def oracle(x, gradient):
+        ...     np.multiply(eigenvalues, x, out=gradient)
+        ...     return .5 * (x @ gradient)
+        >>> x, f, values = conjugate_gradient(oracle, np.ones(100), 10, hessian_product=lambda v: eigenvalues * v)
+
+    """
+
+    x = np.array(x0, dtype=float)
+    d = x.size
+    capacity = min(d, 2 * n + 1) if memory is None else memory
+    factor = GramFactor(d, capacity=capacity, metric=hessian_product)
+    gradient = np.empty_like(x)
+
+    def store(direction):
+        if factor.k == factor.capacity:
+            factor.pop_oldest()
+        factor.append(direction)
+
+    f = oracle(x, gradient)
+    values = [f]
+    if callback is not None and callback(0, x, f):
+        return x, f, values
+    store(gradient.copy())
+
+    for t in range(n):
+        x_previous = x.copy()
+        if factor.k == 0:
+            pass
+        elif hessian_product is not None:
+            # Exact search on a quadratic function: (D^T H D) c = - D^T g
+            x -= factor.directions.T @ factor.solve(factor.directions @ gradient)
+        else:
+            # Search over the coordinates z of x_t + D R^{-1} z
+            directions, R = factor.directions, factor.R
+
+            def restriction(z):
+                point = x_previous + directions.T @ solve_triangular(R, z)
+                value = oracle(point, gradient)
+                return value, solve_triangular(R, directions @ gradient, trans='T')
+
+            result = minimize(restriction, np.zeros(factor.k), jac=True, method='BFGS', options={'gtol': gtol})
+            if result.fun <= f:
+                x = x_previous + directions.T @ solve_triangular(R, result.x)
+
+        f = oracle(x, gradient)
+        values.append(f)
+        if callback is not None and callback(t + 1, x, f):
+            break
+
+        # The span grows by the new gradient and the new displacement
+        store(gradient.copy())
+        store(x_previous - x)
+
+    return x, f, values
+
+
+if __name__ == "__main__":
+
+    import time
+
+    # Quadratic f(x) = sum_i lambda_i x_i^2 / 2, with full memory and with the last two directions only
+    d, n = 10 ** 5, 100
+    rng = np.random.default_rng(0)
+    eigenvalues = np.linspace(0, 1, d)
+    x0 = rng.standard_normal(d)
+
+    def quadratic_oracle(x, gradient):
+        np.multiply(eigenvalues, x, out=gradient)
+        return .5 * float(x @ gradient)
+
+    for memory in [None, 2, 10]:
+        start = time.perf_counter()
+        _, f, _ = conjugate_gradient(quadratic_oracle, x0, n, hessian_product=lambda v: eigenvalues * v, memory=memory)
+        print('(CG, quadratic) d={}, n={}, memory={}: f(x_n)-f_*={:.6} <= {:.6} ({:.3}s)'.format(
+            d, n, memory, f, 1 / (2 * (n + 1)) * (x0 @ x0), time.perf_counter() - start))
+
+    # f(x) = sum_i log cosh(x_i), with limited memory
+    def log_cosh_oracle(x, gradient):
+        np.tanh(x, out=gradient)
+        return float(np.sum(np.log(np.cosh(x))))
+
+    for memory in [2, 10]:
+        start = time.perf_counter()
+        _, f, _ = conjugate_gradient(log_cosh_oracle, 3 * x0, 20, memory=memory)
+        print('(CG, log-cosh) d={}, n=20, memory={}: f(x_n)-f_*={:.6} ({:.3}s)'.format(
+            d, memory, f, time.perf_counter() - start))
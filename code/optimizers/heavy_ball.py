@@ -0,0 +1,282 @@
+import math
+
+import numpy as np
+
+
+def heavy_ball_guarantee(L, n, distance):
+    """
+    Tight guarantee of the **Heavy-ball (HB)** method on :math:`L-\\text{QG}^+` convex functions
+    (see :func:`code.heavy_ball_momentum_qg_convex.wc_heavy_ball_momentum_qg_convex`):
+
+    .. math:: f(x_n) - f_\\star \\leqslant \\frac{L}{2} \\frac{1}{n+1} \\|x_0 - x_\\star\\|^2.
+
+    Args:
+        L (float): the quadratic growth parameter.
+        n (int): number of iterations.
+        distance (float): an upper bound on :math:`\\|x_0 - x_\\star\\|`.
+
+    Returns:
+        tau (float): the upper bound on :math:`f(x_n) - f_\\star`.
+
+    """
+
+    return L * distance ** 2 / (2 * (n + 1))
+
+
+def heavy_ball_budget(L, distance, tolerance):
+    """
+    Smallest number of iterations n of the **Heavy-ball (HB)** method for which the guarantee
+    :func:`heavy_ball_guarantee` ensures :math:`f(x_n) - f_\\star \\leqslant` `tolerance`.
+
+    Args:
+        L (float): the quadratic growth parameter.
+        distance (float): an upper bound on :math:`\\|x_0 - x_\\star\\|`.
+        tolerance (float): the target accuracy on the function values.
+
+    Returns:
+        n (int): the number of iterations.
+
+    """
+
+    if tolerance <= 0:
+        raise ValueError('tolerance must be positive. Got {}'.format(tolerance))
+
+    return max(math.ceil(L * distance ** 2 / (2 * tolerance) - 1), 0)
+
+
+def heavy_ball(oracle, x0, L, n=None, distance=None, tolerance=None, callback=None, copy=True):
+    """
+    Run the **Heavy-ball (HB)** method analyzed in
+    :func:`code.heavy_ball_momentum_qg_convex.wc_heavy_ball_momentum_qg_convex`,
+
+    .. math:: x_{t+1} = x_t - \\alpha_t \\nabla f(x_t) + \\beta_t (x_t-x_{t-1}),
+              \\quad \\alpha_t = \\frac{1}{L} \\frac{1}{t+2}, \\quad \\beta_t = \\frac{t}{t+2},
+
+    on a NumPy array. The method stores three vectors only (the iterate, the momentum :math:`x_t - x_{t-1}`
+    and the gradient), all updated in place: an iteration allocates nothing besides what the oracle does.
+
+    The number of iterations is either given, or the budget ensuring
+    :math:`f(x_n) - f_\\star \\leqslant` `tolerance` when :math:`\\|x_0 - x_\\star\\| \\leqslant` `distance`
+    (see :func:`heavy_ball_budget`). The guarantee holds at every iteration, the coefficients not depending on n.
+
+    Args:
+        oracle (callable): function (x, gradient) -> f(x), writing :math:`\\nabla f(x)` into the array `gradient`.
+        x0 (ndarray): the starting point.
+        L (float): the quadratic growth parameter.
+        n (int or None): number of iterations.
+        distance (float or None): an upper bound on :math:`\\|x_0 - x_\\star\\|`, used when n is None.
+        tolerance (float or None): the target accuracy on the function values, used when n is None.
+        callback (callable or None): function (t, x, f(x)) called at each iterate;
+                                     the iteration stops when it returns True.
+        copy (bool): if False, and x0 is a float array, x0 is overwritten by the iterates.
+
+    Returns:
+        x (ndarray): the last iterate :math:`x_n`.
+        f (float): its function value.
+        values (list): the function values of all the iterates :math:`x_0, \\dots, x_n`.
+
+    Example:
+        >>> eigenvalues = np.linspace(0, 1, 10 ** 6)
+        >>> def oracle(x, gradient):
+        ...     np.multiply(eigenvalues, x, out=gradient)
+        ...     return .5 * (x @ gradient)
+        >>> x, f, values = heavy_ball(oracle, np.ones(10 ** 6), L=1, distance=10 ** 3, tolerance=1e2)
+
+    """
+
+    if n is None:
+        if distance is None or tolerance is None:
+            raise ValueError('Either n, or both distance and tolerance, must be given')
+        n = heavy_ball_budget(L, distance, tolerance)
+
+    if copy or not isinstance(x0, np.ndarray) or x0.dtype.kind != 'f':
+        x = np.array(x0, dtype=float)
+    else:
+        x = x0
+    momentum = np.zeros_like(x)
+    gradient = np.empty_like(x)
+
+    f = oracle(x, gradient)
+    values = [f]
+    if callback is not None and callback(0, x, f):
+        return x, f, values
+
+    for t in range(n):
+        # x_{t+1} - x_t = beta_t (x_t - x_{t-1}) - alpha_t g_t, the gradient being consumed in place
+        momentum *= t / (t + 2)
+        gradient *= 1 / (L * (t + 2))
+        momentum -= gradient
+        x += momentum
+
+        f = oracle(x, gradient)
+        values.append(f)
+        if callback is not None and callback(t + 1, x, f):
+            break
+
+    return x, f, values
+
+
+def line_search_heavy_ball(oracle, x0, n, line_search, subgradient=None, callback=None):
+    """
+    Run the parameter-free **Heavy-ball (HB)** method with exact line searches:
+
+    .. math:: y_t = \\frac{t+1}{t+2} x_t + \\frac{1}{t+2} x_0, \\quad
+              v_t = - \\frac{1}{t+2} \\sum_{k \\leqslant t} g_k, \\quad
+              x_{t+1} = y_t + \\alpha_t v_t, \\quad \\alpha_t = \\arg\\min_\\alpha f(y_t + \\alpha v_t).
+
+    With :math:`\\alpha_t = \\frac{1}{L}`, this is the Heavy-ball method of :func:`heavy_ball`, and the line search
+    keeps its guarantee :math:`f(x_n) - f_\\star \\leqslant \\frac{L}{2(n+1)} \\|x_0 - x_\\star\\|^2`
+    on :math:`L-\\text{QG}^+` convex functions, without L being known.
+    The guarantee requires the subgradient :math:`g_{t+1} \\in \\partial f(x_{t+1})` to be orthogonal to the
+    direction :math:`v_t` of the line search, as is the gradient of a differentiable f after an exact line search.
+    On a nonsmooth f, an arbitrary subgradient returned by the oracle voids the guarantee (and the method may stall):
+    an orthogonal one, which exists at the minimizer of the line, must then be provided by `subgradient`
+    (e.g. :func:`code.optimizers.line_search.max_affine_subgradient`).
+
+    Args:
+        oracle (callable): function (x, gradient) -> f(x), writing :math:`\\nabla f(x)` into the array `gradient`.
+        x0 (ndarray): the starting point.
+        n (int): number of iterations.
+        line_search (callable): function (y, v) -> :math:`\\arg\\min_\\alpha f(y + \\alpha v)`, e.g.
+                                :func:`code.optimizers.line_search.quadratic_line_search`,
+                                :func:`code.optimizers.line_search.max_affine_line_search` or
+                                :func:`code.optimizers.line_search.brent_line_search`.
+        subgradient (callable or None): function (x, v, gradient) writing into `gradient` a subgradient of f at x
+                                        orthogonal to v, called after each line search
+                                        (None to keep the subgradient of the oracle, e.g. for a differentiable f).
+        callback (callable or None): function (t, x, f(x)) called at each iterate;
+                                     the iteration stops when it returns True.
+
+    Returns:
+        x (ndarray): the last iterate :math:`x_n`.
+        f (float): its function value.
+        values (list): the function values of all the iterates :math:`x_0, \\dots, x_n`.
+        alphas (list): the steps :math:`\\alpha_t` found by the line searches.
+
+    Example:
+        >>> from code.optimizers.line_search import quadratic_line_search
+        >>> eigenvalues = np.linspace(0, 1, 100)
+        >>> def oracle(x, gradient):
+        ...     np.multiply(eigenvalues, x, out=gradient)
+        ...     return .5 * (x @ gradient)
+        >>> line_search = quadratic_line_search(lambda y: eigenvalues * y, lambda v: eigenvalues * v)
+        >>> x, f, values, alphas = line_search_heavy_ball(oracle, np.ones(100), 10, line_search)
+
+    """
+
+    x0 = np.array(x0, dtype=float)
+    x = x0.copy()
+    gradient = np.empty_like(x)
+    direction = np.zeros_like(x)
+    step = np.empty_like(x)
+
+    f = oracle(x, gradient)
+    values = [f]
+    alphas = list()
+    if callback is not None and callback(0, x, f):
+        return x, f, values, alphas
+
+    for t in range(n):
+        # The direction accumulates the subgradients, and x becomes y_t = x_0 + (t+1)/(t+2) (x_t - x_0)
+        direction -= gradient
+        x -= x0
+        x *= (t + 1) / (t + 2)
+        x += x0
+        np.multiply(direction, 1 / (t + 2), out=step)
+        alpha = line_search(x, step)
+        step *= alpha
+        x += step
+        alphas.append(alpha)
+
+        f = oracle(x, gradient)
+        if subgradient is not None:
+            subgradient(x, direction, gradient)
+        values.append(f)
+        if callback is not None and callback(t + 1, x, f):
+            break
+
+    return x, f, values, alphas
+
+
+def relative_heavy_ball(oracle, x0, n, h, f_star, callback=None):
+    """
+    Run the **Heavy-ball (HB)** method for h-relatively-upper-bounded convex functions
+    (see :class:`code.tools.upper_bounds.UpperBound`), with momentum :math:`\\beta_t = \\frac{t}{t+2}` and
+    step-sizes adapted to the current gap:
+
+    .. math:: \\alpha_t = \\frac{1}{2 (t+2) h'(h^{-1}(f(x_t) - f_\\star))}.
+
+    For :math:`h(z) = \\frac{L}{2} z`, this is the method of :func:`heavy_ball`; for :math:`h(z) = M \\sqrt{z}`,
+    the step-size :math:`\\frac{f(x_t) - f_\\star}{(t+2) M^2}` requires neither the distance to the minimizers
+    nor the smoothness of f. Like :func:`heavy_ball`, the method stores three vectors, updated in place.
+
+    Args:
+        oracle (callable): function (x, gradient) -> f(x), writing a (sub)gradient of f at x into `gradient`.
+        x0 (ndarray): the starting point.
+        n (int): number of iterations.
+        h (UpperBound): the function h (e.g. `make_upper_bound('sqrt', M=1)`).
+        f_star (float): the minimal value of f.
+        callback (callable or None): function (t, x, f(x)) called at each iterate;
+                                     the iteration stops when it returns True.
+
+    Returns:
+        x (ndarray): the last iterate.
+        f (float): its function value.
+        values (list): the function values of all the iterates.
+
+    Example:
+        >>> from code.tools.upper_bounds import make_upper_bound
+        >>> def oracle(x, gradient):
+        ...     np.sign(x, out=gradient)
+        ...     return np.abs(x).sum()
+        >>> x, f, values = relative_heavy_ball(oracle, np.ones(10), 50, make_upper_bound('sqrt', M=10 ** .5), 0.)
+
+    """
+
+    x = np.array(x0, dtype=float)
+    momentum = np.zeros_like(x)
+    gradient = np.empty_like(x)
+
+    f = oracle(x, gradient)
+    values = [f]
+    if callback is not None and callback(0, x, f):
+        return x, f, values
+
+    for t in range(n):
+        gap = f - f_star
+        if gap <= 0:
+            break
+
+        # x_{t+1} - x_t = beta_t (x_t - x_{t-1}) - alpha_t g_t
+        momentum *= t / (t + 2)
+        gradient *= 1 / (2 * (t + 2) * h.derivative(h.inverse(gap)))
+        momentum -= gradient
+        x += momentum
+
+        f = oracle(x, gradient)
+        values.append(f)
+        if callback is not None and callback(t + 1, x, f):
+            break
+
+    return x, f, values
+
+
+if __name__ == "__main__":
+
+    import time
+
+    # Quadratic f(x) = sum_i lambda_i x_i^2 / 2 with 0 <= lambda_i <= L, which is L-QG+ and convex
+    L, d = 1, 2 * 10 ** 6
+    eigenvalues = np.linspace(0, L, d)
+
+    def quadratic_oracle(x, gradient):
+        np.multiply(eigenvalues, x, out=gradient)
+        return .5 * float(x @ gradient)
+
+    x0 = np.ones(d)
+    distance = float(np.linalg.norm(x0))
+    for tolerance in [1e5, 1e4, 1e3]:
+        start = time.perf_counter()
+        x, f, values = heavy_ball(quadratic_oracle, x0, L, distance=distance, tolerance=tolerance)
+        print('(Heavy-ball) d={}: f(x_n)-f_*={:.6} <= {:.6} after n={} iterations ({:.3}s)'.format(
+            d, f, heavy_ball_guarantee(L, len(values) - 1, distance), len(values) - 1, time.perf_counter() - start))
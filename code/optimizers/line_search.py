@@ -0,0 +1,220 @@
+import numpy as np
+from scipy.optimize import minimize_scalar
+
+
+def minimize_max_affine(intercepts, slopes):
+    """
+    Minimizer of the convex piecewise-linear function :math:`\\alpha \\mapsto \\max_i c_i + \\alpha s_i`,
+    in :math:`O(m \\log m)` operations: the lines are sorted by slope, their upper envelope is built
+    (as a convex hull), and the minimum is the breakpoint of the envelope where the slope changes sign.
+
+    Args:
+        intercepts (ndarray): the m intercepts :math:`c_i`.
+        slopes (ndarray): the m slopes :math:`s_i`.
+
+    Returns:
+        alpha (float): a minimizer.
+
+    Example:
+        >>> alpha = minimize_max_affine(np.array([0., 0., 1.]), np.array([-1., 2., 0.]))
+
+    """
+
+    intercepts = np.asarray(intercepts, dtype=float)
+    slopes = np.asarray(slopes, dtype=float)
+    if slopes.min() > 0 or slopes.max() < 0:
+        raise ValueError('The function is unbounded below along the line')
+
+    # Sort the lines by slope, keeping the largest intercept among equal slopes
+    order = np.lexsort((intercepts, slopes))
+    slopes, intercepts = slopes[order], intercepts[order]
+    last_of_slope = np.append(slopes[1:] != slopes[:-1], True)
+    slopes, intercepts = slopes[last_of_slope], intercepts[last_of_slope]
+
+    # Upper envelope: a line is dropped when the lines around it cross above it
+    hull = list()
+    for i in range(slopes.size):
+        while len(hull) >= 2:
+            j, k = hull[-2], hull[-1]
+            if (intercepts[i] - intercepts[j]) * (slopes[k] - slopes[j]) >= \
+                    (intercepts[k] - intercepts[j]) * (slopes[i] - slopes[j]):
+                hull.pop()
+            else:
+                break
+        hull.append(i)
+
+    # Breakpoint between the last nonincreasing line and the first increasing one of the envelope
+    hull = np.array(hull)
+    if len(hull) == 1:
+        return 0.
+    if slopes[hull[-1]] <= 0:
+        j, k = hull[-2], hull[-1]
+    else:
+        first_increasing = np.argmax(slopes[hull] > 0)
+        j, k = hull[first_increasing - 1], hull[first_increasing]
+
+    return float((intercepts[j] - intercepts[k]) / (slopes[k] - slopes[j]))
+
+
+def quadratic_line_search(gradient, hessian_product):
+    """
+    Exact line search on a quadratic function, in closed form:
+    :math:`\\arg\\min_\\alpha f(y + \\alpha v) = - \\frac{\\langle \\nabla f(y), v \\rangle}{\\langle v, H v \\rangle}`.
+
+    Args:
+        gradient (callable): function y -> :math:`\\nabla f(y)`.
+        hessian_product (callable): function v -> :math:`H v`.
+
+    Returns:
+        line_search (callable): function (y, v) -> :math:`\\alpha`.
+
+    """
+
+    def line_search(y, v):
+        curvature = v @ hessian_product(v)
+        if curvature <= 0:
+            raise ValueError('The quadratic function is not strongly convex along the line')
+        return float(- (gradient(y) @ v) / curvature)
+
+    return line_search
+
+
+def max_affine_line_search(A, b):
+    """
+    Exact line search on the piecewise-linear function :math:`f(x) = \\max_i a_i^T x + b_i`
+    (see :func:`minimize_max_affine`).
+
+    Args:
+        A (ndarray): the matrix of shape (m, d) whose rows are the :math:`a_i`.
+        b (ndarray): the m offsets :math:`b_i`.
+
+    Returns:
+        line_search (callable): function (y, v) -> :math:`\\alpha`.
+
+    """
+
+    def line_search(y, v):
+        return minimize_max_affine(A @ y + b, A @ v)
+
+    return line_search
+
+
+def max_affine_subgradient(A, b, tol=1e-9):
+    """
+    Subgradient of the piecewise-linear function :math:`f(x) = \\max_i a_i^T x + b_i` orthogonal to a direction v,
+    at a minimizer x of f along v (see :func:`code.optimizers.heavy_ball.line_search_heavy_ball`):
+    the active pieces then have slopes :math:`\\langle a_i, v \\rangle` of both signs, and the convex combination
+    of two of them with opposite slopes cancels the slope. Elsewhere, the active piece with the smallest slope
+    in absolute value is returned.
+
+    Args:
+        A (ndarray): the matrix of shape (m, d) whose rows are the :math:`a_i`.
+        b (ndarray): the m offsets :math:`b_i`.
+        tol (float): a piece is active when its value is within `tol` (relatively) of the maximum.
+
+    Returns:
+        subgradient (callable): function (x, v, gradient) writing the subgradient into `gradient`.
+
+    """
+
+    def subgradient(x, v, gradient):
+        values = A @ x + b
+        active = np.flatnonzero(values >= values.max() - tol * max(abs(values.max()), 1))
+        slopes = A[active] @ v
+        i, j = np.argmin(slopes), np.argmax(slopes)
+        if slopes[i] <= 0 <= slopes[j] and slopes[j] > slopes[i]:
+            weight = slopes[j] / (slopes[j] - slopes[i])
+            np.multiply(A[active[i]], weight, out=gradient)
+            gradient += (1 - weight) * A[active[j]]
+        else:
+            gradient[:] = A[active[np.argmin(np.abs(slopes))]]
+
+    return subgradient
+
+
+def brent_line_search(function, step=1., xtol=1e-10, max_expansions=60):
+    """
+    Exact line search on a convex function, by Brent's method on an interval that is first expanded
+    (doubling it) until it contains a minimizer. The step returned never increases the function value.
+
+    Args:
+        function (callable): function x -> f(x).
+        step (float): half-length of the initial interval.
+        xtol (float): absolute tolerance on :math:`\\alpha`.
+        max_expansions (int): maximal number of doublings of each end of the interval.
+
+    Returns:
+        line_search (callable): function (y, v) -> :math:`\\alpha`.
+
+    """
+
+    def line_search(y, v):
+
+        def restriction(alpha):
+            return function(y + alpha * v)
+
+        # Expand the interval until the function increases at both ends
+        value = restriction(0.)
+        lower, upper = - step, step
+        for _ in range(max_expansions):
+            if restriction(upper) >= value:
+                break
+            upper *= 2
+        for _ in range(max_expansions):
+            if restriction(lower) >= value:
+                break
+            lower *= 2
+
+        result = minimize_scalar(restriction, bounds=(lower, upper), method='bounded', options={'xatol': xtol})
+        if not np.isfinite(result.fun) or result.fun > value:
+            return 0.
+        return float(result.x)
+
+    return line_search
+
+
+if __name__ == "__main__":
+
+    from code.optimizers.heavy_ball import heavy_ball, heavy_ball_guarantee, line_search_heavy_ball
+
+    # Compare the Heavy-ball method (which needs L) with its line-search version (which does not)
+    d, n = 200, 100
+    rng = np.random.default_rng(0)
+    x0 = rng.standard_normal(d)
+    eigenvalues = np.linspace(0, 1, d)
+    A = rng.standard_normal((30, d))
+
+    def quadratic_oracle(x, gradient):
+        np.multiply(eigenvalues, x, out=gradient)
+        return .5 * float(x @ gradient)
+
+    def log_cosh_oracle(x, gradient):
+        np.tanh(x, out=gradient)
+        return float(np.sum(np.log(np.cosh(x))))
+
+    def max_affine_oracle(x, gradient):
+        products = A @ x
+        i = np.argmax(np.abs(products))
+        gradient[:] = np.sign(products[i]) * A[i]
+        return float(abs(products[i]))
+
+    # f(x) = sum_i lambda_i x_i^2 / 2 and f(x) = sum_i log cosh(x_i) are 1-QG+ (f(x) = max_i |a_i^T x| is not).
+    # The max-affine function is nonsmooth: the subgradient of its oracle is compared with the orthogonal one.
+    max_affine_A = np.vstack([A, - A])
+    runs = {
+        'quadratic': (quadratic_oracle, quadratic_line_search(lambda y: eigenvalues * y, lambda v: eigenvalues * v),
+                      None, 1),
+        'log-cosh': (log_cosh_oracle, brent_line_search(lambda y: float(np.sum(np.log(np.cosh(y))))), None, 1),
+        'max-affine, oracle subgradient': (max_affine_oracle, max_affine_line_search(max_affine_A, np.zeros(60)),
+                                           None, None),
+        'max-affine, orthogonal subgradient': (max_affine_oracle, max_affine_line_search(max_affine_A, np.zeros(60)),
+                                               max_affine_subgradient(max_affine_A, np.zeros(60)), None),
+    }
+    for name, (oracle, line_search, subgradient, L) in runs.items():
+        _, f, _, alphas = line_search_heavy_ball(oracle, x0, n, line_search, subgradient=subgradient)
+        message = '({}) n={}: line-search Heavy-ball f(x_n)-f_*={:.6}'.format(name, n, f)
+        if L is not None:
+            _, f_heavy_ball, _ = heavy_ball(oracle, x0, L, n=n)
+            message += ', Heavy-ball with L={}: {:.6}, guarantee: {:.6}'.format(
+                L, f_heavy_ball, heavy_ball_guarantee(L, n, np.linalg.norm(x0)))
+        print(message)
@@ -0,0 +1,26 @@
+from .admm import solve_admm
+from .certificate import RationalCertificate, certify_upper_bound
+from .compiler import CompiledPEP
+from .cutting_plane import solve_cutting_plane
+from .continuation import extend_horizon, solve_horizons
+from .low_rank import LowRankPEP
+from .lyapunov import averaging_steps, lyapunov_bound, lyapunov_bounds
+from .parameterized import ParameterizedPEP
+from .schedule import optimize_schedule, schedule_sensitivities
+from .sparsification import ReducedPEPSolver
+from .step_size import locate_kink, optimize_step_size
+from .tolerance_ladder import solve_tolerance_ladder
+
+__all__ = ['admm', 'solve_admm',
+           'certificate', 'RationalCertificate', 'certify_upper_bound',
+           'compiler', 'CompiledPEP',
+           'cutting_plane', 'solve_cutting_plane',
+           'continuation', 'extend_horizon', 'solve_horizons',
+           'low_rank', 'LowRankPEP',
+           'lyapunov', 'averaging_steps', 'lyapunov_bound', 'lyapunov_bounds',
+           'parameterized', 'ParameterizedPEP',
+           'schedule', 'optimize_schedule', 'schedule_sensitivities',
+           'sparsification', 'ReducedPEPSolver',
+           'step_size', 'locate_kink', 'optimize_step_size',
+           'tolerance_ladder', 'solve_tolerance_ladder',
+           ]
@@ -0,0 +1,189 @@
+import time
+from math import sqrt
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import cho_factor, cho_solve
+from scipy.sparse.linalg import factorized
+
+
+def solve_admm(A, b, c, cone, eps=1e-6, max_iters=20000, warm_start=None, rho=1., sigma=1e-6, alpha=1.6,
+               anderson_memory=10, check_every=25, adapt_every=0, verbose=False):
+    """
+    Solve a conic program in the standard form of SCS
+
+    .. math:: \\min_{x} c^T x \\quad \\text{s.t.} \\quad A x + s = b, \\quad s \\in \\mathcal{K},
+
+    where :math:`\\mathcal{K}` is the product of a zero cone, of a nonnegative orthant and of a **single** PSD cone,
+    with an operator-splitting (ADMM) method written in NumPy/SciPy.
+
+    Introducing :math:`z = Ax \\in b - \\mathcal{K}`, each iteration solves one linear system with the matrix
+    :math:`\\sigma I + A^T \\mathrm{diag}(\\rho) A`, factorized once (and again only when :math:`\\rho` is adapted),
+    and projects onto :math:`b - \\mathcal{K}`: a clipping for the orthant, and one eigendecomposition of the
+    (small) PSD block. The iterations are accelerated with (safeguarded) Anderson acceleration.
+    The step-size :math:`\\rho` (1000 times larger on the equality constraints) is constant by default:
+    on PEPs, adapting it to balance the primal and dual residuals tends to make the duality gap stall.
+
+    Args:
+        A (scipy.sparse matrix): constraint matrix.
+        b (ndarray): constraint vector.
+        c (ndarray): cost vector.
+        cone (dict): cone description, in the format of SCS, with keys 'z', 'l' and 's' (a list of one size).
+        eps (float): relative tolerance on the primal residual, the dual residual and the duality gap.
+        max_iters (int): maximum number of iterations.
+        warm_start (dict or None): dictionary with keys 'x', 'y' and 's' used as initial guess
+                                   (e.g. a previous solution, of this function or of SCS).
+        rho (float): initial step-size.
+        sigma (float): proximal regularization of x.
+        alpha (float): relaxation parameter, in (0, 2).
+        anderson_memory (int): number of past iterates used by Anderson acceleration (0 to disable it).
+        check_every (int): number of iterations between two evaluations of the stopping criterion.
+        adapt_every (int): number of iterations between two adaptations of rho (0 to keep it constant).
+        verbose (bool): whether to print the residuals.
+
+    Returns:
+        solution (dict): dictionary with keys 'x', 'y', 's' and 'info' (with keys 'status', 'iter', 'pobj', 'dobj',
+                         'res_pri', 'res_dual', 'gap', 'rho' and 'solve_time', in milliseconds),
+                         in the format of SCS.
+
+    Example:
+        >>> from code.sdp import CompiledPEP
+        >>> pep = CompiledPEP(steps=[[0] * t + [.2] for t in range(4)], L=1)
+        >>> solution = solve_admm(pep.A, pep.b, pep.c, pep.cone)
+        >>> pepit_tau = - solution['info']['pobj']
+
+    """
+
+    start = time.perf_counter()
+    if len(cone.get('s', [])) != 1:
+        raise ValueError("solve_admm handles a single PSD cone. Got {}".format(cone.get('s')))
+    A = sp.csc_matrix(A)
+    m, d = A.shape
+    nb_zero, nb_linear, size = cone.get('z', 0), cone.get('l', 0), cone['s'][0]
+    linear, psd = slice(nb_zero, nb_zero + nb_linear), slice(nb_zero + nb_linear, m)
+
+    # Projection onto b - K
+    cols, rows = np.triu_indices(size)
+    svec_scaling = np.where(rows == cols, 1., sqrt(2))
+    matrix = np.zeros((size, size))
+
+    def project(v):
+        z = np.empty(m)
+        z[:nb_zero] = b[:nb_zero]
+        z[linear] = np.minimum(v[linear], b[linear])
+        matrix[rows, cols] = (b[psd] - v[psd]) / svec_scaling
+        eigenvalues, eigenvectors = np.linalg.eigh(matrix, UPLO='L')
+        eigenvectors = eigenvectors[:, eigenvalues > 0]
+        projection = (eigenvectors * eigenvalues[eigenvalues > 0]) @ eigenvectors.T
+        z[psd] = b[psd] - svec_scaling * projection[rows, cols]
+        return z
+
+    # Linear system with sigma I + A^T diag(rho) A (dense Cholesky factorization when small enough)
+    def factorize(rho):
+        rho_vector = np.full(m, float(rho))
+        rho_vector[:nb_zero] *= 1e3
+        kkt_matrix = sigma * sp.identity(d) + A.T @ sp.diags(rho_vector) @ A
+        if d <= 3000:
+            factor = cho_factor(kkt_matrix.toarray())
+            return rho_vector, lambda rhs: cho_solve(factor, rhs, check_finite=False)
+        return rho_vector, factorized(sp.csc_matrix(kkt_matrix))
+
+    def iterate(w):
+        x, z, y = w[:d], w[d:d + m], w[d + m:]
+        x_tilde = solve_kkt(sigma * x - c + A.T @ (rho_vector * z - y))
+        z_relaxed = alpha * (A @ x_tilde) + (1 - alpha) * z
+        z_new = project(z_relaxed + y / rho_vector)
+        return np.concatenate([alpha * x_tilde + (1 - alpha) * x, z_new, y + rho_vector * (z_relaxed - z_new)])
+
+    # Initial guess
+    if warm_start is None:
+        w = np.concatenate([np.zeros(d), project(np.zeros(m)), np.zeros(m)])
+    else:
+        w = np.concatenate([warm_start['x'], b - warm_start['s'], warm_start['y']])
+
+    rho_vector, solve_kkt = factorize(rho)
+    status = 'solved (inaccurate - reached max_iters)'
+    delta_w, delta_g = list(), list()
+    previous_w = previous_g = safe_w = None
+    for iteration in range(1, max_iters + 1):
+
+        # ADMM step
+        next_w = iterate(w)
+        g = next_w - w
+        norm_g = np.linalg.norm(g)
+
+        # Safeguard: reject the last accelerated step if it increased the fixed-point residual
+        if safe_w is not None and norm_g > safe_norm_g:
+            w, safe_w, previous_w = safe_w, None, None
+            delta_w, delta_g = list(), list()
+            continue
+
+        # Anderson acceleration (type II)
+        if previous_w is not None:
+            delta_w.append(w - previous_w)
+            delta_g.append(g - previous_g)
+            delta_w, delta_g = delta_w[-anderson_memory:], delta_g[-anderson_memory:]
+        previous_w, previous_g = w, g
+        if anderson_memory and delta_g:
+            # Least squares over the (few) columns of G, through the regularized normal equations
+            G = np.array(delta_g)
+            gram = G @ G.T
+            gamma = np.linalg.solve(gram + 1e-10 * np.trace(gram) * np.eye(len(G)), G @ g)
+            safe_w, safe_norm_g = next_w, norm_g
+            w = next_w - (np.array(delta_w) + G).T @ gamma
+        else:
+            w = next_w
+
+        if iteration % check_every and iteration != max_iters:
+            continue
+
+        # Stopping criterion
+        x, z, y = next_w[:d], next_w[d:d + m], next_w[d + m:]
+        Ax, ATy = A @ x, A.T @ y
+        pobj, dobj = c @ x, - b @ y
+        res_pri = np.max(np.abs(Ax - z)) / (1 + max(np.max(np.abs(Ax)), np.max(np.abs(b))))
+        res_dual = np.max(np.abs(c + ATy)) / (1 + max(np.max(np.abs(c)), np.max(np.abs(ATy))))
+        gap = abs(pobj - dobj) / (1 + abs(pobj) + abs(dobj))
+        if verbose:
+            print('\t\t iteration {}: pobj {}, residuals {:.2e} (primal) {:.2e} (dual), gap {:.2e}, rho {:.1e}'.format(
+                iteration, pobj, res_pri, res_dual, gap, rho))
+        if max(res_pri, res_dual, gap) < eps:
+            status = 'solved'
+            break
+
+        # Balance the residuals (which requires a new factorization and a fresh acceleration memory)
+        if adapt_every and iteration % adapt_every == 0:
+            ratio = np.sqrt(res_pri / max(res_dual, 1e-16))
+            if ratio > 5 or ratio < .2:
+                rho = np.clip(rho * ratio, 1e-4, 1e4)
+                rho_vector, solve_kkt = factorize(rho)
+                w, safe_w, previous_w = next_w, None, None
+                delta_w, delta_g = list(), list()
+
+    info = {'status': status, 'iter': iteration, 'pobj': pobj, 'dobj': dobj, 'res_pri': res_pri,
+            'res_dual': res_dual, 'gap': gap, 'rho': rho, 'solve_time': 1e3 * (time.perf_counter() - start)}
+
+    return {'x': x, 'y': y, 's': b - z, 'info': info}
+
+
+if __name__ == "__main__":
+
+    from code.sdp import CompiledPEP
+    from code.gradient_descent_qg_convex import gradient_descent_steps
+    from code.gradient_descent_qg_convex_decreasing import gradient_descent_decreasing_steps
+    from code.heavy_ball_momentum_qg_convex import heavy_ball_momentum_steps
+
+    # Benchmark against SCS on the examples of the repository
+    for name, steps_of in [('gradient descent', lambda n: gradient_descent_steps(gamma=1, n=n)),
+                           ('gradient descent (decreasing)', lambda n: gradient_descent_decreasing_steps(L=1, n=n)),
+                           ('heavy-ball momentum', lambda n: heavy_ball_momentum_steps(L=1, n=n)),
+                           ('conjugate gradient', lambda n: [None] * n)]:
+        for n in [5, 10, 20, 40]:
+            pep = CompiledPEP(steps_of(n), L=1)
+            scs_tau = pep.solve(verbose=0, eps=1e-6)
+            scs_info = pep.solution['info']
+            admm_tau = pep.solve(verbose=0, eps=1e-6, solver='admm')
+            admm_info = pep.solution['info']
+            print('{} (n={}): SCS {:.8f} in {:.3f}s ({} iterations), ADMM {:.8f} in {:.3f}s ({} iterations)'.format(
+                name, n, scs_tau, scs_info['solve_time'] / 1e3, scs_info['iter'], admm_tau,
+                admm_info['solve_time'] / 1e3, admm_info['iter']))
@@ -0,0 +1,379 @@
+import time
+from fractions import Fraction
+
+import numpy as np
+
+from code.sdp.compiler import CompiledPEP
+
+
+def exact_coefficients(steps):
+    """
+    Run a method with fixed steps symbolically over the leaf basis (see :class:`CompiledPEP`), in exact arithmetic:
+    each step coefficient is converted to the :class:`Fraction` it represents.
+
+    Args:
+        steps (list): the step-coefficient table of the method (without span search).
+
+    Returns:
+        points (ndarray): coefficients (of type :class:`Fraction`) of :math:`x_\\star, x_0, \\dots, x_n`.
+        gradients (ndarray): coefficients (of type int) of :math:`g_\\star = 0, g_0, \\dots, g_n`.
+
+    """
+
+    n = len(steps)
+    if any(row is None for row in steps):
+        raise ValueError('Exact certificates are only available for methods without span search')
+
+    # The leaves are x_0, g_0, ..., g_n
+    points = np.full((n + 2, n + 2), Fraction(0), dtype=object)
+    gradients = np.zeros((n + 2, n + 2), dtype=object)
+    points[1, 0] = Fraction(1)
+    gradients[1:, 1:] = np.eye(n + 1, dtype=int)
+    for t, row in enumerate(steps):
+        # x_{t+1} = x_t - sum_k h_{t, k} g_k, where g_k is the leaf k + 1
+        points[t + 2] = points[t + 1]
+        points[t + 2, 1:t + 2] -= np.array([Fraction(h) for h in row], dtype=object)
+
+    return points, gradients
+
+
+def common_denominator(fractions):
+    """
+    Least common multiple of the denominators of some fractions.
+    """
+
+    denominator = 1
+    for fraction in fractions:
+        denominator = np.lcm(denominator, fraction.denominator, dtype=object)
+
+    return int(denominator)
+
+
+def leading_principal_minors(matrix):
+    """
+    Leading principal minors of a symmetric integer matrix, computed exactly by fraction-free Gaussian elimination
+    (Bareiss algorithm), which is the fraction-free form of the :math:`LDL^T` factorization:
+    the k-th pivot of D is the ratio of the k-th and (k-1)-th leading principal minors.
+
+    Args:
+        matrix (ndarray): square matrix of Python integers (dtype object).
+
+    Returns:
+        minors (list): the leading principal minors, as Python integers.
+
+    """
+
+    matrix = np.array(matrix, dtype=object)
+    size = matrix.shape[0]
+    minors = list()
+    previous_pivot = 1
+    for k in range(size):
+        pivot = matrix[k, k]
+        minors.append(pivot)
+        if pivot == 0:
+            break
+        # Each division is exact (Sylvester's identity)
+        matrix[k + 1:, k + 1:] = (pivot * matrix[k + 1:, k + 1:]
+                                  - np.outer(matrix[k + 1:, k], matrix[k, k + 1:])) // previous_pivot
+        previous_pivot = pivot
+
+    return minors
+
+
+def is_positive_definite(matrix):
+    """
+    Exact test of positive definiteness of a symmetric integer matrix (Sylvester's criterion,
+    see :func:`leading_principal_minors`).
+    """
+
+    minors = leading_principal_minors(matrix)
+    return len(minors) == np.shape(matrix)[0] and all(minor > 0 for minor in minors)
+
+
+def is_positive_semidefinite(matrix, bits=60, exact_size=40):
+    """
+    Exact test of positive semidefiniteness of a symmetric integer matrix S, scaling to large matrices.
+
+    A Cholesky factorization :math:`S - \\sigma I \\approx R R^T` is computed in floating point,
+    with :math:`\\sigma` half the smallest eigenvalue of S, and R is rounded to a dyadic matrix :math:`\\tilde R`.
+    The remainder :math:`E = S - \\tilde R \\tilde R^T` is then computed exactly: if it is diagonally dominant
+    with a nonnegative diagonal, :math:`S = \\tilde R \\tilde R^T + E` is positive semidefinite.
+    This only costs one product of integer matrices, while the fraction-free :math:`LDL^T` factorization
+    (see :func:`is_positive_definite`) handles integers whose size grows with the dimension.
+    The latter is used when the former is inconclusive, for matrices of size at most `exact_size`.
+
+    Args:
+        matrix (ndarray): square matrix of Python integers (dtype object).
+        bits (int): R is rounded to multiples of :math:`2^{-bits}` (relatively to the largest entry of S).
+        exact_size (int): maximal size of the matrices on which the exact :math:`LDL^T` factorization is run.
+
+    Returns:
+        psd (bool): True if S is proven positive semidefinite
+                    (False if it is not, or if it is not proven so and larger than `exact_size`).
+
+    """
+
+    matrix = np.array(matrix, dtype=object)
+    size = matrix.shape[0]
+
+    # Floating-point factorization of the normalized matrix S / scale
+    scale = max(max(abs(int(value)) for value in matrix.ravel()), 1)
+    float_matrix = np.array([[float(Fraction(int(value), scale)) for value in row] for row in matrix])
+    smallest_eigenvalue = np.linalg.eigvalsh(float_matrix)[0]
+    if smallest_eigenvalue > 0:
+        factor = np.linalg.cholesky(float_matrix - smallest_eigenvalue / 2 * np.eye(size))
+
+        # Exact remainder 2^(2 bits) scale E
+        int_factor = np.array([[int(round(value * 2 ** bits)) for value in row] for row in factor], dtype=object)
+        remainder = 2 ** (2 * bits) * matrix - scale * (int_factor @ int_factor.T)
+        diagonal = np.diag(remainder)
+        off_diagonal = np.abs(remainder).sum(axis=1) - np.abs(diagonal)
+        if all(diagonal[i] >= off_diagonal[i] for i in range(size)):
+            return True
+
+    if size <= exact_size:
+        return is_positive_definite(matrix)
+
+    return False
+
+
+class RationalCertificate(object):
+    """
+    The :class:`RationalCertificate` class turns an approximate dual solution of a compiled PEP
+    (see :class:`CompiledPEP`) into a proof, in exact rational arithmetic, of the upper bound
+    :math:`f(x_n) - f_\\star \\leqslant \\tau \\|x_0 - x_\\star\\|^2`.
+
+    The multipliers :math:`\\lambda_k \\geqslant 0` of the interpolation inequalities
+    :math:`a_k^T F + \\langle M_k, G \\rangle \\leqslant 0` and the multiplier :math:`\\tau` of the initial condition
+    are rounded to dyadic rationals. The multipliers of the inequalities :math:`f_\\star - f_t \\leqslant 0` and of
+    the QG^+ inequalities between :math:`x_\\star` and :math:`x_t` are then corrected so that
+    :math:`\\sum_k \\lambda_k a_k = e_n` holds exactly, which gives, for any feasible F and G,
+
+    .. math:: f_n = \\sum_k \\lambda_k a_k^T F \\leqslant - \\sum_k \\lambda_k \\langle M_k, G \\rangle
+              = \\tau \\langle x_0 x_0^T, G \\rangle - \\langle S, G \\rangle \\leqslant \\tau,
+
+    as soon as the dual matrix :math:`S = \\tau x_0 x_0^T + \\sum_k \\lambda_k M_k` is positive semidefinite.
+    This last condition is checked exactly, with integer arithmetic (see :func:`is_positive_semidefinite`).
+
+    For S to be positive definite, and not only semidefinite (which rounding would not preserve),
+    the dual solution should come from a PEP whose objective :math:`f_n` is replaced by
+    :math:`f_n + \\epsilon \\mathrm{Tr}(G)` (see :func:`certify_upper_bound`): its dual matrix verifies
+    :math:`S \\succeq \\epsilon I`, at the price of a bound larger by :math:`O(\\epsilon)`.
+
+    Attributes:
+        steps (list): the step-coefficient table of the method (without span search).
+        L (Fraction): the quadratic upper bound parameter.
+        pairs (ndarray): indices (i, j) of the points involved in each interpolation inequality.
+        is_qg (ndarray): True for the QG^+ interpolation inequalities.
+        tau (Fraction): the certified upper bound.
+        multipliers (list): the multipliers (of type :class:`Fraction`) of the interpolation inequalities.
+
+    Example:
+        >>> pep = CompiledPEP(steps=[[0] * t + [1] for t in range(5)], L=1)
+        >>> pepit_tau = pep.solve(verbose=0)
+        >>> certificate = RationalCertificate.from_solution(pep)
+        >>> verified = certificate.verify()
+
+    """
+
+    def __init__(self, steps, L, pairs, is_qg, tau, multipliers):
+        """
+
+        Args:
+            steps (list): the step-coefficient table of the method (without span search).
+            L (float): the quadratic upper bound parameter.
+            pairs (ndarray): indices (i, j) of the points involved in each interpolation inequality.
+            is_qg (ndarray): True for the QG^+ interpolation inequalities.
+            tau (Fraction): the upper bound to certify.
+            multipliers (list): nonnegative multipliers (of type :class:`Fraction`) of the interpolation
+                                inequalities, verifying the balance of the function values exactly.
+
+        """
+
+        self.steps = list(steps)
+        self.L = Fraction(L)
+        self.pairs = np.asarray(pairs)
+        self.is_qg = np.asarray(is_qg, dtype=bool)
+        self.tau = Fraction(tau)
+        self.multipliers = [Fraction(multiplier) for multiplier in multipliers]
+
+    @classmethod
+    def from_solution(cls, compiled_pep, bits=40):
+        """
+        Round the dual solution of a solved :class:`CompiledPEP` to a candidate certificate.
+
+        Args:
+            compiled_pep (CompiledPEP): a solved compiled PEP of a method without span search,
+                                        formulating all the interpolation inequalities.
+            bits (int): the multipliers are rounded to multiples of :math:`2^{-bits}`
+                        (the one of the initial condition upwards).
+
+        Returns:
+            certificate (RationalCertificate): the candidate certificate.
+
+        """
+
+        pairs = compiled_pep.pairs
+        is_qg = compiled_pep._all_is_qg[compiled_pep.interpolation_rows]
+        if compiled_pep.nb_span_search_constraints or pairs.shape[0] != compiled_pep._all_pairs.shape[0]:
+            raise ValueError('Exact certificates require all the interpolation constraints and no span search')
+
+        # Round the multipliers to dyadic rationals
+        scale = 2 ** bits
+        y = compiled_pep.solution['y']
+        tau = Fraction(int(np.ceil(y[compiled_pep.cone['z']] * scale)), scale)
+        multipliers = [Fraction(int(round(max(value, 0) * scale)), scale)
+                       for value in y[compiled_pep.interpolation_slice]]
+
+        # Balance the function values: sum_k lambda_k (f_{j_k} - f_{i_k}) = f_n
+        balance = [Fraction(0)] * (compiled_pep.n + 2)
+        for (i, j), multiplier in zip(pairs, multipliers):
+            balance[j] += multiplier
+            balance[i] -= multiplier
+        balance[-1] -= 1
+        row_of_pair = {(i, j, qg): row for row, ((i, j), qg) in enumerate(zip(pairs, is_qg))}
+        for point in range(1, compiled_pep.n + 2):
+            if balance[point] > 0:
+                # Excess on f_t: add f_* - f_t <= 0, which does not involve G
+                multipliers[row_of_pair[(point, 0, False)]] += balance[point]
+            elif balance[point] < 0:
+                # Deficit on f_t: add the QG^+ inequality between x_* and x_t
+                multipliers[row_of_pair[(0, point, True)]] -= balance[point]
+
+        return cls(compiled_pep.steps, compiled_pep.L, pairs, is_qg, tau, multipliers)
+
+    def function_value_balance(self):
+        """
+        Coefficients of :math:`\\sum_k \\lambda_k a_k - e_n` on the function values :math:`f_0, \\dots, f_n`
+        (all zero for a valid certificate), :math:`f_\\star = 0` not being a variable.
+        """
+
+        balance = [Fraction(0)] * (len(self.steps) + 2)
+        for (i, j), multiplier in zip(self.pairs, self.multipliers):
+            balance[j] += multiplier
+            balance[i] -= multiplier
+        balance[-1] -= 1
+
+        return balance[1:]
+
+    def dual_matrix(self):
+        """
+        Dual matrix :math:`S = \\tau x_0 x_0^T + \\sum_k \\lambda_k M_k`, multiplied by a positive integer
+        so that all its entries are integers.
+
+        Returns:
+            matrix (ndarray): the scaled dual matrix, of Python integers (dtype object).
+
+        """
+
+        points, gradients = exact_coefficients(self.steps)
+        nb_points = points.shape[0]
+
+        # Common denominators of the multipliers and of the coefficients of the points
+        multipliers_denominator = common_denominator(self.multipliers + [self.tau])
+        points_denominator = common_denominator(points.ravel())
+        int_points = np.array([[int(value * points_denominator) for value in row] for row in points], dtype=object)
+
+        # Multipliers of the pairs, gathered in matrices
+        weights = np.zeros((nb_points, nb_points), dtype=object)
+        qg_weights = np.zeros(nb_points, dtype=object)
+        for (i, j), qg, multiplier in zip(self.pairs, self.is_qg, self.multipliers):
+            weights[i, j] += int(multiplier * multipliers_denominator)
+            if qg:
+                qg_weights[j] += int(multiplier * multipliers_denominator)
+
+        # sum_k lambda_k g_j (x_i - x_j)^T
+        inner_term = gradients.T @ ((weights.T - np.diag(weights.sum(axis=0))) @ int_points)
+
+        # sum_k lambda_k / (2L) g_j g_j^T on the QG^+ inequalities
+        squared_term = gradients.T @ (qg_weights[:, None] * gradients)
+
+        # S scaled by 2 * multipliers_denominator * points_denominator * 2 * L.numerator
+        x0 = int_points[1]
+        matrix = (self.L.numerator * (inner_term + inner_term.T) * 2
+                  + 2 * self.L.denominator * points_denominator * squared_term)
+        matrix = matrix * points_denominator
+        matrix = matrix + (4 * self.L.numerator * int(self.tau * multipliers_denominator)) * np.outer(x0, x0)
+
+        return matrix
+
+    def verify(self):
+        """
+        Check the certificate exactly.
+
+        Returns:
+            verified (bool): True if the multipliers are nonnegative, balance the function values exactly,
+                             and lead to a dual matrix proven positive semidefinite.
+
+        """
+
+        if any(multiplier < 0 for multiplier in self.multipliers) or self.tau < 0:
+            return False
+        if any(coefficient != 0 for coefficient in self.function_value_balance()):
+            return False
+
+        return is_positive_semidefinite(self.dual_matrix())
+
+
+def certify_upper_bound(steps, L, margin=1e-6, eps=1e-6, bits=40, max_attempts=3, verbose=1, **kwargs):
+    """
+    Compute a worst-case guarantee of a method with fixed steps on QG^+ convex functions, and prove it exactly:
+    a dual solution of moderate accuracy is rounded to rational multipliers, which are checked in exact arithmetic
+    (see :class:`RationalCertificate`).
+
+    The PEP is solved with the objective :math:`f(x_n) - f_\\star + \\epsilon \\mathrm{Tr}(G)`, where
+    :math:`\\epsilon` = `margin`, so that the dual matrix is positive definite with some margin, which rounding
+    and the inaccuracy of the solver preserve. The certified bound is therefore larger than the worst-case value
+    by :math:`O(\\epsilon)`. When the check fails, the margin is multiplied by 10 and the PEP solved again.
+
+    Args:
+        steps (list): the step-coefficient table of the method, without span search (a ValueError is raised
+                      before solving otherwise).
+        L (float): the quadratic upper bound parameter.
+        margin (float): the weight :math:`\\epsilon` of the trace of the Gram matrix in the objective.
+        eps (float): tolerance of the SDP solver.
+        bits (int): the multipliers are rounded to multiples of :math:`2^{-bits}`.
+        max_attempts (int): maximal number of margins tried.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`CompiledPEP.solve` (e.g. solver='clarabel').
+
+    Returns:
+        tau (Fraction): the upper bound.
+        verified (bool): whether the upper bound is proven.
+        certificate (RationalCertificate): the certificate.
+
+    Example:
+        >>> tau, verified, certificate = certify_upper_bound(steps=[[0] * t + [1] for t in range(5)], L=1)
+
+    """
+
+    # Span searches cannot be certified: fail before solving anything
+    if any(row is None for row in steps):
+        raise ValueError('Exact certificates are only available for methods without span search')
+
+    compiled_pep = CompiledPEP(steps, L)
+    cols, rows = np.triu_indices(compiled_pep.nb_leaves)
+    trace_columns = compiled_pep.nb_values + np.flatnonzero(rows == cols)
+
+    for attempt in range(max_attempts):
+
+        # Solve the PEP with the objective f_n + margin * Tr(G)
+        compiled_pep.c[trace_columns] = - margin
+        start = time.perf_counter()
+        compiled_pep.solve(verbose=max(verbose - 1, 0), eps=eps, **kwargs)
+        solve_time = time.perf_counter() - start
+
+        # Round and check the dual solution
+        start = time.perf_counter()
+        certificate = RationalCertificate.from_solution(compiled_pep, bits=bits)
+        verified = certificate.verify()
+        check_time = time.perf_counter() - start
+
+        if verbose:
+            print('(PEP certificate) Margin {:.0e}: upper bound {} {} (solved in {:.3}s, checked in {:.3}s)'.format(
+                margin, float(certificate.tau), 'verified' if verified else 'NOT verified', solve_time, check_time))
+        if verified:
+            break
+        margin *= 10
+
+    return certificate.tau, verified, certificate
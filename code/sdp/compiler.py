@@ -0,0 +1,380 @@
+from math import sqrt
+
+import numpy as np
+import scipy.sparse as sp
+import scs
+
+from code.function_class import qg_convex_interpolation_pairs, qg_convex_interpolation_arrays
+from code.tools.coefficients import row_wise_outer
+from code.tools.dense import DenseOracle, stack_points
+from code.tools.backends import COMPILED_SOLVERS, solve_with_fallback
+from code.tools.cache import report_solve
+from code.sdp.admm import solve_admm
+
+
+def vec_to_svec(G_matrix, nb_leaves):
+    """
+    Convert coefficients on vec(G) (column-major ordering) into coefficients on svec(G),
+    the scaled lower triangle of G stored column by column, as expected by the PSD cone of SCS.
+
+    Args:
+        G_matrix (scipy.sparse matrix): coefficients on vec(G), of shape (m, nb_leaves ** 2).
+        nb_leaves (int): size of the Gram matrix G.
+
+    Returns:
+        svec_matrix (scipy.sparse.csr_matrix): coefficients on svec(G), of shape (m, nb_leaves (nb_leaves + 1) / 2).
+
+    """
+
+    G_matrix = sp.coo_matrix(G_matrix)
+    p, q = G_matrix.col % nb_leaves, G_matrix.col // nb_leaves
+    row, col = np.maximum(p, q), np.minimum(p, q)
+    svec_cols = col * nb_leaves - col * (col - 1) // 2 + row - col
+    data = np.where(p == q, G_matrix.data, G_matrix.data / sqrt(2))
+
+    return sp.csr_matrix((data, (G_matrix.row, svec_cols)),
+                         shape=(G_matrix.shape[0], nb_leaves * (nb_leaves + 1) // 2))
+
+
+def svec_to_matrix(svec, nb_leaves):
+    """
+    Rebuild a symmetric matrix from its scaled lower triangle (see :func:`vec_to_svec`).
+
+    Args:
+        svec (ndarray): vector of size nb_leaves (nb_leaves + 1) / 2.
+        nb_leaves (int): size of the matrix.
+
+    Returns:
+        matrix (ndarray): symmetric matrix of shape (nb_leaves, nb_leaves).
+
+    """
+
+    cols, rows = np.triu_indices(nb_leaves)
+    matrix = np.zeros((nb_leaves, nb_leaves))
+    matrix[rows, cols] = np.where(rows == cols, svec, svec / sqrt(2))
+    matrix[cols, rows] = matrix[rows, cols]
+
+    return matrix
+
+
+class CompiledPEP(object):
+    """
+    The :class:`CompiledPEP` class encodes the PEP of a first-order method on the class of QG^+ convex functions
+    directly as SDP data, without building any :class:`Point` or :class:`Expression` object,
+    nor going through cvxpy canonicalization.
+
+    The method is described by its step-coefficient table `steps`, of length n, where `steps[t]` is either
+
+        - a list of t + 1 coefficients :math:`(h_{t, k})_{k \\leqslant t}` describing the fixed-step update
+
+          .. math:: x_{t+1} = x_t - \\sum_{k=0}^t h_{t, k} \\nabla f(x_k),
+
+        - or None, describing an exact span search (as in the conjugate gradient method):
+          :math:`x_{t+1}` is a new point whose gradient is orthogonal to :math:`x_{t+1} - x_t`,
+          to all the previous gradients, and to all the previous displacements :math:`x_k - x_{k+1}`.
+
+    The PEP maximizes :math:`f(x_n) - f_\\star` over all the QG^+ convex functions with parameter L
+    and starting points verifying :math:`\\|x_0 - x_\\star\\|^2 \\leqslant 1`.
+    Without loss of generality, :math:`x_\\star = 0` and :math:`f_\\star = 0`.
+
+    The SDP is stored in the standard form of SCS
+
+    .. math:: \\min_{x} c^T x \\quad \\text{s.t.} \\quad A x + s = b, \\quad s \\in \\mathcal{K},
+
+    where :math:`x = (F, \\mathrm{svec}(G))` gathers the function values :math:`f(x_0), \\dots, f(x_n)` and
+    the scaled lower triangle of the Gram matrix :math:`G` of the leaf points
+    (:math:`x_0`, the gradients and the iterates resulting from span searches),
+    and :math:`\\mathcal{K}` is the product of a zero cone (span-search conditions), of a nonnegative orthant
+    (initial condition and interpolation conditions) and of a single PSD cone.
+
+    Attributes:
+        steps (list): the step-coefficient table.
+        L (float): the quadratic upper bound parameter.
+        n (int): number of iterations.
+        nb_leaves (int): size of the Gram matrix.
+        nb_values (int): number of function values.
+        points (ndarray): coefficients of :math:`x_\\star, x_0, \\dots, x_n` over the leaf basis.
+        gradients (ndarray): coefficients of :math:`g_\\star = 0, g_0, \\dots, g_n` over the leaf basis.
+        values (ndarray): coefficients of :math:`f_\\star = 0, f_0, \\dots, f_n` over F.
+        interpolation_rows (ndarray): indices of the formulated interpolation constraints,
+                                      in the order of :func:`qg_convex_interpolation_pairs`.
+        pairs (ndarray): indices (i, j) of the points involved in each formulated interpolation constraint
+                         (index 0 denotes :math:`x_\\star` and index t + 1 denotes :math:`x_t`).
+        A (scipy.sparse.csc_matrix): constraint matrix.
+        b (ndarray): constraint vector.
+        c (ndarray): cost vector.
+        cone (dict): cone description, in the format of SCS.
+        solution (dict): the last solution, in the format of SCS (None before solving).
+
+    Example:
+        >>> pep = CompiledPEP(steps=[[0] * t + [.2] for t in range(4)], L=1)
+        >>> pepit_tau = pep.solve(verbose=0)
+
+    """
+
+    def __init__(self, steps, L, interpolation_rows=None):
+        """
+
+        Args:
+            steps (list): the step-coefficient table of the method.
+            L (float): the quadratic upper bound parameter.
+            interpolation_rows (ndarray or None): if not None, indices (in the order of
+                                                  :func:`qg_convex_interpolation_pairs`) of the only
+                                                  interpolation constraints to formulate.
+                                                  All of them are formulated by default.
+
+        """
+
+        self.steps = list(steps)
+        self.L = L
+        self.n = len(self.steps)
+        self.solution = None
+
+        # Select the interpolation constraints to formulate
+        all_pairs, self._all_is_qg = qg_convex_interpolation_pairs(self.n + 2, stationary_indices=[0])
+        if interpolation_rows is None:
+            self.interpolation_rows = np.arange(all_pairs.shape[0])
+        else:
+            self.interpolation_rows = np.unique(interpolation_rows)
+        self._all_pairs = all_pairs
+
+        # Build the coefficients of the points, gradients and function values
+        self._compute_coefficients()
+
+        # Build the SDP data
+        self._compile()
+
+    def _compute_coefficients(self):
+        """
+        Run the method symbolically on :class:`code.tools.dense.DensePoint` objects: each point and gradient is a dense
+        vector of coefficients over the leaf basis, and each step only combines the gradients it involves.
+        """
+
+        oracle = DenseOracle()
+        oracle.stationary_point()
+
+        # x_0 and g_0 are the first leaves
+        x = oracle.basis.new_point()
+        g, _ = oracle.oracle(x)
+        iterate_gradients = [g]
+        span = [g]
+
+        # Iterate the method
+        for t, row in enumerate(self.steps):
+            previous_x = x
+            if row is None:
+                # Exact span search: x_{t+1} is a new leaf, whose gradient is orthogonal to x_{t+1} - x_t,
+                # to the previous gradients and to the previous displacements
+                x, g, _ = oracle.exact_search(x, span)
+            else:
+                row = np.asarray(row, dtype=float)
+                if row.shape != (t + 1,):
+                    raise ValueError("steps[{}] must contain {} coefficients. Got {}".format(t, t + 1, row.size))
+                for k in np.flatnonzero(row):
+                    x = x - row[k] * iterate_gradients[k]
+                g, _ = oracle.oracle(x)
+            iterate_gradients.append(g)
+            span += [g, previous_x - x]
+
+        # Stack the coefficients (the triplets being x_*, x_0, ..., x_n)
+        self.nb_leaves = oracle.basis.nb_leaves
+        self.nb_values = oracle.basis.nb_values
+        self.points = stack_points([point for point, _, _ in oracle.triplets], self.nb_leaves)
+        self.gradients = stack_points([gradient for _, gradient, _ in oracle.triplets], self.nb_leaves)
+        self.values = np.zeros((len(oracle.triplets), self.nb_values))
+        for index, (_, _, value) in enumerate(oracle.triplets):
+            if value is not None:
+                self.values[index, value] = 1
+        self._span_search_rows = [(index - 1, stack_points(directions, self.nb_leaves))
+                                  for index, directions in oracle.searches]
+
+    def _compile(self):
+        """
+        Assemble A, b, c and the cone description.
+        """
+
+        nb_leaves = self.nb_leaves
+        nb_svec = nb_leaves * (nb_leaves + 1) // 2
+
+        # Span-search conditions (zero cone)
+        zero_rows = [sp.csr_matrix((0, nb_svec))]
+        for iterate, directions in self._span_search_rows:
+            gradient = np.tile(self.gradients[iterate + 1], (directions.shape[0], 1))
+            zero_rows.append(vec_to_svec(row_wise_outer(gradient, directions), nb_leaves))
+        zero_G = sp.vstack(zero_rows)
+        nb_zero = zero_G.shape[0]
+
+        # Initial condition ||x_0 - x_*||^2 <= 1 (nonnegative orthant)
+        x0 = sp.csr_matrix(self.points[1:2])
+        initial_G = vec_to_svec(row_wise_outer(x0, x0), nb_leaves)
+
+        # Interpolation conditions (nonnegative orthant)
+        F_matrix, G_matrix, self.pairs = qg_convex_interpolation_arrays(self.points, self.gradients, self.values,
+                                                                        stationary_indices=[0], L=self.L,
+                                                                        rows=self.interpolation_rows)
+        interpolation_G = vec_to_svec(G_matrix, nb_leaves)
+        nb_linear = 1 + interpolation_G.shape[0]
+
+        # Stack everything, the last block encoding G in the PSD cone
+        self.A = sp.bmat([[sp.csr_matrix((nb_zero, self.nb_values)), zero_G],
+                          [sp.csr_matrix((1, self.nb_values)), initial_G],
+                          [F_matrix, interpolation_G],
+                          [None, -sp.identity(nb_svec)]], format='csc')
+        self.b = np.zeros(self.A.shape[0])
+        self.b[nb_zero] = 1
+        self.c = np.zeros(self.A.shape[1])
+        self.c[self.nb_values - 1] = -1
+        self.cone = {'z': nb_zero, 'l': nb_linear, 's': [nb_leaves]}
+
+    @property
+    def nb_interpolation_constraints(self):
+        return self.pairs.shape[0]
+
+    @property
+    def nb_span_search_constraints(self):
+        return self.cone['z']
+
+    @property
+    def interpolation_slice(self):
+        """
+        Slice of the rows of A (and of the dual variables) corresponding to the formulated interpolation constraints.
+        """
+        start = self.cone['z'] + 1
+        return slice(start, start + self.nb_interpolation_constraints)
+
+    def interpolation_residuals(self, gram_matrix=None, function_values=None):
+        """
+        Evaluate all the interpolation constraints (formulated or not), in one vectorized pass over the Gram matrix.
+        A constraint is violated when its residual is positive.
+
+        Args:
+            gram_matrix (ndarray or None): Gram matrix of the leaf points. Defaults to the one of the last solution.
+            function_values (ndarray or None): values :math:`f(x_0), \\dots, f(x_n)`.
+                                               Default to the ones of the last solution.
+
+        Returns:
+            residuals (ndarray): residuals of all the interpolation constraints,
+                                 in the order of :func:`qg_convex_interpolation_pairs`.
+
+        """
+
+        if gram_matrix is None:
+            gram_matrix = self.gram_matrix
+        if function_values is None:
+            function_values = self.function_values
+
+        # Inner products <g_j, x_i> and squared norms ||g_j||^2
+        gradients_times_gram = self.gradients @ gram_matrix
+        inner_products = gradients_times_gram @ self.points.T
+        squared_norms = np.einsum('ij,ij->i', gradients_times_gram, self.gradients)
+        values = self.values @ function_values
+
+        # fj - fi + gj * (xi - xj) (+ 1 / (2L) * gj ** 2)
+        i, j = self._all_pairs[:, 0], self._all_pairs[:, 1]
+        return (values[j] - values[i] + inner_products[j, i] - inner_products[j, j]
+                + self._all_is_qg / (2 * self.L) * squared_norms[j])
+
+    def _solve_clarabel(self, eps, max_iters, verbose):
+        """
+        Solve the SDP with Clarabel (interior-point method), and store the solution in the format of SCS.
+        """
+
+        import clarabel
+
+        # Clarabel stores the upper triangle column by column, i.e. the lower triangle row by row
+        nb_cone_rows = self.cone['z'] + self.cone['l']
+        cols, rows = np.triu_indices(self.nb_leaves)
+        order = np.concatenate([np.arange(nb_cone_rows), nb_cone_rows + np.lexsort((cols, rows))])
+
+        settings = clarabel.DefaultSettings()
+        settings.verbose = verbose >= 2
+        settings.max_iter = min(max_iters, 1000)
+        settings.tol_gap_abs = settings.tol_gap_rel = settings.tol_feas = eps
+        cones = [clarabel.ZeroConeT(self.cone['z']), clarabel.NonnegativeConeT(self.cone['l']),
+                 clarabel.PSDTriangleConeT(self.nb_leaves)]
+        nb_variables = self.A.shape[1]
+        solution = clarabel.DefaultSolver(sp.csc_matrix((nb_variables, nb_variables)), self.c,
+                                          sp.csc_matrix(self.A[order]), self.b[order], cones, settings).solve()
+
+        y, s = np.empty(self.A.shape[0]), np.empty(self.A.shape[0])
+        y[order], s[order] = solution.z, solution.s
+        return {'x': np.array(solution.x), 'y': y, 's': s,
+                'info': {'status': str(solution.status), 'iter': solution.iterations, 'pobj': solution.obj_val,
+                         'dobj': solution.obj_val_dual, 'res_pri': solution.r_prim, 'res_dual': solution.r_dual,
+                         'solve_time': 1e3 * solution.solve_time}}
+
+    def solve(self, verbose=1, eps=1e-7, max_iters=100000, warm_start=None, solver='scs', log=None, **settings):
+        """
+        Solve the SDP with SCS, Clarabel, or the ADMM solver specialized to a single PSD block
+        (see :func:`solve_admm`), falling back to the other ones if the requested solver does not report
+        an accurate solution (see :func:`code.tools.backends.solve_with_fallback`).
+        The status and the Gram matrix of the solution are reported to the cache
+        (see :func:`code.tools.cache.report_solve`).
+
+        Args:
+            verbose (int): Level of information details to print.
+                           0: No verbose at all.
+                           1: Problem size and solver status.
+                           2: Problem size, solver status and solver details.
+            eps (float): absolute and relative tolerances of the solver.
+            max_iters (int): maximum number of iterations of the solver.
+            warm_start (dict or None): dictionary with keys 'x', 'y' and 's' used as initial guess
+                                       (ignored by Clarabel).
+            solver (str or list): 'scs', 'clarabel' or 'admm' (tried first, the other ones being fallbacks),
+                                  a list of them (tried in order), or 'auto' (see :func:`code.tools.solver_sequence`).
+            log (bool, SolverLog or None): whether to record the solves in the :class:`code.tools.SolverLog`
+                                           (by default, only if the environment variable QG_SOLVER_LOG is set).
+            settings: any other setting of the requested solver.
+
+        Returns:
+            pepit_tau (float): worst-case value.
+
+        """
+
+        if verbose:
+            print('(PEP compiler) Setting up the problem:'
+                  ' size of the main PSD matrix: {}x{}'.format(self.nb_leaves, self.nb_leaves))
+            print('(PEP compiler) Setting up the problem:'
+                  ' {} interpolation constraint(s), {} span-search constraint(s)'.format(
+                   self.nb_interpolation_constraints, self.nb_span_search_constraints))
+            print('(PEP compiler) Calling SDP solver')
+
+        def solve(name):
+            # The settings are specific to the requested solver
+            name_settings = settings if name == (solver if isinstance(solver, str) else solver[0]) else dict()
+            if name == 'scs':
+                scs_solver = scs.SCS({'A': self.A, 'b': self.b, 'c': self.c}, self.cone, eps_abs=eps, eps_rel=eps,
+                                     max_iters=max_iters, verbose=verbose >= 2, **name_settings)
+                if warm_start is None:
+                    self.solution = scs_solver.solve()
+                else:
+                    self.solution = scs_solver.solve(warm_start=True, **warm_start)
+            elif name == 'clarabel':
+                self.solution = self._solve_clarabel(eps, max_iters, verbose)
+            else:
+                self.solution = solve_admm(self.A, self.b, self.c, self.cone, eps=eps, max_iters=max_iters,
+                                           warm_start=warm_start, verbose=verbose >= 2, **name_settings)
+            return -self.solution['info']['pobj'], self.solution['info']['status']
+
+        pepit_tau, name = solve_with_fallback(solve, solver, COMPILED_SOLVERS, self.nb_leaves, verbose=verbose,
+                                              log=log, description='compiled')
+        report_solve(gram_matrix=self.gram_matrix)
+        if verbose:
+            print('(PEP compiler) Solver status: {} (solver: {}); optimal value: {}'.format(
+                self.solution['info']['status'], name.upper(), pepit_tau))
+
+        return pepit_tau
+
+    @property
+    def gram_matrix(self):
+        """
+        Gram matrix of the leaf points at the last solution.
+        """
+        return svec_to_matrix(self.solution['x'][self.nb_values:], self.nb_leaves)
+
+    @property
+    def function_values(self):
+        """
+        Function values :math:`f(x_0), \\dots, f(x_n)` at the last solution.
+        """
+        return self.solution['x'][:self.nb_values]
@@ -0,0 +1,271 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+from code.function_class import qg_convex_interpolation_pairs, qg_convex_interpolation_arrays
+from code.tools.coefficients import row_wise_outer
+from code.sdp.compiler import CompiledPEP, vec_to_svec
+from code.sdp.sparsification import interpolation_rows_of_pairs
+
+
+def svec_positions(nb_leaves, new_nb_leaves):
+    """
+    Positions, in svec(G') (see :func:`vec_to_svec`), of the entries of svec(G),
+    G being the leading principal submatrix of size nb_leaves of G'.
+
+    Args:
+        nb_leaves (int): size of G.
+        new_nb_leaves (int): size of G'.
+
+    Returns:
+        positions (ndarray): array of size nb_leaves (nb_leaves + 1) / 2.
+
+    """
+
+    cols, rows = np.triu_indices(nb_leaves)
+    return cols * new_nb_leaves - cols * (cols - 1) // 2 + rows - cols
+
+
+def extend_horizon(compiled_pep, row):
+    """
+    Append one iteration to the method of a compiled PEP, without compiling the constraints of the previous
+    iterations again: the new iterate and its gradient (and the new leaf of a span search) extend the coefficients,
+    and only the interpolation constraints involving the new iterate are formulated
+    (see :func:`code.function_class.qg_convex_interpolation_arrays`).
+    The constraints of the previous iterations are moved to their columns in the larger SDP,
+    since the previous leaf points are the first leaf points of the new problem.
+
+    The interpolation constraints that were not formulated in `compiled_pep` (see its `interpolation_rows`)
+    are not formulated in the extended PEP either, while all those involving the new iterate are.
+
+    Args:
+        compiled_pep (CompiledPEP): a compiled PEP with n iterations (solved or not).
+        row (list or None): the row n of the step-coefficient table (n + 1 coefficients),
+                            or None for an exact span search.
+
+    Returns:
+        extended_pep (CompiledPEP): the compiled PEP with n + 1 iterations (see :func:`warm_start_across_horizons`
+                                    to warm-start it from the solution of `compiled_pep`).
+
+    Example:
+        >>> pep = CompiledPEP(steps=[[0] * t + [.2] for t in range(4)], L=1)
+        >>> pepit_tau = pep.solve(verbose=0)
+        >>> extended_pep = extend_horizon(pep, [0] * 4 + [.2])
+        >>> pepit_tau = extended_pep.solve(verbose=0, warm_start=warm_start_across_horizons(pep, extended_pep))
+
+    """
+
+    t = compiled_pep.n
+    n = t + 1
+    nb_leaves = compiled_pep.nb_leaves + (1 if row is not None else 2)
+    nb_values = compiled_pep.nb_values + 1
+    nb_svec = nb_leaves * (nb_leaves + 1) // 2
+
+    # Extend the coefficients of the points, gradients and function values
+    points = np.zeros((n + 2, nb_leaves))
+    points[:-1, :compiled_pep.nb_leaves] = compiled_pep.points
+    gradients = np.zeros((n + 2, nb_leaves))
+    gradients[:-1, :compiled_pep.nb_leaves] = compiled_pep.gradients
+    values = np.zeros((n + 2, nb_values))
+    values[:-1, :compiled_pep.nb_values] = compiled_pep.values
+    values[-1, -1] = 1
+    span_search_rows = [(iterate, np.pad(directions, ((0, 0), (0, nb_leaves - compiled_pep.nb_leaves))))
+                        for iterate, directions in compiled_pep._span_search_rows]
+    new_zero_G = sp.csr_matrix((0, nb_svec))
+    if row is None:
+        # Exact span search: x_{t+1} is a new leaf, whose gradient is orthogonal to x_{t+1} - x_t,
+        # to the previous gradients and to the previous displacements
+        points[-1, compiled_pep.nb_leaves] = 1
+        gradients[-1, compiled_pep.nb_leaves + 1] = 1
+        directions = [points[t + 2] - points[t + 1], gradients[1]]
+        for k in range(t):
+            directions.append(gradients[k + 2])
+            directions.append(points[k + 1] - points[k + 2])
+        directions = np.array(directions)
+        span_search_rows.append((t + 1, directions))
+        gradient = np.tile(gradients[t + 2], (directions.shape[0], 1))
+        new_zero_G = vec_to_svec(row_wise_outer(sp.csr_matrix(gradient), sp.csr_matrix(directions)), nb_leaves)
+    else:
+        row = np.asarray(row, dtype=float)
+        if row.shape != (t + 1,):
+            raise ValueError("row must contain {} coefficients. Got {}".format(t + 1, row.size))
+        points[-1] = points[-2] - row @ gradients[1:t + 2]
+        gradients[-1, compiled_pep.nb_leaves] = 1
+
+    # Move the previous constraints to their columns in the larger SDP (F comes first, then svec(G))
+    column_map = np.concatenate([np.arange(compiled_pep.nb_values),
+                                 nb_values + svec_positions(compiled_pep.nb_leaves, nb_leaves)])
+    old_slice = compiled_pep.interpolation_slice
+    A = compiled_pep.A.tocoo()
+    kept = A.row < old_slice.stop
+    previous_rows = sp.csr_matrix((A.data[kept], (A.row[kept], column_map[A.col[kept]])),
+                                  shape=(old_slice.stop, nb_values + nb_svec))
+
+    # Formulate the interpolation constraints involving the new iterate, and merge them in the canonical order
+    all_pairs, all_is_qg = qg_convex_interpolation_pairs(n + 2, stationary_indices=[0])
+    old_rows = interpolation_rows_of_pairs(compiled_pep.pairs,
+                                           compiled_pep._all_is_qg[compiled_pep.interpolation_rows], n)
+    new_rows = np.flatnonzero(np.any(all_pairs == n + 1, axis=1))
+    F_matrix, G_matrix, _ = qg_convex_interpolation_arrays(points, gradients, values, stationary_indices=[0],
+                                                           L=compiled_pep.L, rows=new_rows)
+    rows = np.concatenate([old_rows, new_rows])
+    order = np.argsort(rows)
+    interpolation = sp.vstack([previous_rows[old_slice], sp.hstack([F_matrix, vec_to_svec(G_matrix, nb_leaves)])])
+    interpolation = interpolation.tocsr()[order]
+
+    # Build the extended PEP
+    extended_pep = CompiledPEP.__new__(CompiledPEP)
+    extended_pep.steps = compiled_pep.steps + [None if row is None else list(row)]
+    extended_pep.L = compiled_pep.L
+    extended_pep.n = n
+    extended_pep.solution = None
+    extended_pep.interpolation_rows = rows[order]
+    extended_pep._all_pairs, extended_pep._all_is_qg = all_pairs, all_is_qg
+    extended_pep.nb_leaves, extended_pep.nb_values = nb_leaves, nb_values
+    extended_pep.points, extended_pep.gradients, extended_pep.values = points, gradients, values
+    extended_pep._span_search_rows = span_search_rows
+    extended_pep.pairs = all_pairs[extended_pep.interpolation_rows]
+
+    nb_zero = compiled_pep.cone['z'] + new_zero_G.shape[0]
+    extended_pep.A = sp.vstack([previous_rows[:compiled_pep.cone['z']],
+                                sp.hstack([sp.csr_matrix((new_zero_G.shape[0], nb_values)), new_zero_G]),
+                                previous_rows[compiled_pep.cone['z']],
+                                interpolation,
+                                sp.hstack([sp.csr_matrix((nb_svec, nb_values)), - sp.identity(nb_svec)])],
+                               format='csc')
+    extended_pep.b = np.zeros(extended_pep.A.shape[0])
+    extended_pep.b[nb_zero] = 1
+    extended_pep.c = np.zeros(extended_pep.A.shape[1])
+    extended_pep.c[nb_values - 1] = -1
+    extended_pep.cone = {'z': nb_zero, 'l': 1 + interpolation.shape[0], 's': [nb_leaves]}
+
+    return extended_pep
+
+
+def warm_start_across_horizons(previous_pep, new_pep):
+    """
+    Build an SCS warm start for `new_pep` from the last solution of `previous_pep`,
+    where `new_pep` describes the same method run for more iterations
+    (i.e. the step-coefficient table of `previous_pep` is a prefix of the one of `new_pep`).
+
+    Since the leaf points of `previous_pep` are the first leaf points of `new_pep`, the previous Gram matrix
+    and the dual matrix of the PSD cone are padded with zero rows and columns for the new leaves.
+    The new function values are initialized to the last previous one,
+    and the dual variables of the new interpolation constraints are set to 0.
+
+    Args:
+        previous_pep (CompiledPEP): a solved compiled PEP.
+        new_pep (CompiledPEP): a compiled PEP of the same method with at least as many iterations.
+
+    Returns:
+        warm_start (dict): dictionary with keys 'x', 'y' and 's'.
+
+    """
+
+    solution = previous_pep.solution
+    nb_values, new_nb_values = previous_pep.nb_values, new_pep.nb_values
+    positions = svec_positions(previous_pep.nb_leaves, new_pep.nb_leaves)
+
+    # Primal variables: function values, then padded Gram matrix
+    x = np.zeros(new_pep.A.shape[1])
+    x[:nb_values] = solution['x'][:nb_values]
+    x[nb_values:new_nb_values] = solution['x'][nb_values - 1]
+    x[new_nb_values + positions] = solution['x'][nb_values:]
+
+    # Dual variables: span-search conditions of the previous iterations come first (followed by the new ones),
+    # then the initial condition, just before the interpolation constraints
+    y = np.zeros(new_pep.A.shape[0])
+    old_slice, new_slice = previous_pep.interpolation_slice, new_pep.interpolation_slice
+    nb_zero = previous_pep.cone['z']
+    y[:nb_zero] = solution['y'][:nb_zero]
+    y[new_slice.start - 1] = solution['y'][old_slice.start - 1]
+
+    # Interpolation constraints between points that exist in both problems
+    rows = interpolation_rows_of_pairs(previous_pep.pairs, previous_pep._all_is_qg[previous_pep.interpolation_rows],
+                                       new_pep.n)
+    new_positions = np.searchsorted(new_pep.interpolation_rows, rows)
+    formulated = new_positions < new_pep.nb_interpolation_constraints
+    formulated[formulated] = new_pep.interpolation_rows[new_positions[formulated]] == rows[formulated]
+    y[new_slice][new_positions[formulated]] = solution['y'][old_slice][formulated]
+
+    # Padded dual matrix of the PSD cone
+    y[new_slice.stop + positions] = solution['y'][old_slice.stop:]
+
+    # Slacks are recomputed from the primal variables, and projected onto the nonnegative orthant
+    s = new_pep.b - new_pep.A @ x
+    s[:new_pep.cone['z']] = 0
+    linear = slice(new_pep.cone['z'], new_slice.stop)
+    s[linear] = np.maximum(s[linear], 0)
+
+    return {'x': x, 'y': y, 's': s}
+
+
+def solve_horizons(steps_of, L, n_list, warm_start=True, compare_cold=False, incremental=False, verbose=1, **kwargs):
+    """
+    Solve the PEPs of a method for increasing numbers of iterations,
+    warm-starting each SCS solve from the solution obtained for the previous horizon
+    (see :func:`warm_start_across_horizons`).
+
+    Args:
+        steps_of (callable): function mapping a number of iterations n to the step-coefficient table
+                             (see :class:`CompiledPEP`) of the method. The table for n must be a prefix
+                             of the one for any larger n.
+        L (float): the quadratic upper bound parameter.
+        n_list (iterable): increasing numbers of iterations.
+        warm_start (bool): whether to warm-start each solve from the previous one.
+        compare_cold (bool): if True, each PEP is also solved from a cold start, in order to report
+                             the number of SCS iterations saved by the warm start.
+        incremental (bool): if True, each PEP is obtained by appending the new iterations to the previous one
+                            (see :func:`extend_horizon`), instead of being compiled from scratch.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`CompiledPEP.solve`.
+
+    Returns:
+        pepit_taus (ndarray): the worst-case values.
+        history (list): for each horizon, a dictionary with the worst-case value, the number of SCS iterations
+                        and the solve time (and, if `compare_cold`, the number of iterations of the cold start
+                        and the number of iterations saved).
+
+    """
+
+    pepit_taus = list()
+    history = list()
+    previous_pep = None
+
+    for n in n_list:
+        start = time.perf_counter()
+        steps = steps_of(n)
+        if incremental and previous_pep is not None:
+            compiled_pep = previous_pep
+            for row in steps[previous_pep.n:]:
+                compiled_pep = extend_horizon(compiled_pep, row)
+        else:
+            compiled_pep = CompiledPEP(steps, L)
+        if warm_start and previous_pep is not None:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0),
+                                           warm_start=warm_start_across_horizons(previous_pep, compiled_pep),
+                                           **kwargs)
+        else:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0), **kwargs)
+        record = {'n': n, 'pepit_tau': pepit_tau, 'iterations': compiled_pep.solution['info']['iter'],
+                  'time': time.perf_counter() - start}
+
+        if compare_cold:
+            cold_pep = CompiledPEP(compiled_pep.steps, L)
+            cold_pep.solve(verbose=0, **kwargs)
+            record['cold_iterations'] = cold_pep.solution['info']['iter']
+            record['iterations_saved'] = record['cold_iterations'] - record['iterations']
+
+        if verbose:
+            message = '(PEP continuation) n={}: value {}, {} SCS iteration(s)'.format(n, pepit_tau,
+                                                                                      record['iterations'])
+            if compare_cold:
+                message += ' ({} saved)'.format(record['iterations_saved'])
+            print(message)
+
+        pepit_taus.append(pepit_tau)
+        history.append(record)
+        previous_pep = compiled_pep
+
+    return np.array(pepit_taus), history
@@ -0,0 +1,156 @@
+import warnings
+
+import numpy as np
+
+from code.function_class import qg_convex_interpolation_pairs
+from code.sdp.compiler import CompiledPEP
+
+
+def initial_interpolation_rows(n):
+    """
+    Select a small subset of interpolation constraints to start a cutting-plane procedure from:
+    the constraints between consecutive iterates and all the constraints involving the stationary point.
+
+    Args:
+        n (int): number of iterations of the method.
+
+    Returns:
+        rows (ndarray): indices of the selected constraints, in the order of `qg_convex_interpolation_pairs`
+                        (the stationary point having index 0, and :math:`x_t` index t + 1).
+
+    """
+
+    pairs, _ = qg_convex_interpolation_pairs(n + 2, stationary_indices=[0])
+    i, j = pairs[:, 0], pairs[:, 1]
+    is_consecutive = (np.abs(i - j) == 1) & (i > 0) & (j > 0)
+    is_star = (i == 0) | (j == 0)
+
+    return np.flatnonzero(is_consecutive | is_star)
+
+
+def warm_start_from(previous_pep, new_pep):
+    """
+    Build an SCS warm start for `new_pep` from the last solution of `previous_pep`,
+    both being compiled from the same method but with different sets of interpolation constraints.
+    The dual variables of constraints that were not formulated in `previous_pep` are set to 0.
+
+    Args:
+        previous_pep (CompiledPEP): a solved compiled PEP.
+        new_pep (CompiledPEP): a compiled PEP of the same method.
+
+    Returns:
+        warm_start (dict): dictionary with keys 'x', 'y' and 's'.
+
+    """
+
+    solution = previous_pep.solution
+    x = solution['x']
+
+    y = np.zeros(new_pep.A.shape[0])
+    old_slice, new_slice = previous_pep.interpolation_slice, new_pep.interpolation_slice
+
+    # Span-search and initial conditions, then PSD cone, are shared
+    y[:new_slice.start] = solution['y'][:old_slice.start]
+    y[new_slice.stop:] = solution['y'][old_slice.stop:]
+
+    # Interpolation constraints formulated in both problems
+    positions = np.searchsorted(new_pep.interpolation_rows, previous_pep.interpolation_rows)
+    y[new_slice][positions] = solution['y'][old_slice]
+
+    # Slacks are recomputed from the primal variables, and projected onto the nonnegative orthant
+    s = new_pep.b - new_pep.A @ x
+    s[:new_pep.cone['z']] = 0
+    linear = slice(new_pep.cone['z'], new_slice.stop)
+    s[linear] = np.maximum(s[linear], 0)
+
+    return {'x': x, 'y': y, 's': s}
+
+
+def solve_cutting_plane(steps, L, rows=None, tol=1e-6, max_rounds=50, max_cuts=None, warm_start=True, verbose=1,
+                        **kwargs):
+    """
+    Solve the PEP described by a step-coefficient table (see :class:`CompiledPEP`) by lazily generating
+    its interpolation constraints.
+
+    Starting from the constraints between consecutive iterates and those involving the stationary point
+    (or from any other subset of constraints), the procedure alternates between solving the reduced SDP
+    and scanning all the interpolation constraints at the obtained Gram matrix
+    (one vectorized pass, see :meth:`CompiledPEP.interpolation_residuals`).
+    The violated constraints are added and the SDP re-solved, until none remains.
+    Since the final solution is feasible for the full formulation, and the reduced formulation is a relaxation
+    of the full one, the returned worst-case value is the one of the full formulation (up to `tol`).
+
+    Args:
+        steps (list): the step-coefficient table of the method.
+        L (float): the quadratic upper bound parameter.
+        rows (ndarray or None): indices (in the order of `qg_convex_interpolation_pairs`) of the initial constraints.
+                                Default to :func:`initial_interpolation_rows`.
+        tol (float): a constraint is considered violated when its residual is larger than `tol`.
+        max_rounds (int): maximum number of solves of reduced PEPs. If constraints are still violated after them,
+                          a warning is raised and the full formulation is solved.
+        max_cuts (int or None): if not None, maximum number of constraints added per round (the most violated ones).
+        warm_start (bool): whether to warm-start each solve from the previous one.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`CompiledPEP.solve`.
+
+    Returns:
+        pepit_tau (float): worst-case value.
+        compiled_pep (CompiledPEP): the last solved PEP (reduced, or full after `max_rounds`).
+        history (list): for each round, a dictionary with the number of formulated constraints,
+                        the worst-case value, the number of violated constraints and the number of SCS iterations.
+
+    """
+
+    if rows is None:
+        rows = initial_interpolation_rows(len(steps))
+    compiled_pep = None
+    history = list()
+
+    for round_counter in range(max_rounds):
+
+        # Build and solve the reduced PEP
+        previous_pep = compiled_pep
+        compiled_pep = CompiledPEP(steps, L, interpolation_rows=rows)
+        if warm_start and previous_pep is not None:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0),
+                                           warm_start=warm_start_from(previous_pep, compiled_pep), **kwargs)
+        else:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0), **kwargs)
+
+        # Scan all the interpolation constraints
+        residuals = compiled_pep.interpolation_residuals()
+        violated = np.flatnonzero(residuals > tol)
+        violated = np.setdiff1d(violated, compiled_pep.interpolation_rows)
+        if max_cuts is not None and violated.size > max_cuts:
+            violated = violated[np.argsort(-residuals[violated])[:max_cuts]]
+
+        history.append({'nb_constraints': compiled_pep.nb_interpolation_constraints,
+                        'pepit_tau': pepit_tau,
+                        'nb_violated': violated.size,
+                        'iterations': compiled_pep.solution['info']['iter']})
+        if verbose:
+            print('(PEP cutting-plane) Round {}: {} interpolation constraint(s), value {}, {} violated constraint(s)'
+                  .format(round_counter, compiled_pep.nb_interpolation_constraints, pepit_tau, violated.size))
+
+        # Stop when no constraint is violated anymore
+        if violated.size == 0:
+            break
+        rows = np.union1d(compiled_pep.interpolation_rows, violated)
+
+    else:
+        # The relaxation is still violated: its value is only an upper bound, hence solve the full formulation
+        warnings.warn('Interpolation constraints still violated after {} round(s);'
+                      ' solving the full formulation'.format(max_rounds))
+        previous_pep = compiled_pep
+        compiled_pep = CompiledPEP(steps, L)
+        if warm_start and previous_pep is not None:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0),
+                                           warm_start=warm_start_from(previous_pep, compiled_pep), **kwargs)
+        else:
+            pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0), **kwargs)
+        history.append({'nb_constraints': compiled_pep.nb_interpolation_constraints,
+                        'pepit_tau': pepit_tau,
+                        'nb_violated': 0,
+                        'iterations': compiled_pep.solution['info']['iter']})
+
+    return pepit_tau, compiled_pep, history
@@ -0,0 +1,200 @@
+import numpy as np
+
+
+def cumulative_coefficients(steps_batch):
+    """
+    Coefficients of the iterates over the gradients, for a batch of methods with fixed steps:
+    :math:`x_t = x_0 - \\sum_{k < t} c_{t, k} g_k`.
+
+    Args:
+        steps_batch (list): list of step-coefficient tables (see :class:`code.sdp.CompiledPEP`),
+                            all of the same length n and without span search.
+
+    Returns:
+        coefficients (ndarray): array of shape (batch size, n + 1, n) containing the :math:`c_{t, k}`.
+
+    """
+
+    n = len(steps_batch[0])
+    steps = np.zeros((len(steps_batch), n, n))
+    for b, table in enumerate(steps_batch):
+        if len(table) != n or any(row is None for row in table):
+            raise ValueError('All the methods must have {} fixed steps'.format(n))
+        for t, row in enumerate(table):
+            steps[b, t, :t + 1] = row
+
+    # x_{t+1} - x_0 = (x_t - x_0) - sum_k h_{t, k} g_k
+    coefficients = np.zeros((len(steps_batch), n + 1, n))
+    coefficients[:, 1:] = np.cumsum(steps, axis=1)
+
+    return coefficients
+
+
+def averaging_steps(increments, L):
+    """
+    Step-coefficient table (see :class:`code.sdp.CompiledPEP`) of the method
+    :math:`A_{t+1} x_{t+1} = A_t x_t + a_{t+1} z_{t+1}`, where :math:`A_t = a_0 + \\dots + a_t` and
+    :math:`z_{t+1} = x_0 - \\frac{1}{L} \\sum_{k \\leqslant t} a_k g_k`, i.e. of the methods certified by
+    :func:`lyapunov_bounds` (the Heavy-ball method of
+    :func:`code.heavy_ball_momentum_qg_convex.wc_heavy_ball_momentum_qg_convex` corresponds to :math:`a_t = 1`).
+
+    Args:
+        increments (list): the positive increments :math:`a_0, \\dots, a_n`.
+        L (float): the quadratic upper bound parameter.
+
+    Returns:
+        steps (list): the step-coefficient table of the n iterations.
+
+    """
+
+    n = len(increments) - 1
+    A = np.cumsum(increments)
+
+    # Coefficients of x_t - x_0 and of z_t - x_0 over the gradients
+    x_coefficients = np.zeros(n)
+    z_coefficients = np.zeros(n)
+    steps = list()
+    for t in range(n):
+        z_coefficients[t] = increments[t] / L
+        next_x_coefficients = (A[t] * x_coefficients + increments[t + 1] * z_coefficients) / A[t + 1]
+        steps.append(list(next_x_coefficients[:t + 1] - x_coefficients[:t + 1]))
+        x_coefficients = next_x_coefficients
+
+    return steps
+
+
+def lyapunov_bounds(steps_batch, L, nb_initial=64, rtol=1e-9):
+    """
+    Worst-case guarantees of a batch of methods with fixed steps on QG^+ convex functions,
+    certified by a Lyapunov sequence in closed form, without solving any SDP.
+
+    For nonnegative increments :math:`a_t \\leqslant 1` and :math:`A_t = a_0 + \\dots + a_t`, let
+    :math:`z_{t+1} = x_0 - \\frac{1}{L} \\sum_{k \\leqslant t} a_k g_k` and
+    :math:`V_t = A_t (f(x_t) - f_\\star) + \\frac{L}{2} \\|z_{t+1} - x_\\star\\|^2`.
+    The QG^+ inequality between :math:`x_\\star` and :math:`x_0` (with weight :math:`a_0`) gives
+    :math:`V_0 \\leqslant \\frac{L}{2} \\|x_0 - x_\\star\\|^2`, and the QG^+ inequality between :math:`x_\\star` and
+    :math:`x_{t+1}` (weight :math:`a_{t+1}`) plus the convexity inequality between :math:`x_{t+1}` and :math:`x_t`
+    (weight :math:`A_t`) give
+
+    .. math:: V_{t+1} - V_t \\leqslant \\langle g_{t+1}, A_{t+1} x_{t+1} - A_t x_t - a_{t+1} z_{t+1} \\rangle
+              + \\frac{a_{t+1} (a_{t+1} - 1)}{2L} \\|g_{t+1}\\|^2.
+
+    The sequence is thus a Lyapunov function as soon as the inner product vanishes, i.e. when
+    :math:`A_{t+1} x_{t+1} = A_t x_t + a_{t+1} z_{t+1}` (as for the Heavy-ball method with
+    :math:`\\alpha_t = \\frac{1}{L(t+2)}` and :math:`\\beta_t = \\frac{t}{t+2}`, for which :math:`a_t = 1`),
+    and then :math:`f(x_n) - f_\\star \\leqslant \\frac{L}{2 A_n} \\|x_0 - x_\\star\\|^2`.
+    Over the gradient :math:`g_t`, this identity determines :math:`a_{t+1}` from :math:`a_0, \\dots, a_t`;
+    over the previous gradients, it is checked. The remaining parameter :math:`a_0`
+    is a root of a quadratic equation given by the identities of the first two iterations (for n = 1, it is
+    searched on a grid of (0, 1]). All the methods are handled at once, in O(n^2) operations each.
+
+    Args:
+        steps_batch (list): list of step-coefficient tables (see :class:`code.sdp.CompiledPEP`),
+                            all of the same length n and without span search.
+        L (float): the quadratic upper bound parameter.
+        nb_initial (int): number of values of :math:`a_0` tried when n = 1.
+        rtol (float): relative tolerance on the identities.
+
+    Returns:
+        bounds (ndarray): the certified worst-case guarantees :math:`\\tau` (inf when no Lyapunov sequence
+                          of this form exists, which does not mean that the method has no guarantee).
+        increments (ndarray): for each method, the increments :math:`a_0, \\dots, a_n` of the best
+                              Lyapunov sequence (nan when none exists).
+
+    Example:
+        >>> from code.heavy_ball_momentum_qg_convex import heavy_ball_momentum_steps
+        >>> bounds, increments = lyapunov_bounds([heavy_ball_momentum_steps(L=1, n=10)], L=1)
+
+    """
+
+    coefficients = L * cumulative_coefficients(steps_batch)[:, :, None, :]
+    batch_size, n = coefficients.shape[0], coefficients.shape[1] - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Candidate initial increments a_0: the identities of the first two iterations give
+        # q a_0^2 - p (2 q + r - p) a_0 + p^2 q = 0, with p = L c_{1, 0}, q = L c_{2, 1} and r = L c_{2, 0}
+        if n >= 2:
+            p, q, r = coefficients[:, 1, 0, 0], coefficients[:, 2, 0, 1], coefficients[:, 2, 0, 0]
+            half_b = p * (2 * q + r - p) / 2
+            root = np.sqrt(half_b ** 2 - p ** 2 * q ** 2)
+            initial = np.stack([(half_b + root) / q, (half_b - root) / q], axis=1)
+        else:
+            initial = np.tile(np.linspace(1, 0, nb_initial, endpoint=False), (batch_size, 1))
+
+        # Increments a_t, for each method (first axis) and each initial increment a_0 (second axis)
+        increments = np.zeros(initial.shape + (n + 1,))
+        increments[:, :, 0] = initial
+        A = initial.copy()
+        valid = (initial > 0) & (initial <= 1 + rtol)
+
+        for t in range(n):
+            # Identity over g_t: L c_{t+1, t} A_{t+1} = a_{t+1} a_t
+            c = coefficients[:, t + 1, :, t]
+            increment = c * A / (increments[:, :, t] - c)
+            next_A = A + increment
+
+            # Identities over g_k, k < t: L (A_{t+1} c_{t+1, k} - A_t c_{t, k}) = a_{t+1} a_k
+            residuals = (next_A[..., None] * coefficients[:, t + 1, :, :t] - A[..., None] * coefficients[:, t, :, :t]
+                         - increment[..., None] * increments[:, :, :t])
+            scale = 1 + next_A[..., None] * np.abs(coefficients[:, t + 1, :, :t])
+            valid &= np.all(np.abs(residuals) <= rtol * scale, axis=-1)
+            valid &= (increment >= - rtol) & (increment <= 1 + rtol)
+
+            increments[:, :, t + 1] = increment
+            A = next_A
+
+    # Best Lyapunov sequence of each method
+    A = np.where(valid, A, 0)
+    best = np.argmax(A, axis=1)
+    best_A = A[np.arange(batch_size), best]
+    with np.errstate(divide='ignore'):
+        bounds = np.where(best_A > 0, L / (2 * best_A), np.inf)
+    best_increments = increments[np.arange(batch_size), best]
+    best_increments[best_A <= 0] = np.nan
+
+    return bounds, best_increments
+
+
+def lyapunov_bound(steps, L, **kwargs):
+    """
+    Worst-case guarantee of one method, certified by a Lyapunov sequence (see :func:`lyapunov_bounds`).
+
+    Args:
+        steps (list): the step-coefficient table of the method (without span search).
+        L (float): the quadratic upper bound parameter.
+        kwargs: keyword arguments passed to :func:`lyapunov_bounds`.
+
+    Returns:
+        tau (float): the certified worst-case guarantee (inf if none is found).
+
+    """
+
+    bounds, _ = lyapunov_bounds([steps], L, **kwargs)
+    return float(bounds[0])
+
+
+if __name__ == "__main__":
+
+    import time
+    from code.sdp import CompiledPEP
+
+    # Screen methods given by random step-coefficient tables, half of which are averaging methods,
+    # then check a few survivors against the full PEP
+    L, n, batch_size = 1, 10, 5000
+    rng = np.random.default_rng(0)
+    candidates = list()
+    for index in range(batch_size):
+        steps = averaging_steps(rng.uniform(.6, 1.1, size=n + 1), L)
+        if index % 2:
+            steps = [list(np.array(row) * (1 + 1e-3 * rng.normal(size=t + 1))) for t, row in enumerate(steps)]
+        candidates.append(steps)
+
+    start = time.perf_counter()
+    bounds, _ = lyapunov_bounds(candidates, L)
+    screening_time = time.perf_counter() - start
+    survivors = np.flatnonzero(np.isfinite(bounds))
+    print('(PEP Lyapunov) Screened {} methods in {:.3}s ({:.0f} per second): {} survivor(s)'.format(
+        batch_size, screening_time, batch_size / screening_time, survivors.size))
+    for index in survivors[:5]:
+        pepit_tau = CompiledPEP(candidates[index], L).solve(verbose=0)
+        print('\tmethod {}: Lyapunov bound {:.8f}, PEP value {:.8f}'.format(index, bounds[index], pepit_tau))
@@ -0,0 +1,138 @@
+import numpy as np
+import scipy.sparse as sp
+
+from code.sdp.compiler import CompiledPEP
+
+
+def scale_steps(unit_steps, gamma):
+    """
+    Multiply all the fixed-step coefficients of a step-coefficient table (see :class:`CompiledPEP`) by gamma.
+    Exact span searches (None entries) are left untouched.
+
+    Args:
+        unit_steps (list): a step-coefficient table.
+        gamma (float): the scaling factor.
+
+    Returns:
+        steps (list): the scaled step-coefficient table.
+
+    """
+
+    return [None if row is None else list(gamma * np.asarray(row, dtype=float)) for row in unit_steps]
+
+
+class ParameterizedPEP(CompiledPEP):
+    """
+    The :class:`ParameterizedPEP` class is a :class:`CompiledPEP` in which the step-size :math:`\\gamma`
+    and the parameter L are parameters of the SDP data rather than constants of the formulation.
+
+    The method is described by a "unit" step-coefficient table, the actual table being :math:`\\gamma` times the unit
+    one (e.g. `gradient_descent_steps(1, n)` for gradient descent).
+    Then, the coefficients of the iterates are affine in :math:`\\gamma`, and the interpolation conditions are
+    affine in the inner products :math:`\\langle g_j, x_i - x_j \\rangle` and in :math:`\\frac{1}{L}`, so that
+
+    .. math:: A(\\gamma, L) = A_0 + \\gamma A_1 + \\frac{1}{L} A_2.
+
+    The three matrices :math:`A_0, A_1, A_2` are extracted once, from compilations at three parameter values,
+    and stored as data vectors over a common sparsity pattern.
+    Changing the parameters (see :meth:`set_parameters`) then only recombines those vectors,
+    and each new solve goes straight to SCS.
+
+    Attributes:
+        unit_steps (list): the unit step-coefficient table.
+        gamma (float): the current step-size.
+
+    Example:
+        >>> from code.gradient_descent_qg_convex import gradient_descent_steps
+        >>> pep = ParameterizedPEP(gradient_descent_steps(gamma=1, n=4))
+        >>> pep.set_parameters(gamma=.2, L=1)
+        >>> pepit_tau = pep.solve(verbose=0)
+
+    """
+
+    def __init__(self, unit_steps, gamma=1., L=1., interpolation_rows=None):
+        """
+
+        Args:
+            unit_steps (list): the unit step-coefficient table of the method.
+            gamma (float): the initial step-size.
+            L (float): the initial quadratic upper bound parameter.
+            interpolation_rows (ndarray or None): indices of the only interpolation constraints to formulate
+                                                  (see :class:`CompiledPEP`). All of them are formulated by default.
+
+        """
+
+        self.unit_steps = list(unit_steps)
+        self.gamma = gamma
+        super().__init__(scale_steps(self.unit_steps, gamma), L, interpolation_rows=interpolation_rows)
+
+        # Compile at (gamma, 1 / L) = (0, 1), (1, 1) and (0, 2)
+        samples = [CompiledPEP(scale_steps(self.unit_steps, sample_gamma), sample_L,
+                                interpolation_rows=self.interpolation_rows)
+                   for sample_gamma, sample_L in [(0, 1), (1, 1), (0, .5)]]
+
+        # Extract the affine decomposition of the iterates and of A
+        self._points_parts = (samples[0].points, samples[1].points - samples[0].points)
+        A2 = samples[2].A - samples[0].A
+        A1 = samples[1].A - samples[0].A
+        A0 = samples[0].A - A2
+
+        # Store the three matrices over their common sparsity pattern
+        pattern = (abs(A0) + abs(A1) + abs(A2)).tocsc()
+        pattern.sort_indices()
+        self._indices, self._indptr = pattern.indices, pattern.indptr
+        rows = pattern.indices
+        cols = np.repeat(np.arange(pattern.shape[1]), np.diff(pattern.indptr))
+        self._A_parts = tuple(np.asarray(part.tocsc()[rows, cols]).ravel() for part in (A0, A1, A2))
+
+        self.set_parameters(gamma, L)
+
+    def set_parameters(self, gamma=None, L=None):
+        """
+        Update the step-size and/or the parameter L without recompiling the SDP.
+        The last solution is kept, so that it can be used to warm-start the next solve.
+
+        Args:
+            gamma (float or None): the new step-size (unchanged if None).
+            L (float or None): the new quadratic upper bound parameter (unchanged if None).
+
+        """
+
+        if gamma is not None:
+            self.gamma = gamma
+        if L is not None:
+            self.L = L
+        self.steps = scale_steps(self.unit_steps, self.gamma)
+        self.points = self._points_parts[0] + self.gamma * self._points_parts[1]
+
+        A0, A1, A2 = self._A_parts
+        self.A = sp.csc_matrix((A0 + self.gamma * A1 + A2 / self.L, self._indices, self._indptr),
+                               shape=self.A.shape)
+
+    def sweep(self, gammas, L=None, warm_start=True, verbose=0, **kwargs):
+        """
+        Solve the PEP for a sequence of step-sizes.
+
+        Args:
+            gammas (iterable): the step-sizes.
+            L (float or None): the quadratic upper bound parameter (unchanged if None).
+            warm_start (bool): whether to warm-start each solve from the previous one.
+            verbose (int): Level of information details to print (see :meth:`CompiledPEP.solve`).
+            kwargs: keyword arguments passed to :meth:`CompiledPEP.solve`.
+
+        Returns:
+            pepit_taus (ndarray): the worst-case values.
+
+        """
+
+        pepit_taus = list()
+        for gamma in gammas:
+            previous_solution = self.solution
+            self.set_parameters(gamma, L)
+            if warm_start and previous_solution is not None:
+                initial_guess = {key: previous_solution[key] for key in ['x', 'y', 's']}
+                pepit_taus.append(self.solve(verbose=verbose, warm_start=initial_guess, **kwargs))
+            else:
+                pepit_taus.append(self.solve(verbose=verbose, **kwargs))
+
+        return np.array(pepit_taus)
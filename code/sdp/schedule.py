@@ -0,0 +1,181 @@
+import time
+
+import numpy as np
+
+from code.tools.cache import PEPCache, last_solve, package_source_hash
+from code.sdp.compiler import CompiledPEP
+
+# Identity of the worst-case values stored in the :class:`code.tools.cache.PEPCache` by :func:`optimize_schedule`
+CACHE_ALGORITHM = 'code.sdp.schedule.optimize_schedule'
+
+
+def schedule_steps(gammas):
+    """
+    Step-coefficient table (see :class:`CompiledPEP`) of **gradient descent** with the step-sizes
+    :math:`\\gamma_0, \\dots, \\gamma_{n-1}`.
+
+    Args:
+        gammas (list): the n step-sizes.
+
+    Returns:
+        steps (list): the step-coefficient table.
+
+    """
+
+    return [[0] * t + [float(gamma)] for t, gamma in enumerate(gammas)]
+
+
+def schedule_sensitivities(pep):
+    """
+    Sensitivities of the worst-case value of gradient descent to its step-sizes, from the last solution of its PEP.
+
+    The coefficients of the iterates are linear in the step-sizes, hence so are the interpolation constraints:
+    :math:`A(\\gamma) = A_0 + \\sum_t \\gamma_t A_t`, each :math:`A_t` being obtained from one extra compilation.
+    For a primal-dual solution :math:`(x, y)` of :math:`\\min c^T x` s.t. :math:`Ax + s = b`, the derivative of
+    the optimal value along :math:`A_t` is :math:`y^T A_t x`, and the worst-case value is its opposite.
+    Where the worst-case value is not differentiable, this is a subgradient, depending on the solution returned.
+
+    Args:
+        pep (CompiledPEP): a solved compiled PEP of gradient descent (see :func:`schedule_steps`).
+
+    Returns:
+        sensitivities (ndarray): the derivatives of the worst-case value with respect to the step-sizes.
+
+    """
+
+    gammas = np.array([row[-1] for row in pep.steps], dtype=float)
+    x, y = pep.solution['x'], pep.solution['y']
+    sensitivities = np.zeros(gammas.size)
+    for t in range(gammas.size):
+        shifted_gammas = gammas.copy()
+        shifted_gammas[t] += 1
+        A_t = CompiledPEP(schedule_steps(shifted_gammas), pep.L, interpolation_rows=pep.interpolation_rows).A - pep.A
+        sensitivities[t] = - y @ (A_t @ x)
+
+    return sensitivities
+
+
+def optimize_schedule(gammas, L=1., max_iterations=50, step=.1, rtol=1e-8, min_step=1e-8, use_cache=True, verbose=1,
+                      **kwargs):
+    """
+    Step-sizes :math:`\\gamma_0, \\dots, \\gamma_{n-1}` of gradient descent locally minimizing its worst-case value,
+    by alternating solves of the PEP and projected (sub)gradient steps on the step-sizes,
+    the (sub)gradients being the sensitivities given by the dual multipliers (see :func:`schedule_sensitivities`).
+
+    Each step is accepted only if it decreases the worst-case value (Armijo condition), and its length is
+    halved until it does, and doubled after each success. The problem being nonconvex and nonsmooth, the result
+    is a local improvement of the initial step-sizes, not a certified optimal schedule.
+    The search is done on the normalized problem with L=1 (see :func:`code.tools.scaling.scale_invariant`),
+    each solve being warm-started from the last accepted one, and each worst-case value is stored in the
+    :class:`code.tools.cache.PEPCache`, so that a search run again only solves the PEPs it has never met.
+
+    Args:
+        gammas (list): the initial step-sizes (e.g. those of :func:`decreasing_step_sizes`).
+        L (float): the quadratic upper bound parameter.
+        max_iterations (int): maximal number of accepted steps.
+        step (float): initial length of the steps (on the normalized step-sizes :math:`L \\gamma_t`).
+        rtol (float): the search stops when a step decreases the worst-case value by less than this (relatively).
+        min_step (float): the search stops when the length of the steps gets below this.
+        use_cache (bool): whether to look for the worst-case values in the on-disk cache before solving,
+                          and to store them after.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`CompiledPEP.solve` (e.g. eps or solver).
+
+    Returns:
+        gammas (ndarray): the optimized step-sizes.
+        pepit_tau (float): the worst-case value of gradient descent with those step-sizes.
+        history (list): for each accepted step, a dictionary with the step-sizes, the worst-case value,
+                        the length of the step and the number of PEPs solved (cached ones excluded).
+
+    Example:
+        >>> from code.gradient_descent_qg_convex_decreasing import decreasing_step_sizes
+        >>> gammas, _ = decreasing_step_sizes(L=1, n=3)
+        >>> gammas, pepit_tau, history = optimize_schedule(gammas, L=1, max_iterations=5, verbose=0)
+
+    """
+
+    cache = PEPCache() if use_cache else None
+    source = package_source_hash()
+    kwargs.setdefault('eps', 1e-9)
+    settings = {name: value for name, value in kwargs.items() if name in ['eps', 'max_iters', 'solver']}
+    nb_solves = 0
+
+    def worst_case(normalized_gammas, warm_start=None):
+        # Solve the PEP, unless its value is in the cache (the solution being then only needed for a sensitivity)
+        nonlocal nb_solves
+        pep = CompiledPEP(schedule_steps(normalized_gammas), 1.)
+        if cache is not None:
+            key, description = cache.make_key(CACHE_ALGORITHM, dict(settings, gammas=list(normalized_gammas)),
+                                              function_class='ConvexQGFunction', source=source)
+            entry = cache.get(key)
+            if entry is not None and entry['status'] == 'solved':
+                return entry['pepit_tau'], pep
+
+        start = time.perf_counter()
+        pepit_tau = pep.solve(verbose=max(verbose - 1, 0), warm_start=warm_start, **kwargs)
+        nb_solves += 1
+        if cache is not None:
+            status = last_solve().get('status', 'solved') if np.isfinite(pepit_tau) else 'failed'
+            cache.put(key, description, pepit_tau, status=status, solve_time=time.perf_counter() - start)
+
+        return pepit_tau, pep
+
+    def solved(pep):
+        if pep.solution is None:
+            pep.solve(verbose=max(verbose - 1, 0), **kwargs)
+        return pep
+
+    # Start from the initial step-sizes
+    normalized_gammas = L * np.asarray(gammas, dtype=float)
+    pepit_tau, pep = worst_case(normalized_gammas)
+    history = [{'gammas': normalized_gammas / L, 'pepit_tau': L * pepit_tau, 'step': 0., 'nb_solves': nb_solves}]
+    if verbose:
+        print('(PEP schedule) Initial worst-case value: {}'.format(L * pepit_tau))
+
+    for _ in range(max_iterations):
+
+        # Sensitivities of the worst-case value to the step-sizes
+        pep = solved(pep)
+        sensitivities = schedule_sensitivities(pep)
+        warm_start = {name: pep.solution[name] for name in ['x', 'y', 's']}
+
+        # Projected step, shortened until the worst-case value decreases enough
+        while step >= min_step:
+            new_gammas = np.maximum(normalized_gammas - step * sensitivities, 0)
+            decrease = sensitivities @ (normalized_gammas - new_gammas)
+            new_pepit_tau, new_pep = worst_case(new_gammas, warm_start=warm_start)
+            if new_pepit_tau <= pepit_tau - 1e-4 * decrease:
+                break
+            step /= 2
+        else:
+            break
+
+        # Accept the step
+        improvement = pepit_tau - new_pepit_tau
+        normalized_gammas, pepit_tau, pep = new_gammas, new_pepit_tau, new_pep
+        history.append({'gammas': normalized_gammas / L, 'pepit_tau': L * pepit_tau, 'step': step,
+                        'nb_solves': nb_solves})
+        if verbose:
+            print('(PEP schedule) Step of length {:.3}: worst-case value {}'.format(step, L * pepit_tau))
+        if improvement <= rtol * abs(pepit_tau):
+            break
+        step *= 2
+
+    return normalized_gammas / L, L * pepit_tau, history
+
+
+if __name__ == "__main__":
+
+    from code.gradient_descent_qg_convex_decreasing import decreasing_step_sizes
+
+    # Start from the decreasing step-sizes 1 / (L u_{t+1}), and compare with the conjectured L / (2 u_n)
+    L = 1
+    for n in [1, 2, 3, 5]:
+        gammas, u = decreasing_step_sizes(L, n)
+        start = time.perf_counter()
+        optimized_gammas, pepit_tau, history = optimize_schedule(gammas, L=L, verbose=0)
+        print('(PEP schedule) n={}: {:.8} for the optimized step-sizes, {:.8} conjectured for the decreasing ones'
+              ' ({} steps, {} solves, {:.3}s)'.format(n, pepit_tau, L / (2 * u), len(history) - 1,
+                                                      history[-1]['nb_solves'], time.perf_counter() - start))
+        print('\tdecreasing step-sizes:', np.round(gammas, 6))
+        print('\toptimized step-sizes: ', np.round(optimized_gammas, 6))
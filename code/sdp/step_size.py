@@ -0,0 +1,141 @@
+import time
+
+import numpy as np
+from scipy.optimize import bisect, minimize_scalar
+
+from code.tools.cache import PEPCache, last_solve, package_source_hash
+
+# Identity of the worst-case values stored in the :class:`code.tools.cache.PEPCache` by :func:`optimize_step_size`
+CACHE_ALGORITHM = 'code.sdp.step_size.optimize_step_size'
+
+
+def locate_kink(increasing, decreasing, lower, upper, xtol=1e-12):
+    """
+    Point where :math:`\\max(\\text{increasing}(x), \\text{decreasing}(x))` switches branch, found by bisection.
+    This is where this maximum is minimal.
+
+    Args:
+        increasing (callable): the increasing branch.
+        decreasing (callable): the decreasing branch.
+        lower (float): lower end of the search interval, where the decreasing branch is the largest.
+        upper (float): upper end of the search interval, where the increasing branch is the largest.
+        xtol (float): absolute tolerance on the kink.
+
+    Returns:
+        kink (float): the point where the two branches cross.
+
+    Example:
+        >>> n, L = 4, 1
+        >>> gamma = locate_kink(lambda x: L * x, lambda x: 1 / (2 * n * L * x + 1), lower=0, upper=1 / L)
+
+    """
+
+    def difference(x):
+        return increasing(x) - decreasing(x)
+
+    if difference(lower) > 0 or difference(upper) < 0:
+        raise ValueError('The branches do not switch on [{}, {}]'.format(lower, upper))
+
+    return bisect(difference, lower, upper, xtol=xtol)
+
+
+def optimize_step_size(pep, L=1., bounds=(0., 2.), xatol=1e-6, use_cache=True, verbose=1, **kwargs):
+    """
+    Step-size minimizing the worst-case value of a parameterized PEP (see :class:`code.sdp.ParameterizedPEP`),
+    found by a derivative-free scalar search (Brent's method, combining golden-section steps and parabolic
+    interpolation), each solve being warm-started from the previous one.
+
+    The search is done on the normalized problem with L=1, since :math:`\\tau(L, \\gamma) = L \\tau(1, L \\gamma)`
+    (see :func:`code.tools.scaling.scale_invariant`): the results of a search serve all the values of L.
+    Each worst-case value is stored in the :class:`code.tools.cache.PEPCache`, so that a search run again
+    (e.g. with another L, or a smaller `xatol`) only solves the PEPs it has never met.
+
+    Args:
+        pep (ParameterizedPEP): the parameterized PEP of the method (e.g. `parameterized_gradient_descent_pep(n)`).
+        L (float): the quadratic upper bound parameter.
+        bounds (tuple): the interval of the normalized step-sizes :math:`L \\gamma` searched.
+        xatol (float): absolute tolerance on the normalized step-size.
+        use_cache (bool): whether to look for the worst-case values in the on-disk cache before solving,
+                          and to store them after.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`code.sdp.CompiledPEP.solve` (e.g. eps or solver).
+
+    Returns:
+        gamma (float): the worst-case-optimal step-size.
+        pepit_tau (float): the worst-case value of the method with this step-size.
+        trace (list): for each evaluation of the search, a dictionary with the step-size, the worst-case value,
+                      the number of iterations of the solver (None if cached), the solve time and
+                      whether the value was found in the cache.
+
+    Example:
+        >>> from code.gradient_descent_qg_convex import parameterized_gradient_descent_pep
+        >>> gamma, pepit_tau, trace = optimize_step_size(parameterized_gradient_descent_pep(4), L=1, verbose=0)
+
+    """
+
+    cache = PEPCache() if use_cache else None
+    unit_steps = [None if row is None else [float(coefficient) for coefficient in row] for row in pep.unit_steps]
+    source = package_source_hash()
+    settings = {name: value for name, value in kwargs.items() if name in ['eps', 'max_iters', 'solver']}
+    values = dict()
+    trace = list()
+
+    def worst_case_value(normalized_gamma):
+        if normalized_gamma in values:
+            return values[normalized_gamma]
+
+        # Look for the worst-case value in the cache
+        start = time.perf_counter()
+        if cache is not None:
+            key, description = cache.make_key(CACHE_ALGORITHM, dict(settings, unit_steps=unit_steps,
+                                                                    gamma=normalized_gamma),
+                                              function_class='ConvexQGFunction', source=source)
+            entry = cache.get(key)
+        else:
+            entry = None
+
+        if entry is not None and entry['status'] == 'solved':
+            pepit_tau, iterations, cached = entry['pepit_tau'], None, True
+        else:
+            # Solve, warm-started from the previous solve
+            previous_solution = pep.solution
+            pep.set_parameters(normalized_gamma, 1.)
+            warm_start = None
+            if previous_solution is not None:
+                warm_start = {name: previous_solution[name] for name in ['x', 'y', 's']}
+            pepit_tau = pep.solve(verbose=max(verbose - 1, 0), warm_start=warm_start, **kwargs)
+            iterations, cached = pep.solution['info']['iter'], False
+            if cache is not None:
+                status = last_solve().get('status', 'solved') if np.isfinite(pepit_tau) else 'failed'
+                cache.put(key, description, pepit_tau, status=status, solve_time=time.perf_counter() - start)
+
+        values[normalized_gamma] = pepit_tau
+        trace.append({'gamma': normalized_gamma / L, 'pepit_tau': L * pepit_tau, 'iterations': iterations,
+                      'solve_time': time.perf_counter() - start, 'cached': cached})
+        if verbose:
+            print('(PEP step-size) gamma={:.8}: worst-case value {:.8}{}'.format(
+                normalized_gamma / L, L * pepit_tau, ' (cached)' if cached else ''))
+
+        return pepit_tau
+
+    result = minimize_scalar(worst_case_value, bounds=bounds, method='bounded', options={'xatol': xatol})
+
+    return float(result.x) / L, L * float(result.fun), trace
+
+
+if __name__ == "__main__":
+
+    from code.gradient_descent_qg_convex import parameterized_gradient_descent_pep
+
+    # Optimize the step-size of gradient descent, twice (the second search only hits the cache),
+    # and compare it with the kink of the theoretical guarantee
+    L = 1
+    for n in [1, 2, 5, 10]:
+        for attempt in range(2):
+            start = time.perf_counter()
+            gamma, pepit_tau, trace = optimize_step_size(parameterized_gradient_descent_pep(n), L=L, verbose=0)
+            print('(PEP step-size) n={}: gamma={:.6}, tau={:.8} after {} evaluation(s) in {:.3}s ({} cached)'.format(
+                n, gamma, pepit_tau, len(trace), time.perf_counter() - start,
+                sum(evaluation['cached'] for evaluation in trace)))
+        kink = locate_kink(lambda x: L * x, lambda x: 1 / (2 * n * L * x + 1), lower=0, upper=1 / L)
+        print('\tkink of the theoretical guarantee: gamma={:.6}, tau={:.8}'.format(kink, L ** 2 * kink / 2))
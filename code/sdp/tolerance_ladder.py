@@ -0,0 +1,125 @@
+import numpy as np
+
+from code.sdp.compiler import CompiledPEP
+
+# Solver tolerances tried, in this order, by :func:`solve_tolerance_ladder`
+DEFAULT_TOLERANCES = (1e-3, 1e-4, 1e-5, 1e-6, 1e-7)
+
+
+def value_interval(solution, safety=10.):
+    """
+    Interval containing the worst-case value, estimated from an approximate solution of a compiled PEP.
+
+    The worst-case value lies between the primal value :math:`-c^T x` and the dual value :math:`b^T y`,
+    up to the infeasibility of x and y: the interval between them is widened by the largest
+    of the (relative) primal and dual residuals reported by the solver, scaled as in their normalization
+    and multiplied by a safety factor. This is an estimate, not a certified enclosure: first-order solvers
+    can stop with small residuals and a value still several residuals away from the optimal one.
+
+    Args:
+        solution (dict): a solution in the format of SCS (see :meth:`CompiledPEP.solve`),
+                         whose 'info' has the keys 'pobj', 'dobj', 'res_pri' and 'res_dual'.
+        safety (float): safety factor applied to the residuals.
+
+    Returns:
+        lower (float): lower end of the interval.
+        upper (float): upper end of the interval.
+
+    """
+
+    info = solution['info']
+    primal_value, dual_value = - info['pobj'], - info['dobj']
+    slack = safety * max(info['res_pri'], info['res_dual']) * (1 + abs(primal_value) + abs(dual_value))
+    if not np.isfinite(slack):
+        slack = np.inf
+
+    return min(primal_value, dual_value) - slack, max(primal_value, dual_value) + slack
+
+
+def solve_tolerance_ladder(compiled_pep, reference, rtol=1e-4, tolerances=DEFAULT_TOLERANCES, verbose=1, **kwargs):
+    """
+    Decide whether the worst-case value of a compiled PEP matches a reference value (e.g. a theoretical bound)
+    up to the relative tolerance `rtol`, solving the SDP no more accurately than needed.
+
+    The SDP is first solved with a loose solver tolerance. As long as the interval containing the worst-case value
+    (see :func:`value_interval`) overlaps both the band :math:`[(1 - rtol) \\tau_{ref}, (1 + rtol) \\tau_{ref}]`
+    and its complement, the tolerance is tightened and the SDP re-solved, warm-started from the previous solution.
+    The tolerance is tightened in proportion to the ratio between the widths of the band and of the interval,
+    skipping the steps of the ladder that would most likely not decide.
+    The ladder stops as soon as the interval lies inside the band ('tight') or outside of it ('not tight').
+
+    Args:
+        compiled_pep (CompiledPEP): the compiled PEP.
+        reference (float): the reference value.
+        rtol (float): relative tolerance of the comparison.
+        tolerances (tuple): the solver tolerances, from the loosest to the tightest.
+        verbose (int): Level of information details to print (0, 1 or 2).
+        kwargs: keyword arguments passed to :meth:`CompiledPEP.solve` (e.g. solver='admm').
+
+    Returns:
+        pepit_tau (float): worst-case value (at the last tolerance).
+        verdict (str): 'tight', 'not tight', or 'undecided' if the tightest tolerance does not decide.
+        history (list): for each tolerance, a dictionary with the tolerance, the worst-case value,
+                        the interval and the number of iterations of the solver.
+
+    Example:
+        >>> pep = CompiledPEP(steps=[[0] * t + [1] for t in range(5)], L=1)
+        >>> pepit_tau, verdict, history = solve_tolerance_ladder(pep, reference=1 / 2, verbose=0)
+
+    """
+
+    band = (reference - rtol * abs(reference), reference + rtol * abs(reference))
+    tolerances = sorted(tolerances, reverse=True)
+    eps = tolerances[0]
+    warm_start = None
+    verdict = 'undecided'
+    history = list()
+
+    while True:
+
+        # Solve, warm-started from the previous solution
+        pepit_tau = compiled_pep.solve(verbose=max(verbose - 1, 0), eps=eps, warm_start=warm_start, **kwargs)
+        solution = compiled_pep.solution
+        warm_start = {'x': solution['x'], 'y': solution['y'], 's': solution['s']}
+
+        # Compare the interval of the worst-case value with the band around the reference
+        lower, upper = value_interval(solution)
+        if band[0] <= lower and upper <= band[1]:
+            verdict = 'tight'
+        elif upper < band[0] or lower > band[1]:
+            verdict = 'not tight'
+
+        history.append({'eps': eps, 'pepit_tau': pepit_tau, 'interval': (lower, upper),
+                        'iterations': solution['info']['iter']})
+        if verbose:
+            print('(PEP tolerance ladder) eps={:.0e}: value {}, interval [{}, {}], {}'.format(
+                eps, pepit_tau, lower, upper, verdict))
+
+        if verdict != 'undecided':
+            break
+
+        # Next tolerance: skip those unlikely to shrink the interval enough to fit in the band
+        target = eps * (band[1] - band[0]) / (upper - lower)
+        tighter = [tolerance for tolerance in tolerances if tolerance < eps]
+        if not tighter:
+            break
+        eps = next((tolerance for tolerance in tighter if tolerance <= target), tighter[-1])
+
+    return pepit_tau, verdict, history
+
+
+if __name__ == "__main__":
+
+    from code.heavy_ball_momentum_qg_convex import heavy_ball_momentum_steps
+
+    # Compare the ladder with a single accurate solve, on the Heavy-ball method (whose bound 1 / (2(n+1)) is tight)
+    for solver in ['scs', 'admm']:
+        for n in [5, 10, 20, 40]:
+            pep = CompiledPEP(heavy_ball_momentum_steps(L=1, n=n), L=1)
+            pep.solve(verbose=0, eps=DEFAULT_TOLERANCES[-1], solver=[solver], log=False)
+            iterations = pep.solution['info']['iter']
+            pepit_tau, verdict, history = solve_tolerance_ladder(pep, reference=1 / (2 * (n + 1)), rtol=1e-3,
+                                                                 verbose=0, solver=[solver], log=False)
+            print('{} (n={}): {} after {} iterations (tolerances down to {:.0e}), {} iterations for a single solve'
+                  .format(solver, n, verdict, sum(step['iterations'] for step in history), history[-1]['eps'],
+                          iterations))
@@ -0,0 +1,17 @@
+from .vectorized_pep import VectorizedPEP
+from .backends import SolverLog, solver_sequence, solve_with_fallback, solve_pepit_problem
+from .cache import PEPCache, cached_worst_case
+from .dense import LeafBasis, DensePoint, DenseOracle, stack_points
+from .scaling import scale_invariant
+from .upper_bounds import UpperBound, make_upper_bound, register_upper_bound
+from .sweep import make_grid, run_sweep, load_results
+
+__all__ = ['backends', 'SolverLog', 'solver_sequence', 'solve_with_fallback', 'solve_pepit_problem',
+           'cache', 'PEPCache', 'cached_worst_case',
+           'coefficients',
+           'dense', 'LeafBasis', 'DensePoint', 'DenseOracle', 'stack_points',
+           'vectorized_pep', 'VectorizedPEP',
+           'scaling', 'scale_invariant',
+           'sweep', 'make_grid', 'run_sweep', 'load_results',
+           'upper_bounds', 'UpperBound', 'make_upper_bound', 'register_upper_bound',
+           ]
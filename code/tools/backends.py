@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import warnings
+import importlib.util
+
+import numpy as np
+import cvxpy as cp
+from PEPit import Point
+
+from code.tools.cache import report_solve
+
+# Location of the solver log, which can be overridden with the environment variable QG_SOLVER_LOG.
+# The solves are only recorded when this variable is set, or when a log is passed explicitly.
+DEFAULT_LOG_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'qg', 'solver_log.jsonl')
+
+# Backends of the PEPit modes, and their names in cvxpy.
+# ECOS has no PSD cone, hence cannot solve PEPs, and is not offered.
+CVXPY_SOLVERS = {'scs': 'SCS', 'clarabel': 'CLARABEL', 'cvxopt': 'CVXOPT'}
+
+# Backends of the compiled modes (see :meth:`code.sdp.CompiledPEP.solve`)
+COMPILED_SOLVERS = ['scs', 'clarabel', 'admm']
+
+# Exceptions triggering a fallback to the next backend: failures of the solvers (including numerical failures of
+# the linear algebra of the ADMM solver) and missing packages. Any other exception is a bug, and is raised.
+SOLVER_ERRORS = (cp.error.SolverError, ImportError, np.linalg.LinAlgError, FloatingPointError, OverflowError)
+
+# Backends tried, in this order, after the requested one
+FALLBACK_ORDER = ['scs', 'clarabel', 'cvxopt', 'admm']
+
+# Statuses (lower case) of a successful solve, in cvxpy, SCS, Clarabel and :func:`code.sdp.solve_admm`
+ACCEPTED_STATUSES = ['optimal', 'solved']
+
+
+def is_installed(solver):
+    """
+    Whether a backend is available.
+
+    Args:
+        solver (str): a key of `CVXPY_SOLVERS`, or an element of `COMPILED_SOLVERS`.
+
+    Returns:
+        installed (bool): True if the backend can be used.
+
+    """
+
+    if solver == 'admm':
+        return True
+    if solver in CVXPY_SOLVERS and CVXPY_SOLVERS[solver] in cp.installed_solvers():
+        return True
+    return importlib.util.find_spec(solver) is not None
+
+
+class SolverLog(object):
+    """
+    The :class:`SolverLog` class records, in a JSON Lines file, which backend solved each PEP, with which status,
+    and in how long, together with the size of its PSD matrix.
+    Several processes (e.g. the workers of a sweep) can append to the same file.
+
+    Attributes:
+        path (str): path of the JSON Lines file.
+
+    Example:
+        >>> log = SolverLog()
+        >>> records = log.load()
+        >>> solver = log.fastest_solver(size=22, candidates=['scs', 'clarabel'])
+
+    """
+
+    def __init__(self, path=None):
+        """
+
+        Args:
+            path (str or None): path of the JSON Lines file.
+                                Defaults to the environment variable QG_SOLVER_LOG, or to `DEFAULT_LOG_PATH`.
+
+        """
+
+        self.path = path or os.environ.get('QG_SOLVER_LOG', DEFAULT_LOG_PATH)
+
+    def record(self, **entry):
+        """
+        Append a record (e.g. with keys 'solver', 'status', 'solve_time', 'size' and 'value').
+        """
+
+        entry['created'] = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, 'a') as log_file:
+            log_file.write(json.dumps(entry) + '\n')
+
+    def load(self):
+        """
+        Read all the records.
+
+        Returns:
+            records (list): list of dictionaries.
+
+        """
+
+        records = list()
+        if os.path.exists(self.path):
+            with open(self.path) as log_file:
+                for line in log_file:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        pass
+
+        return records
+
+    def fastest_solver(self, size, candidates, description=None, size_ratio=2.):
+        """
+        Backend with the smallest median solve time among the successful solves of similar sizes.
+
+        Args:
+            size (int): size of the PSD matrix of the PEP to solve.
+            candidates (list): backends to choose from.
+            description (str or None): if not None, only the records with this description are considered.
+            size_ratio (float): the records whose sizes are within this factor of `size` are considered.
+
+        Returns:
+            solver (str or None): the fastest backend, or None if no record is available.
+
+        """
+
+        times = {solver: list() for solver in candidates}
+        for record in self.load():
+            if (record.get('solver') in times and record.get('status', '').lower() in ACCEPTED_STATUSES
+                    and size / size_ratio <= record.get('size', -1) <= size * size_ratio
+                    and description in [None, record.get('description')]):
+                times[record['solver']].append(record['solve_time'])
+
+        medians = {solver: np.median(solve_times) for solver, solve_times in times.items() if solve_times}
+        if not medians:
+            return None
+
+        return min(medians, key=medians.get)
+
+    def summary(self, description=None):
+        """
+        Summary of the records, per size of problem and backend.
+
+        Args:
+            description (str or None): if not None, only the records with this description are considered.
+
+        Returns:
+            summary (dict): (size, solver) -> dictionary with keys 'nb_solves', 'success_rate'
+                            and 'median_time' (median duration of the successful solves, None if none).
+
+        """
+
+        grouped = dict()
+        for record in self.load():
+            if description in [None, record.get('description')]:
+                grouped.setdefault((record['size'], record['solver']), list()).append(record)
+
+        summary = dict()
+        for key, records in sorted(grouped.items()):
+            solve_times = [record['solve_time'] for record in records
+                           if record['status'].lower() in ACCEPTED_STATUSES]
+            summary[key] = {'nb_solves': len(records), 'success_rate': len(solve_times) / len(records),
+                            'median_time': float(np.median(solve_times)) if solve_times else None}
+
+        return summary
+
+
+def solver_sequence(solver, candidates, size=None, log=None, description=None):
+    """
+    Ordered list of the backends to try.
+
+    Args:
+        solver (str or list): a backend, which is tried first, the other installed candidates being fallbacks
+                              (in the order of `FALLBACK_ORDER`); or an explicit list of backends, tried in order
+                              without any other fallback; or 'auto' to start with the fastest backend
+                              for this size of problem according to the solver log.
+        candidates (list): backends that can handle the problem.
+        size (int or None): size of the PSD matrix (used by 'auto').
+        log (SolverLog or None): the solver log (used by 'auto').
+        description (str or None): description of the problem (used by 'auto').
+
+    Returns:
+        sequence (list): the backends to try.
+
+    """
+
+    if solver == 'auto':
+        solver = (log or SolverLog()).fastest_solver(size, [name for name in candidates if is_installed(name)],
+                                                     description=description)
+        solver = solver or candidates[0]
+    if isinstance(solver, str):
+        if solver not in candidates:
+            raise ValueError("solver must be either one of {} or 'auto'. Got {}".format(candidates, solver))
+        sequence = [solver] + [name for name in FALLBACK_ORDER if name in candidates and name != solver]
+    else:
+        sequence = list(solver)
+        for name in sequence:
+            if name not in candidates:
+                raise ValueError("solver must be either one of {} or 'auto'. Got {}".format(candidates, name))
+
+    return [name for name in sequence if is_installed(name)]
+
+
+def solve_with_fallback(solve, solver, candidates, size, verbose=1, log=None, description=None):
+    """
+    Solve a PEP with a sequence of backends (see :func:`solver_sequence`), stopping at the first one
+    reporting a successful status (see `ACCEPTED_STATUSES`): the others, inaccurate, failed or raising one of the
+    `SOLVER_ERRORS`, trigger a fallback to the next backend. Other exceptions are raised.
+    Each attempt is recorded in the :class:`SolverLog`, and whether the solution is accurate is reported
+    to the cache (see :func:`code.tools.cache.report_solve`).
+
+    Args:
+        solve (callable): function of the backend name returning the worst-case value and the status.
+        solver (str or list): the requested backend(s) (see :func:`solver_sequence`).
+        candidates (list): backends that can handle the problem.
+        size (int): size of the PSD matrix.
+        verbose (int): Level of information details to print (0 or 1).
+        log (bool, SolverLog or None): whether to record the attempts (in the default :class:`SolverLog` if True).
+                                       None records them only if the environment variable QG_SOLVER_LOG is set.
+        description (str or None): description of the problem (e.g. how it is formulated), added to the records.
+
+    Returns:
+        pepit_tau (float): worst-case value.
+        solver (str): the backend that solved the problem.
+
+    """
+
+    if log is None:
+        log = 'QG_SOLVER_LOG' in os.environ
+    if log is True:
+        log = SolverLog()
+    sequence = solver_sequence(solver, candidates, size=size, log=log or None, description=description)
+    if not sequence:
+        raise ValueError('None of the requested solvers {} is installed'.format(solver))
+
+    fallback = None
+    for name in sequence:
+        start = time.perf_counter()
+        try:
+            pepit_tau, status = solve(name)
+        except SOLVER_ERRORS as error:
+            pepit_tau, status = None, 'error: {}'.format(error)
+        solve_time = time.perf_counter() - start
+        if log:
+            log.record(solver=name, status=status, solve_time=solve_time, size=size,
+                       value=None if pepit_tau is None else float(pepit_tau), description=description)
+
+        if status.lower() in ACCEPTED_STATUSES:
+            report_solve(status='solved')
+            return pepit_tau, name
+        if verbose:
+            print('(PEP backends) Solver {} returned status {}, falling back'.format(name, status))
+        if fallback is None and pepit_tau is not None and np.isfinite(pepit_tau):
+            fallback = (pepit_tau, name)
+
+    # No backend succeeded: return the first inaccurate value, if any
+    if fallback is None:
+        raise RuntimeError('All the solvers {} failed'.format(sequence))
+    warnings.warn('No solver among {} returned an accurate solution; keeping the one of {}'.format(sequence,
+                                                                                               fallback[1]))
+    report_solve(status='inaccurate')
+    return fallback
+
+
+def solve_pepit_problem(problem, solver='scs', verbose=1, log=None, description=None):
+    """
+    Solve a :class:`PEPit.PEP` (or a :class:`code.tools.VectorizedPEP`) with automatic fallback between the backends
+    of cvxpy (see :func:`solve_with_fallback`). The cvxpy problem is built once, and solved again by the fallbacks.
+    The Gram matrix of the solution is reported to the cache (see :func:`code.tools.cache.report_solve`).
+
+    Args:
+        problem (PEP): the problem, ready to be solved.
+        solver (str or list): the requested backend(s), among the keys of `CVXPY_SOLVERS` (or 'auto').
+        verbose (int): Level of information details to print (0 or 1).
+        log (bool, SolverLog or None): whether to record the attempts (see :func:`solve_with_fallback`).
+        description (str or None): description of the problem, added to the records.
+
+    Returns:
+        pepit_tau (float): worst-case value.
+        solver (str): the backend that solved the problem.
+
+    """
+
+    cvxpy_problem = list()
+
+    def solve(name):
+        if cvxpy_problem:
+            cvxpy_problem[0].solve(solver=CVXPY_SOLVERS[name])
+        else:
+            cvxpy_problem.append(problem.solve(solver=CVXPY_SOLVERS[name], verbose=verbose,
+                                               return_full_cvxpy_problem=True))
+        return cvxpy_problem[0].value, cvxpy_problem[0].status
+
+    pepit_tau, name = solve_with_fallback(solve, solver, list(CVXPY_SOLVERS), Point.counter, verbose=verbose,
+                                          log=log, description=description)
+    gram_matrix = [variable.value for variable in cvxpy_problem[0].variables() if variable.attributes['PSD']]
+    report_solve(gram_matrix=gram_matrix[0] if gram_matrix else None)
+
+    return pepit_tau, name
+
+
+if __name__ == "__main__":
+
+    import sys
+    from code.tools.cache import cache_directory
+    from code.tools.sweep import make_grid, run_sweep
+
+    # Measure all the backends on the examples, then report the median solve times per size of problem.
+    # The results are written to the directory given on the command line, or next to the PEP cache.
+    output_directory = sys.argv[1] if len(sys.argv) > 1 else cache_directory()
+    os.environ.setdefault('QG_SOLVER_LOG', DEFAULT_LOG_PATH)
+    for solver in COMPILED_SOLVERS:
+        jobs = make_grid(algorithms=['gradient_descent', 'heavy_ball_momentum', 'conjugate_gradient'],
+                         n_list=[5, 10, 20], gamma_list=[.5], mode='compiled', solver=[solver], use_cache=False)
+        run_sweep(jobs, output_path=os.path.join(output_directory, 'backends_{}.jsonl'.format(solver)), timeout=600,
+                  verbose=0)
+    for (size, solver), stats in SolverLog().summary(description='compiled').items():
+        print('(PEP backends) size {}, {}: {} solve(s), success rate {:.0%}, median time {}'.format(
+            size, solver, stats['nb_solves'], stats['success_rate'], stats['median_time']))
@@ -0,0 +1,360 @@
+import os
+import io
+import json
+import time
+import sqlite3
+import hashlib
+import inspect
+import functools
+from contextlib import closing
+from importlib import metadata
+
+import numpy as np
+
+# The package whose sources identify the analyses (see :func:`package_source_hash`)
+PACKAGE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Location of the cache, which can be overridden with the environment variable QG_PEP_CACHE
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'qg', 'pep_cache.sqlite')
+
+# Packages whose versions identify the solvers
+SOLVER_PACKAGES = ['PEPit', 'cvxpy', 'scs', 'numpy', 'scipy']
+
+# Arguments of the wc_* functions that do not change their results
+NON_KEY_ARGUMENTS = ['verbose', 'use_cache', 'scaling']
+
+# Statuses of the entries served by the cache: accurate solutions, decided verdicts of the tolerance ladder,
+# and values certified by a dual certificate
+SERVED_STATUSES = ['solved', 'tight', 'not tight', 'certified']
+
+# Outcome of the last solve (see :func:`report_solve`)
+_LAST_SOLVE = dict()
+
+
+def cache_directory():
+    """
+    Directory of the PEP cache (see :class:`PEPCache`), where the examples write their results by default.
+
+    Returns:
+        directory (str): path of the directory, created if needed.
+
+    """
+
+    directory = os.path.dirname(os.path.abspath(os.environ.get('QG_PEP_CACHE', DEFAULT_CACHE_PATH)))
+    os.makedirs(directory, exist_ok=True)
+
+    return directory
+
+
+@functools.lru_cache(maxsize=None)
+def source_hash(directory):
+    """
+    Hash of all the Python sources of a directory (recursively).
+    It changes as soon as any part of the formulation, solver interface or default tolerance is modified.
+
+    Args:
+        directory (str): path of a directory.
+
+    Returns:
+        digest (str): the hexadecimal SHA-256 digest.
+
+    """
+
+    digest = hashlib.sha256()
+    for root, dirnames, filenames in sorted(os.walk(directory)):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                path = os.path.join(root, filename)
+                digest.update(os.path.relpath(path, directory).encode())
+                with open(path, 'rb') as source_file:
+                    digest.update(source_file.read())
+
+    return digest.hexdigest()
+
+
+def package_source_hash():
+    """
+    Hash of the sources of the package (see :func:`source_hash`), shared by all the analyses stored in the cache.
+
+    Returns:
+        digest (str): the hexadecimal SHA-256 digest.
+
+    """
+
+    return source_hash(PACKAGE_DIRECTORY)
+
+
+@functools.lru_cache(maxsize=None)
+def solver_versions():
+    """
+    Versions of the packages involved in the solves.
+
+    Returns:
+        versions (dict): package name -> version (None if not installed).
+
+    """
+
+    versions = dict()
+    for package in SOLVER_PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return versions
+
+
+class PEPCache(object):
+    """
+    The :class:`PEPCache` class is a persistent, content-addressed store of worst-case analyses, backed by sqlite3.
+
+    Each entry is keyed by a hash of the identity of the analysis (module and name of the `wc_*` function,
+    and hash of the sources of its package), of its parameters, of the function class,
+    and of the versions of the solvers. It stores the worst-case value, the theoretical value,
+    a status, the solve time and optionally the Gram matrix of the worst-case instance.
+
+    Attributes:
+        path (str): path of the sqlite3 database.
+
+    Example:
+        >>> cache = PEPCache()
+        >>> key, _ = cache.make_key('code.gradient_descent_qg_convex.wc_gradient_descent_qg_convex',
+        ...                         {'L': 1, 'gamma': .2, 'n': 4}, function_class='ConvexQGFunction')
+        >>> entry = cache.get(key)
+
+    """
+
+    def __init__(self, path=None):
+        """
+
+        Args:
+            path (str or None): path of the sqlite3 database.
+                                Defaults to the environment variable QG_PEP_CACHE, or to `DEFAULT_CACHE_PATH`.
+
+        """
+
+        self.path = path or os.environ.get('QG_PEP_CACHE', DEFAULT_CACHE_PATH)
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS results ('
+                               'key TEXT PRIMARY KEY, description TEXT, pepit_tau REAL, theoretical_tau REAL,'
+                               ' status TEXT, solve_time REAL, created REAL, gram_matrix BLOB)')
+
+    def _connect(self):
+        # A generous timeout allows concurrent writers (e.g. the processes of a sweep)
+        return sqlite3.connect(self.path, timeout=60)
+
+    @staticmethod
+    def make_key(algorithm, params, function_class=None, source=None):
+        """
+        Compute the key of a worst-case analysis.
+
+        Args:
+            algorithm (str): identity of the analysis (e.g. the qualified name of the `wc_*` function).
+            params (dict): its parameters (JSON serializable, or NumPy scalars).
+            function_class (str or None): name of the function class.
+            source (str or None): hash of the sources the analysis depends on.
+
+        Returns:
+            key (str): the hexadecimal SHA-256 digest.
+            description (str): the JSON description that was hashed.
+
+        """
+
+        # Numbers are canonicalized, so that e.g. L=1, L=1. and L=np.float64(1) share the same key,
+        # and so do step-sizes that only differ by rounding errors (e.g. 3 * .1 and .3)
+        params = {name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+        params = {name: float('{:.12g}'.format(value)) if isinstance(value, float) else value
+                  for name, value in params.items()}
+        params = {name: int(value) if isinstance(value, float) and value.is_integer() else value
+                  for name, value in params.items()}
+        description = json.dumps({'algorithm': algorithm, 'params': params, 'function_class': function_class,
+                                  'source': source, 'solvers': solver_versions()},
+                                 sort_keys=True)
+
+        return hashlib.sha256(description.encode()).hexdigest(), description
+
+    def get(self, key):
+        """
+        Fetch an entry.
+
+        Args:
+            key (str): the key of the entry.
+
+        Returns:
+            entry (dict or None): the entry, with keys 'pepit_tau', 'theoretical_tau', 'status', 'solve_time',
+                                  'created' and 'gram_matrix' (None if not stored), or None if not found.
+
+        """
+
+        with closing(self._connect()) as connection:
+            row = connection.execute('SELECT pepit_tau, theoretical_tau, status, solve_time, created, gram_matrix'
+                                     ' FROM results WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+
+        pepit_tau, theoretical_tau, status, solve_time, created, gram_matrix = row
+        if gram_matrix is not None:
+            gram_matrix = np.load(io.BytesIO(gram_matrix))
+
+        return {'pepit_tau': pepit_tau, 'theoretical_tau': theoretical_tau, 'status': status,
+                'solve_time': solve_time, 'created': created, 'gram_matrix': gram_matrix}
+
+    def put(self, key, description, pepit_tau, theoretical_tau=None, status='solved', solve_time=None,
+            gram_matrix=None):
+        """
+        Store (or replace) an entry.
+
+        Args:
+            key (str): the key of the entry (see :meth:`make_key`).
+            description (str): the description of the entry (see :meth:`make_key`).
+            pepit_tau (float): worst-case value.
+            theoretical_tau (float or None): theoretical value.
+            status (str): status of the solve.
+            solve_time (float or None): duration of the solve, in seconds.
+            gram_matrix (ndarray or None): Gram matrix of the worst-case instance.
+
+        """
+
+        if gram_matrix is not None:
+            buffer = io.BytesIO()
+            np.save(buffer, np.asarray(gram_matrix))
+            gram_matrix = buffer.getvalue()
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                               (key, description, pepit_tau, theoretical_tau, status, solve_time, time.time(),
+                                gram_matrix))
+
+    def clear(self):
+        """
+        Remove all the entries.
+        """
+
+        with closing(self._connect()) as connection, connection:
+            connection.execute('DELETE FROM results')
+
+    def __len__(self):
+        with closing(self._connect()) as connection:
+            return connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+
+def report_solve(status=None, gram_matrix=None):
+    """
+    Report the outcome of a solve, to be stored in the cache with the worst-case value (see :func:`cached_worst_case`).
+    The solvers report whether their solution is accurate and its Gram matrix, and the modes building on them
+    refine the status (e.g. with the verdict of the tolerance ladder): fields left to None are not modified.
+
+    Args:
+        status (str or None): 'solved' for an accurate solution, one of the other `SERVED_STATUSES`,
+                              or any status that is not served by the cache (e.g. 'inaccurate' or 'uncertified').
+        gram_matrix (ndarray or None): Gram matrix of the worst-case instance.
+
+    """
+
+    if status is not None:
+        _LAST_SOLVE['status'] = status
+    if gram_matrix is not None:
+        _LAST_SOLVE['gram_matrix'] = np.asarray(gram_matrix)
+
+
+def last_solve():
+    """
+    Outcome of the last solve, as reported with :func:`report_solve`.
+
+    Returns:
+        outcome (dict): with the keys 'status' and 'gram_matrix', if reported.
+
+    """
+
+    return dict(_LAST_SOLVE)
+
+
+def print_conclusion(title, pepit_tau, theoretical_tau):
+    """
+    Print the conclusion of a worst-case analysis, in the format of the `wc_*` functions.
+
+    Args:
+        title (str): title of the analysis.
+        pepit_tau (float): worst-case value.
+        theoretical_tau (float): theoretical value.
+
+    """
+
+    print('*** Example file: {} ***'.format(title))
+    print('\tPEP-it guarantee:\t\t f(x_n)-f_* <= {:.6} ||x_0 - x_*||^2'.format(pepit_tau))
+    print('\tTheoretical guarantee:\t f(x_n)-f_* <= {:.6} ||x_0 - x_*||^2'.format(theoretical_tau))
+
+
+def cached_worst_case(function_class, title):
+    """
+    Decorator making a `wc_*` function consult a :class:`PEPCache` before solving its PEP,
+    and store its results afterwards.
+
+    The decorated function must have the arguments `verbose` and `use_cache`:
+    the cache is skipped when `use_cache` is False.
+    The status and the Gram matrix reported by the solves (see :func:`report_solve`) are stored with the values,
+    and only the entries with one of the `SERVED_STATUSES` are served: the other ones are solved again.
+    All the arguments but those listed in `NON_KEY_ARGUMENTS` are part of the key.
+    On a cache hit, the usual conclusion of the example is printed (unless `verbose` is -1).
+    The title of the conclusion is exposed as the attribute `title` of the decorated function.
+
+    Args:
+        function_class (type): the class of functions the PEP is formulated on.
+        title (str): title of the conclusion printed by the `wc_*` function.
+
+    Returns:
+        decorator (callable): the decorator.
+
+    """
+
+    def decorator(wc_function):
+
+        signature = inspect.signature(wc_function)
+        algorithm = '{}.{}'.format(wc_function.__module__, wc_function.__qualname__)
+
+        @functools.wraps(wc_function)
+        def wrapper(*args, **kwargs):
+
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            params = dict(arguments.arguments)
+            verbose, use_cache = params['verbose'], params['use_cache']
+            if not use_cache:
+                return wc_function(*args, **kwargs)
+            for name in NON_KEY_ARGUMENTS:
+                params.pop(name, None)
+
+            # Look for the analysis in the cache
+            cache = PEPCache()
+            key, description = cache.make_key(algorithm, params, function_class=function_class.__name__,
+                                              source=package_source_hash())
+            entry = cache.get(key)
+            if entry is not None and entry['status'] in SERVED_STATUSES:
+                pepit_tau, theoretical_tau = entry['pepit_tau'], entry['theoretical_tau']
+                if verbose != -1:
+                    if verbose:
+                        print('(PEP cache) Worst-case value loaded from {} (solved in {:.3}s)'.format(
+                            cache.path, entry['solve_time']))
+                    print_conclusion(title, pepit_tau, theoretical_tau)
+                return pepit_tau, theoretical_tau
+
+            # Solve and store
+            _LAST_SOLVE.clear()
+            start = time.perf_counter()
+            pepit_tau, theoretical_tau = wc_function(*args, **kwargs)
+            solve_time = time.perf_counter() - start
+            outcome = last_solve()
+            status = outcome.get('status', 'solved') if pepit_tau is not None and np.isfinite(pepit_tau) else 'failed'
+            cache.put(key, description, pepit_tau, theoretical_tau, status=status, solve_time=solve_time,
+                      gram_matrix=outcome.get('gram_matrix'))
+
+            return pepit_tau, theoretical_tau
+
+        wrapper.title = title
+        return wrapper
+
+    return decorator
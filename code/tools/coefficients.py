@@ -0,0 +1,123 @@
+import numpy as np
+import scipy.sparse as sp
+
+from PEPit.expression import Expression
+
+
+def points_to_matrix(points, nb_leaves):
+    """
+    Stack the decompositions of some :class:`Point` objects over the leaf :class:`Point` basis.
+
+    Args:
+        points (list): list of :class:`Point` objects.
+        nb_leaves (int): number of leaf :class:`Point` objects (typically `Point.counter`).
+
+    Returns:
+        matrix (scipy.sparse.csr_matrix): matrix of shape (len(points), nb_leaves)
+                                          whose row i contains the coefficients of points[i].
+
+    """
+
+    rows, cols, data = list(), list(), list()
+    for row, point in enumerate(points):
+        for leaf, weight in point.decomposition_dict.items():
+            rows.append(row)
+            cols.append(leaf.counter)
+            data.append(weight)
+
+    return sp.csr_matrix((data, (rows, cols)), shape=(len(points), nb_leaves))
+
+
+def expressions_to_matrices(expressions, nb_leaves, nb_values):
+    """
+    Stack the decompositions of some :class:`Expression` objects.
+
+    Each :class:`Expression` is a linear combination of leaf function values, of inner products of leaf
+    :class:`Point` objects, and of a constant. Its coefficients are therefore stored in three places:
+    a row of coefficients on the vector F of leaf function values,
+    a row of coefficients on vec(G), G being the Gram matrix of the leaf :class:`Point` objects
+    (column-major ordering, i.e. the inner product of leaves p and q is stored in column p + q * nb_leaves),
+    and a constant.
+
+    Args:
+        expressions (list): list of :class:`Expression` objects.
+        nb_leaves (int): number of leaf :class:`Point` objects (typically `Point.counter`).
+        nb_values (int): number of leaf :class:`Expression` objects (typically `Expression.counter`).
+
+    Returns:
+        F_matrix (scipy.sparse.csr_matrix): coefficients on F, of shape (len(expressions), nb_values).
+        G_matrix (scipy.sparse.csr_matrix): coefficients on vec(G), of shape (len(expressions), nb_leaves ** 2).
+        constants (ndarray): constants of shape (len(expressions),).
+
+    """
+
+    F_rows, F_cols, F_data = list(), list(), list()
+    G_rows, G_cols, G_data = list(), list(), list()
+    constants = np.zeros(len(expressions))
+
+    for row, expression in enumerate(expressions):
+        for key, weight in expression.decomposition_dict.items():
+            # Function values are stored in F
+            if type(key) == Expression:
+                assert key.get_is_leaf()
+                F_rows.append(row)
+                F_cols.append(key.counter)
+                F_data.append(weight)
+            # Inner products are stored in G
+            elif type(key) == tuple:
+                point1, point2 = key
+                assert point1.get_is_leaf()
+                assert point2.get_is_leaf()
+                G_rows.append(row)
+                G_cols.append(point1.counter + point2.counter * nb_leaves)
+                G_data.append(weight)
+            # Constants are simply constants
+            elif key == 1:
+                constants[row] += weight
+            # Others don't exist and raise an Exception
+            else:
+                raise TypeError("Expressions are made of function values, inner products and constants only!")
+
+    F_matrix = sp.csr_matrix((F_data, (F_rows, F_cols)), shape=(len(expressions), nb_values))
+    G_matrix = sp.csr_matrix((G_data, (G_rows, G_cols)), shape=(len(expressions), nb_leaves ** 2))
+
+    return F_matrix, G_matrix, constants
+
+
+def row_wise_outer(A, B):
+    """
+    Compute the row-wise outer products of two sparse matrices (a.k.a. face-splitting product).
+
+    Row r of the output is vec(A[r]^T B[r]) in column-major ordering,
+    so that its inner product with vec(G) is A[r] G B[r]^T.
+
+    Args:
+        A (scipy.sparse matrix): matrix of shape (m, p).
+        B (scipy.sparse matrix): matrix of shape (m, p).
+
+    Returns:
+        matrix (scipy.sparse.csr_matrix): matrix of shape (m, p ** 2).
+
+    """
+
+    A = sp.csr_matrix(A)
+    B = sp.csr_matrix(B)
+    A.sum_duplicates()
+    B.sum_duplicates()
+    m, p = A.shape
+
+    # Repeat each nonzero of A as many times as there are nonzeros in the same row of B
+    A_rows = np.repeat(np.arange(m), np.diff(A.indptr))
+    B_row_lengths = np.diff(B.indptr)[A_rows]
+    A_positions = np.repeat(np.arange(A.nnz), B_row_lengths)
+
+    # For each such repetition, find the matching nonzero of B
+    starts = np.repeat(B.indptr[A_rows], B_row_lengths)
+    offsets = np.arange(A_positions.size) - np.repeat(np.cumsum(B_row_lengths) - B_row_lengths, B_row_lengths)
+    B_positions = starts + offsets
+
+    rows = A_rows[A_positions]
+    cols = A.indices[A_positions] + B.indices[B_positions] * p
+    data = A.data[A_positions] * B.data[B_positions]
+
+    return sp.csr_matrix((data, (rows, cols)), shape=(m, p ** 2))
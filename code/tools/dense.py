@@ -0,0 +1,186 @@
+import numpy as np
+
+
+class LeafBasis(object):
+    """
+    The :class:`LeafBasis` class counts the leaf points (the vectors the Gram matrix is made of) and the leaf
+    function values of a PEP built from :class:`DensePoint` objects.
+
+    Attributes:
+        nb_leaves (int): number of leaf points created so far.
+        nb_values (int): number of leaf function values created so far.
+
+    """
+
+    __slots__ = ('nb_leaves', 'nb_values')
+
+    def __init__(self):
+        self.nb_leaves = 0
+        self.nb_values = 0
+
+    def new_point(self):
+        """
+        Create a new leaf point.
+
+        Returns:
+            point (DensePoint): the leaf point.
+
+        """
+
+        coefficients = np.zeros(self.nb_leaves + 1)
+        coefficients[-1] = 1
+        self.nb_leaves += 1
+        return DensePoint(coefficients)
+
+    def new_value(self):
+        """
+        Create a new leaf function value.
+
+        Returns:
+            index (int): its index in the vector of function values.
+
+        """
+
+        self.nb_values += 1
+        return self.nb_values - 1
+
+    def zero(self):
+        return DensePoint(np.zeros(0))
+
+
+class DensePoint(object):
+    """
+    The :class:`DensePoint` class is a light counterpart of :class:`PEPit.Point`:
+    a point is a dense vector of coefficients over the leaf points created before it (see :class:`LeafBasis`),
+    so that a linear combination of points costs one vectorized operation, instead of the copy and update
+    of a decomposition dictionary. Points created before a leaf have implicit zero coefficients on it.
+    The inner products of points are not expressions: stacking the coefficients of many points
+    (see :func:`stack_points`) gives their Gram-matrix entries as matrix products :math:`X G Y^T`.
+
+    Attributes:
+        coefficients (ndarray): the coefficients of the point over the first leaves.
+
+    Example:
+        >>> basis = LeafBasis()
+        >>> x0, g0 = basis.new_point(), basis.new_point()
+        >>> x1 = x0 - .5 * g0
+        >>> X = stack_points([x0, x1], basis.nb_leaves)
+
+    """
+
+    __slots__ = ('coefficients',)
+
+    def __init__(self, coefficients):
+        self.coefficients = coefficients
+
+    def _aligned(self, other):
+        # Pad the shorter vector of coefficients with the zeros of the leaves it predates
+        a, b = self.coefficients, other.coefficients
+        if a.size < b.size:
+            a = np.concatenate([a, np.zeros(b.size - a.size)])
+        elif b.size < a.size:
+            b = np.concatenate([b, np.zeros(a.size - b.size)])
+        return a, b
+
+    def __add__(self, other):
+        a, b = self._aligned(other)
+        return DensePoint(a + b)
+
+    def __sub__(self, other):
+        a, b = self._aligned(other)
+        return DensePoint(a - b)
+
+    def __neg__(self):
+        return DensePoint(- self.coefficients)
+
+    def __mul__(self, other):
+        if isinstance(other, DensePoint):
+            raise TypeError('The inner products of DensePoint objects are obtained by stacking them (see stack_points)')
+        return DensePoint(other * self.coefficients)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, denominator):
+        return DensePoint(self.coefficients / denominator)
+
+
+def stack_points(points, nb_leaves):
+    """
+    Stack the coefficients of some :class:`DensePoint` objects.
+
+    Args:
+        points (list): list of :class:`DensePoint` objects.
+        nb_leaves (int): number of leaf points (typically `LeafBasis.nb_leaves`).
+
+    Returns:
+        matrix (ndarray): matrix of shape (len(points), nb_leaves) whose row i contains the coefficients of points[i].
+
+    """
+
+    matrix = np.zeros((len(points), nb_leaves))
+    for row, point in enumerate(points):
+        matrix[row, :point.coefficients.size] = point.coefficients
+
+    return matrix
+
+
+class DenseOracle(object):
+    """
+    The :class:`DenseOracle` class plays the role of a :class:`PEPit.Function` for :class:`DensePoint` objects:
+    it creates a leaf gradient and a leaf function value at each point it is evaluated on, and records
+    the triplets :math:`(x_i, g_i, f_i)` and the orthogonality conditions of the exact span searches.
+    The stationary point :math:`x_\\star` is the origin, with :math:`g_\\star = 0` and :math:`f_\\star = 0`
+    (the PEPs are invariant by translation of x and f).
+
+    Attributes:
+        basis (LeafBasis): the leaf basis.
+        triplets (list): the triplets :math:`(x_i, g_i, f_i)`, :math:`f_i` being an index of function value
+                         (None for :math:`f_\\star`).
+        searches (list): for each exact span search, the index of its triplet and the directions
+                         its gradient is orthogonal to.
+
+    Example:
+        >>> oracle = DenseOracle()
+        >>> xs = oracle.stationary_point()
+        >>> x0 = oracle.basis.new_point()
+        >>> g0, f0 = oracle.oracle(x0)
+
+    """
+
+    __slots__ = ('basis', 'triplets', 'searches')
+
+    def __init__(self, basis=None):
+        self.basis = basis or LeafBasis()
+        self.triplets = list()
+        self.searches = list()
+
+    def stationary_point(self):
+        xs = self.basis.zero()
+        self.triplets.append((xs, self.basis.zero(), None))
+        return xs
+
+    def oracle(self, point):
+        gradient, value = self.basis.new_point(), self.basis.new_value()
+        self.triplets.append((point, gradient, value))
+        return gradient, value
+
+    def exact_search(self, x0, directions):
+        """
+        Counterpart of :func:`PEPit.primitive_steps.exact_linesearch_step`: the new point is a leaf, whose gradient is
+        orthogonal to its displacement from x0 and to the directions.
+
+        Args:
+            x0 (DensePoint): the starting point.
+            directions (list): list of :class:`DensePoint` objects.
+
+        Returns:
+            x (DensePoint): the new point.
+            gx (DensePoint): its gradient.
+            fx (int): the index of its function value.
+
+        """
+
+        x = self.basis.new_point()
+        gx, fx = self.oracle(x)
+        self.searches.append((len(self.triplets) - 1, [x - x0] + list(directions)))
+        return x, gx, fx
@@ -0,0 +1,87 @@
+import inspect
+import warnings
+import functools
+
+import numpy as np
+
+from code.tools.cache import print_conclusion
+
+
+def scale_invariant(step_sizes=(), rtol=1e-3):
+    """
+    Decorator canonicalizing the parameter L of a `wc_*` function.
+
+    Over :math:`L-\\text{QG}^+` convex functions, :math:`f` is :math:`L-\\text{QG}^+` if and only if
+    :math:`f / L` is :math:`1-\\text{QG}^+`, and a step :math:`\\gamma \\nabla f` on :math:`f` is a step
+    :math:`L \\gamma \\nabla (f / L)` on :math:`f / L`. Hence, the worst-case values verify
+
+    .. math:: \\tau(n, L, \\gamma) = L \\, \\tau(n, 1, L \\gamma),
+
+    as long as all the step-sizes of the method are expressed as multiples of :math:`\\frac{1}{L}`,
+    or are arguments of the `wc_*` function listed in `step_sizes`.
+    The decorated function solves (or fetches from the cache) the normalized problem only,
+    and rescales its result, so that a grid over (L, gamma) collapses into a grid over L gamma.
+
+    The decorated function must have the arguments `L`, `verbose` and `scaling`, the latter being either
+
+        - 'canonical': solve the normalized problem and rescale its result,
+        - 'verify': also solve the original problem and warn if the two values differ
+          by more than `rtol` (relatively), returning the values of the original problem,
+        - 'none': solve the original problem.
+
+    Args:
+        step_sizes (tuple): names of the arguments of the `wc_*` function that are step-sizes.
+        rtol (float): relative tolerance of the verification.
+
+    Returns:
+        decorator (callable): the decorator.
+
+    """
+
+    def decorator(wc_function):
+
+        signature = inspect.signature(wc_function)
+        title = getattr(wc_function, 'title', wc_function.__name__)
+
+        @functools.wraps(wc_function)
+        def wrapper(*args, **kwargs):
+
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            params = dict(arguments.arguments)
+            scaling, L, verbose = params['scaling'], params['L'], params['verbose']
+            if scaling not in {'canonical', 'verify', 'none'}:
+                raise ValueError("scaling must be either 'canonical', 'verify' or 'none'. Got {}".format(scaling))
+            if scaling == 'none' or L == 1:
+                return wc_function(*args, **kwargs)
+
+            # Solve the normalized problem and rescale its result
+            normalized_params = dict(params, L=1, verbose=-1)
+            for name in step_sizes:
+                normalized_params[name] = L * params[name]
+            pepit_tau, theoretical_tau = wc_function(**normalized_params)
+            pepit_tau, theoretical_tau = L * pepit_tau, L * theoretical_tau
+            if verbose > 0:
+                print('(PEP scaling) Worst-case value obtained from the normalized problem with L=1{}'.format(
+                    ''.join(', {}={:.6}'.format(name, normalized_params[name]) for name in step_sizes)))
+
+            # Spot-check the scaling against a real solve
+            if scaling == 'verify':
+                scaled_pepit_tau = pepit_tau
+                pepit_tau, theoretical_tau = wc_function(**dict(params, verbose=-1))
+                if not np.isclose(scaled_pepit_tau, pepit_tau, rtol=rtol, atol=0):
+                    warnings.warn('The scaled worst-case value {} differs from the one of the original problem {}'
+                                  ' ({} with {})'.format(scaled_pepit_tau, pepit_tau, wc_function.__name__,
+                                                         params))
+                elif verbose > 0:
+                    print('(PEP scaling) Scaling verified: {} (scaled) vs {} (original)'.format(scaled_pepit_tau,
+                                                                                              pepit_tau))
+
+            if verbose != -1:
+                print_conclusion(title, pepit_tau, theoretical_tau)
+
+            return pepit_tau, theoretical_tau
+
+        return wrapper
+
+    return decorator
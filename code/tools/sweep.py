@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import inspect
+import importlib
+import itertools
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Location of the worst-case analyses, imported lazily by the workers
+ALGORITHMS = {
+    'gradient_descent': 'code.gradient_descent_qg_convex:wc_gradient_descent_qg_convex',
+    'gradient_descent_decreasing': ('code.gradient_descent_qg_convex_decreasing:'
+                                    'wc_gradient_descent_qg_convex_decreasing'),
+    'heavy_ball_momentum': 'code.heavy_ball_momentum_qg_convex:wc_heavy_ball_momentum_qg_convex',
+    'conjugate_gradient': 'code.conjugate_gradient_qg_convex:wc_conjugate_gradient_qg_convex',
+}
+
+
+def get_wc_function(algorithm):
+    """
+    Import the worst-case analysis of an algorithm.
+
+    Args:
+        algorithm (str): a key of `ALGORITHMS`, or a path of the form 'package.module:function'.
+
+    Returns:
+        wc_function (callable): the `wc_*` function.
+
+    """
+
+    path = ALGORITHMS.get(algorithm, algorithm)
+    if ':' not in path:
+        raise ValueError("algorithm must be either one of {} or of the form 'package.module:function'."
+                         " Got {}".format(list(ALGORITHMS), algorithm))
+    module_name, function_name = path.split(':')
+
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def job_key(job):
+    """
+    Canonical string identifying a job, used to detect already completed jobs.
+
+    Args:
+        job (dict): the job description.
+
+    Returns:
+        key (str): the key.
+
+    """
+
+    return json.dumps(job, sort_keys=True)
+
+
+def make_grid(algorithms, n_list, L_list=(1,), gamma_list=(None,), **fixed_params):
+    """
+    Build the list of jobs of a sweep over (algorithm, n, L, gamma).
+    The step-size grid is only applied to the algorithms whose `wc_*` function has a `gamma` argument.
+
+    Args:
+        algorithms (list): list of keys of `ALGORITHMS` (or of paths 'package.module:function').
+        n_list (iterable): numbers of iterations.
+        L_list (iterable): values of L.
+        gamma_list (iterable): step-sizes.
+        fixed_params: other keyword arguments passed to all the `wc_*` functions (e.g. mode='compiled').
+
+    Returns:
+        jobs (list): list of dictionaries with keys 'algorithm' and 'params'.
+
+    """
+
+    jobs = list()
+    for algorithm in algorithms:
+        has_gamma = 'gamma' in inspect.signature(get_wc_function(algorithm)).parameters
+        for n, L, gamma in itertools.product(n_list, L_list, gamma_list if has_gamma else (None,)):
+            params = dict(fixed_params, L=float(L), n=int(n))
+            if has_gamma:
+                params['gamma'] = float(gamma)
+            jobs.append({'algorithm': algorithm, 'params': params})
+
+    return jobs
+
+
+def load_results(output_path):
+    """
+    Read the results written by :func:`run_sweep`.
+
+    Args:
+        output_path (str): path of the JSON Lines output file.
+
+    Returns:
+        results (list): list of dictionaries, one per completed job.
+
+    """
+
+    results = list()
+    if os.path.exists(output_path):
+        with open(output_path) as output_file:
+            for line in output_file:
+                # An interrupted write may leave an incomplete last line
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+
+    return results
+
+
+def _run_job(job, connection):
+    """
+    Worker: run one job and send its result through a pipe.
+    """
+
+    start = time.perf_counter()
+    try:
+        wc_function = get_wc_function(job['algorithm'])
+        pepit_tau, theoretical_tau = wc_function(verbose=-1, **job['params'])
+        result = {'status': 'done', 'pepit_tau': float(pepit_tau), 'theoretical_tau': float(theoretical_tau)}
+    except Exception:
+        result = {'status': 'error', 'error': traceback.format_exc()}
+    result['time'] = time.perf_counter() - start
+    connection.send(result)
+    connection.close()
+
+
+def run_sweep(jobs, output_path, nb_workers=None, timeout=None, retry_failed=False, verbose=1):
+    """
+    Run the jobs of a sweep (see :func:`make_grid`) across a pool of processes.
+
+    Each job runs in its own process, which is killed if it exceeds `timeout`.
+    Each result is appended to the JSON Lines file `output_path` as soon as its job finishes,
+    so that an interrupted sweep can be resumed by calling :func:`run_sweep` again:
+    the jobs already present in `output_path` are skipped.
+
+    Args:
+        jobs (list): list of dictionaries with keys 'algorithm' and 'params'.
+        output_path (str): path of the JSON Lines output file.
+        nb_workers (int or None): maximum number of concurrent processes. Defaults to the number of CPUs.
+        timeout (float or None): maximum duration of a job, in seconds.
+        retry_failed (bool): if True, the jobs that previously failed or timed out are run again.
+        verbose (int): Level of information details to print (0 or 1).
+
+    Returns:
+        results (list): the results of all the jobs present in `output_path` after the sweep.
+
+    """
+
+    if nb_workers is None:
+        nb_workers = os.cpu_count() or 1
+
+    # Skip the completed jobs
+    completed = {result['key'] for result in load_results(output_path)
+                 if result['status'] == 'done' or not retry_failed}
+    pending = list()
+    for job in jobs:
+        key = job_key(job)
+        if key not in completed:
+            completed.add(key)
+            pending.append(job)
+    pending.reverse()
+    if verbose:
+        print('(Sweep) {} job(s) to run, {} already completed'.format(len(pending), len(jobs) - len(pending)))
+
+    context = multiprocessing.get_context()
+    running = dict()
+    nb_finished = 0
+
+    with open(output_path, 'a+') as output_file:
+
+        # Terminate an incomplete last line, left by an interrupted write
+        if output_file.tell() > 0:
+            output_file.seek(output_file.tell() - 1)
+            if output_file.read(1) != '\n':
+                output_file.write('\n')
+
+        def write(job, result):
+            result.update({'key': job_key(job), 'algorithm': job['algorithm'], 'params': job['params']})
+            output_file.write(json.dumps(result) + '\n')
+            output_file.flush()
+            os.fsync(output_file.fileno())
+            if verbose:
+                print('(Sweep) [{}/{}] {} {}: {}'.format(nb_finished, nb_finished + len(pending) + len(running),
+                                                         job['algorithm'], job['params'],
+                                                         result.get('pepit_tau', result['status'])))
+
+        try:
+            while pending or running:
+
+                # Start new processes
+                while pending and len(running) < nb_workers:
+                    job = pending.pop()
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(target=_run_job, args=(job, sender), daemon=True)
+                    process.start()
+                    sender.close()
+                    running[receiver] = (job, process, time.perf_counter())
+
+                # Collect the results of the finished jobs
+                for receiver in wait(list(running), timeout=.1):
+                    job, process, _ = running.pop(receiver)
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        result = {'status': 'error', 'error': 'worker exited with code {}'.format(process.exitcode)}
+                    process.join()
+                    receiver.close()
+                    nb_finished += 1
+                    write(job, result)
+
+                # Kill the jobs that exceed the time limit
+                if timeout is not None:
+                    for receiver, (job, process, start) in list(running.items()):
+                        if time.perf_counter() - start > timeout:
+                            process.kill()
+                            process.join()
+                            receiver.close()
+                            del running[receiver]
+                            nb_finished += 1
+                            write(job, {'status': 'timeout', 'time': timeout})
+
+        finally:
+            # Do not leave orphan processes behind if interrupted
+            for receiver, (_, process, _) in running.items():
+                process.kill()
+                process.join()
+                receiver.close()
+
+    return load_results(output_path)
+
+
+if __name__ == "__main__":
+
+    import sys
+    from code.tools.cache import cache_directory
+
+    # The results are written to the path given on the command line, or next to the PEP cache
+    output_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(cache_directory(), 'sweep_results.jsonl')
+    jobs = make_grid(algorithms=list(ALGORITHMS), n_list=range(1, 11), L_list=[1.], gamma_list=[.1, .2, .5],
+                     mode='compiled')
+    results = run_sweep(jobs, output_path=output_path, timeout=600)
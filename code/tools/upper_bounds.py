@@ -0,0 +1,164 @@
+import numpy as np
+from scipy.optimize import brentq
+
+
+class UpperBound(object):
+    """
+    The :class:`UpperBound` class describes a concave increasing function h, with :math:`h(0) = 0`,
+    defining the class of h-relatively-upper-bounded convex functions (h-RG^+):
+
+    .. math:: f(x) - f_\\star \\leqslant h(\\|x - x_\\star\\|^2).
+
+    The :math:`L-\\text{QG}^+` convex functions correspond to :math:`h(z) = \\frac{L}{2} z`,
+    and the M-Lipschitz convex ones satisfy the bound with :math:`h(z) = M \\sqrt{z}`.
+    The registered functions (see :func:`make_upper_bound`) have closed-form inverses and derivatives;
+    the inverse of a user-defined h is computed numerically.
+
+    Attributes:
+        name (str or None): name of h.
+
+    Example:
+        >>> h = UpperBound(lambda z: np.log1p(z), lambda z: 1 / (1 + z), name='log')
+        >>> z = h.inverse(1.)
+
+    """
+
+    def __init__(self, value, derivative, inverse=None, name=None):
+        """
+
+        Args:
+            value (callable): function z -> h(z).
+            derivative (callable): function z -> h'(z).
+            inverse (callable or None): function v -> :math:`h^{-1}(v)` (None to compute it numerically).
+            name (str or None): name of h.
+
+        """
+
+        self._value = value
+        self._derivative = derivative
+        self._inverse = inverse
+        self.name = name
+
+    def __call__(self, z):
+        return self._value(z)
+
+    def derivative(self, z):
+        return self._derivative(z)
+
+    def inverse(self, value):
+        """
+        Inverse of h, in closed form if known, otherwise by Brent's method on a bracket doubled until
+        it contains the solution.
+
+        Args:
+            value (float): a nonnegative value of h.
+
+        Returns:
+            z (float): the nonnegative z such that h(z) = value.
+
+        """
+
+        if self._inverse is not None:
+            return self._inverse(value)
+        if value <= 0:
+            return 0.
+
+        upper = 1.
+        while self(upper) < value:
+            upper *= 2
+
+        return brentq(lambda z: self(z) - value, 0., upper)
+
+    def tangent(self, z):
+        """
+        Tangent of h at z: as h is concave, :math:`h(y) \\leqslant a + b y` for all y.
+
+        Args:
+            z (float): the point of tangency.
+
+        Returns:
+            a (float): the value at 0 of the tangent.
+            b (float): its slope :math:`h'(z)`.
+
+        """
+
+        slope = self.derivative(z)
+        return self(z) - slope * z, slope
+
+
+def quadratic_upper_bound(L):
+    """
+    :math:`h(z) = \\frac{L}{2} z` (the :math:`L-\\text{QG}^+` convex functions).
+    """
+
+    return UpperBound(lambda z: L * z / 2, lambda z: L / 2, inverse=lambda value: 2 * value / L,
+                      name='quadratic(L={})'.format(L))
+
+
+def sqrt_upper_bound(M):
+    """
+    :math:`h(z) = M \\sqrt{z}` (e.g. the M-Lipschitz convex functions).
+    """
+
+    return UpperBound(lambda z: M * np.sqrt(z), lambda z: M / (2 * np.sqrt(z)), inverse=lambda value: (value / M) ** 2,
+                      name='sqrt(M={})'.format(M))
+
+
+def sqrt_quadratic_upper_bound(M, L):
+    """
+    :math:`h(z) = M \\sqrt{z} + \\frac{L}{2} z`, whose inverse is the square of the positive root of
+    :math:`\\frac{L}{2} s^2 + M s - v` (that of :func:`sqrt_upper_bound` when L = 0).
+    """
+
+    if L < 0:
+        raise ValueError('L must be nonnegative. Got {}'.format(L))
+    if L == 0:
+        inverse = lambda value: (value / M) ** 2
+    else:
+        inverse = lambda value: ((np.sqrt(M ** 2 + 2 * L * value) - M) / L) ** 2
+
+    return UpperBound(lambda z: M * np.sqrt(z) + L * z / 2, lambda z: M / (2 * np.sqrt(z)) + L / 2,
+                      inverse=inverse, name='sqrt_quadratic(M={}, L={})'.format(M, L))
+
+
+# Registry of the functions h, by name (see :func:`make_upper_bound`)
+UPPER_BOUNDS = {
+    'quadratic': quadratic_upper_bound,
+    'sqrt': sqrt_upper_bound,
+    'sqrt_quadratic': sqrt_quadratic_upper_bound,
+}
+
+
+def register_upper_bound(name, factory):
+    """
+    Register a family of functions h, so that :func:`make_upper_bound` can build them by name.
+
+    Args:
+        name (str): name of the family.
+        factory (callable): function of the parameters of the family returning an :class:`UpperBound`.
+
+    """
+
+    UPPER_BOUNDS[name] = factory
+
+
+def make_upper_bound(name, **parameters):
+    """
+    Build a registered function h.
+
+    Args:
+        name (str): name of the family, among the keys of `UPPER_BOUNDS` ('quadratic', 'sqrt', 'sqrt_quadratic').
+        parameters: parameters of the family (e.g. L=1, or M=1).
+
+    Returns:
+        h (UpperBound): the function h.
+
+    Example:
+        >>> h = make_upper_bound('sqrt_quadratic', M=1, L=1)
+
+    """
+
+    if name not in UPPER_BOUNDS:
+        raise ValueError('h must be one of {}. Got {}'.format(sorted(UPPER_BOUNDS), name))
+
+    return UPPER_BOUNDS[name](**parameters)
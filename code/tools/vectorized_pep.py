@@ -0,0 +1,253 @@
+import numpy as np
+import cvxpy as cp
+
+from PEPit import PEP
+from PEPit.point import Point
+from PEPit.expression import Expression
+
+from code.tools.coefficients import expressions_to_matrices
+
+
+class VectorizedPEP(PEP):
+    """
+    The :class:`VectorizedPEP` class overwrites the `solve` method of :class:`PEP` in order to hand all the constraints
+    to the SDP as a few stacked block constraints, instead of one cvxpy constraint per :class:`Constraint` object.
+
+    Functions providing a `get_class_constraints_arrays` method (such as :class:`ConvexQGFunction`) do not create
+    their interpolation constraints as :class:`Expression` objects: those are directly assembled as sparse coefficient
+    arrays, which avoids the :math:`O(N^2)` allocations of `add_class_constraints`.
+    The remaining constraints (initial conditions, constraints added by the algorithm, such as exact line-search
+    optimality conditions, and interpolation constraints of other functions) are stacked in the same way.
+
+    After solving, the dual values of the vectorized interpolation constraints are stored in the attribute
+    `class_constraints_dual_values` of each such function, aligned with its attribute `class_constraints_pairs`.
+
+    Example:
+        >>> from code.function_class import ConvexQGFunction
+        >>> problem = VectorizedPEP()
+        >>> func = problem.declare_function(function_class=ConvexQGFunction, param={'L': 1})
+
+    """
+
+    @staticmethod
+    def _block_to_cvxpy(block, F, vecG):
+        """
+        Create a cvxpy compatible (vector) expression from stacked coefficient arrays.
+
+        Args:
+            block (tuple): coefficients on F, coefficients on vec(G) and constants.
+            F (cvxpy Variable): a vector representing the function values.
+            vecG (cvxpy Expression): the vectorized Gram matrix of all leaf :class:`Point` objects.
+
+        Returns:
+            cvxpy_variable (cvxpy Expression): The stacked expressions in terms of F and G.
+
+        """
+
+        F_matrix, G_matrix, constants = block
+        return F_matrix @ F + G_matrix @ vecG + constants
+
+    def _constraints_to_blocks(self, constraints, nb_leaves, nb_values):
+        """
+        Split a list of :class:`Constraint` objects into a block of inequalities and a block of equalities.
+
+        Args:
+            constraints (list): list of :class:`Constraint` objects.
+            nb_leaves (int): number of leaf :class:`Point` objects.
+            nb_values (int): number of leaf :class:`Expression` objects.
+
+        Returns:
+            blocks (list): list of triplets (kind, indices, block) where kind is either 'inequality' or 'equality',
+                           indices are the positions in `constraints` of the stacked constraints,
+                           and block are their stacked coefficient arrays.
+
+        """
+
+        blocks = list()
+        for kind in ['inequality', 'equality']:
+            indices = [index for index, constraint in enumerate(constraints)
+                       if constraint.equality_or_inequality == kind]
+            if indices:
+                block = expressions_to_matrices([constraints[index].expression for index in indices],
+                                                nb_leaves, nb_values)
+                blocks.append((kind, indices, block))
+
+        for constraint in constraints:
+            if constraint.equality_or_inequality not in {'inequality', 'equality'}:
+                raise ValueError('The attribute \'equality_or_inequality\' of a constraint object'
+                                 ' must either be \'equality\' or \'inequality\'.'
+                                 'Got {}'.format(constraint.equality_or_inequality))
+
+        return blocks
+
+    def solve(self, solver=None, verbose=1, tracetrick=False, return_full_cvxpy_problem=False):
+        """
+        Transform the :class:`VectorizedPEP` under the SDP form, and solve it.
+
+        Args:
+            solver (str or None): The name of the underlying solver.
+            verbose (int): Level of information details to print (0 or 1)
+            tracetrick (bool): Apply trace heuristic as a proxy for minimizing
+                               the dimension of the solution (rank of the Gram matrix).
+            return_full_cvxpy_problem (bool): If True, return the cvxpy Problem object.
+                                              If False, return the worst case value only.
+                                              Set to False by default.
+
+        Returns:
+            float or cp.Problem: Value of the performance metric of cp.Problem object corresponding to the SDP.
+                                 The value only is returned by default.
+
+        """
+
+        # Create the class constraints of the functions that cannot be vectorized
+        for function in self.list_of_functions:
+            if not hasattr(function, 'get_class_constraints_arrays'):
+                function.add_class_constraints()
+
+        # Define the cvxpy variables
+        nb_leaves = Point.counter
+        nb_values = Expression.counter
+        objective = cp.Variable((1,))
+        F = cp.Variable((nb_values,))
+        G = cp.Variable((nb_leaves, nb_leaves), PSD=True)
+        vecG = cp.vec(G, order='F')
+        if verbose:
+            print('(PEPit) Setting up the problem:'
+                  ' size of the main PSD matrix: {}x{}'.format(nb_leaves, nb_leaves))
+
+        # Express the constraints from F, G and objective.
+        # Each element of constraints_list is a block, whose layout is stored in blocks_layout for post-processing.
+        constraints_list = list()
+        blocks_layout = list()
+
+        # Defining performance metrics
+        for performance_metric in self.list_of_performance_metrics:
+            assert isinstance(performance_metric, Expression)
+        metrics_block = expressions_to_matrices(self.list_of_performance_metrics, nb_leaves, nb_values)
+        constraints_list.append(objective <= self._block_to_cvxpy(metrics_block, F, vecG))
+        blocks_layout.append(('performance_metrics', None, None))
+        if verbose:
+            print('(PEPit) Setting up the problem:'
+                  ' performance measure is minimum of {} element(s)'.format(len(self.list_of_performance_metrics)))
+
+        # Defining initial conditions
+        for kind, indices, block in self._constraints_to_blocks(self.list_of_conditions, nb_leaves, nb_values):
+            if kind == 'inequality':
+                constraints_list.append(self._block_to_cvxpy(block, F, vecG) <= 0)
+            else:
+                constraints_list.append(self._block_to_cvxpy(block, F, vecG) == 0)
+            blocks_layout.append(('conditions', self.list_of_conditions, indices))
+        if verbose:
+            print('(PEPit) Setting up the problem:'
+                  ' initial conditions ({} constraint(s) added)'.format(len(self.list_of_conditions)))
+
+        # Defining class constraints
+        if verbose:
+            print('(PEPit) Setting up the problem:'
+                  ' interpolation conditions for {} function(s)'.format(len(self.list_of_functions)))
+        function_counter = 0
+        for function in self.list_of_functions:
+            function_counter += 1
+            nb_constraints = len(function.list_of_constraints)
+
+            # Vectorized interpolation constraints
+            if hasattr(function, 'get_class_constraints_arrays'):
+                F_matrix, G_matrix, constants, pairs = function.get_class_constraints_arrays(nb_leaves, nb_values)
+                function.class_constraints_pairs = pairs
+                constraints_list.append(self._block_to_cvxpy((F_matrix, G_matrix, constants), F, vecG) <= 0)
+                blocks_layout.append(('class_constraints', function, None))
+                nb_constraints += pairs.shape[0]
+
+            # Other constraints attached to the function
+            for kind, indices, block in self._constraints_to_blocks(function.list_of_constraints,
+                                                                    nb_leaves, nb_values):
+                if kind == 'inequality':
+                    constraints_list.append(self._block_to_cvxpy(block, F, vecG) <= 0)
+                else:
+                    constraints_list.append(self._block_to_cvxpy(block, F, vecG) == 0)
+                blocks_layout.append(('conditions', function.list_of_constraints, indices))
+
+            if verbose:
+                print('\t\t function', function_counter, ':', nb_constraints, 'constraint(s) added')
+
+        # Create the cvxpy problem
+        if verbose:
+            print('(PEPit) Compiling SDP')
+        prob = cp.Problem(objective=cp.Maximize(objective), constraints=constraints_list)
+
+        # Solve it
+        if verbose:
+            print('(PEPit) Calling SDP solver')
+        prob.solve(solver=solver)
+        if verbose:
+            print('(PEPit) Solver status: {} (solver: {}); optimal value: {}'.format(prob.status,
+                                                                                      prob.solver_stats.solver_name,
+                                                                                      prob.value))
+
+        wc_value = prob.value
+        if tracetrick:
+            eig_threshold = 1e-5
+            if verbose:
+                eig_val, _ = np.linalg.eig(G.value)
+                nb_eigen = len([element for element in eig_val if element > eig_threshold])
+                print('(PEPit) Postprocessing: applying trace heuristic.'
+                      ' Currently {} eigenvalue(s) > {} before resolve.'.format(nb_eigen, eig_threshold))
+                print('(PEPit) Calling SDP solver')
+            tol_tracetrick = 1e-5
+            prob = cp.Problem(objective=cp.Minimize(cp.trace(G)),
+                              constraints=constraints_list + [objective >= wc_value - tol_tracetrick])
+            prob.solve(solver=solver)
+            wc_value = objective.value[0]
+            if verbose:
+                print('(PEPit) Solver status: {} (solver: {});'
+                      ' objective value: {}'.format(prob.status,
+                                                    prob.solver_stats.solver_name,
+                                                    wc_value))
+                eig_val, _ = np.linalg.eig(G.value)
+                nb_eigen = len([element for element in eig_val if element > eig_threshold])
+                print('(PEPit) Postprocessing: {} eigenvalue(s) > {} after trace heuristic'.format(nb_eigen,
+                                                                                                    eig_threshold))
+
+        # Store all the values of points and function values
+        self._eval_points_and_function_values(F.value, G.value, verbose=verbose)
+
+        # Store all the dual values in constraints
+        self._eval_block_dual_values(prob.constraints, blocks_layout)
+
+        # Return the value of the minimal performance metric or the full cvxpy Problem object
+        if return_full_cvxpy_problem:
+            # Return the cvxpy Problem object
+            return prob
+        else:
+            # Return the value of the minimal performance metric
+            return wc_value
+
+    @staticmethod
+    def _eval_block_dual_values(cvx_constraints, blocks_layout):
+        """
+        Store all dual values in associated :class:`Constraint` objects,
+        and the dual values of vectorized interpolation constraints in their :class:`Function`.
+
+        Args:
+            cvx_constraints (list): a list of cvxpy formatted block constraints.
+            blocks_layout (list): for each block, a triplet describing where to store its dual values.
+
+        Returns:
+             position_of_minimal_objective (np.float): the position, in the list of performance metric,
+                                                       of the one that is actually reached.
+
+        """
+
+        position_of_minimal_objective = None
+        for cvx_constraint, (kind, owner, indices) in zip(cvx_constraints, blocks_layout):
+            dual_values = np.reshape(cvx_constraint.dual_value, -1)
+            if kind == 'performance_metrics':
+                position_of_minimal_objective = np.argmax(dual_values)
+            elif kind == 'class_constraints':
+                owner.class_constraints_dual_values = dual_values
+            else:
+                for index, dual_value in zip(indices, dual_values):
+                    owner[index]._dual_variable_value = dual_value
+
+        # Return the position of the reached performance metric
+        return position_of_minimal_objective